@@ -1,15 +1,81 @@
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+import threading
+import time
+
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
+import logging
 import os
 
+logger = logging.getLogger("database")
+
 # --- Database URL from environment ---
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+psycopg2://postgres:postgres@db:5432/healthflow")
 
+# --- Pool settings (per worker process: 4 uvicorn workers x (size + overflow) must fit max_connections) ---
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))     # seconds to wait for a free connection
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))     # recycle before server/proxy idle timeouts
+
+# --- Optional read replica for history / audit / listing / export reads ---
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL", "")
+REPLICA_MAX_LAG_S = float(os.getenv("REPLICA_MAX_LAG_S", "30"))    # older than this -> read from primary
+REPLICA_CHECK_INTERVAL_S = float(os.getenv("REPLICA_CHECK_INTERVAL_S", "5"))
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = {"checkouts": 0, "waited": 0, "timeouts": 0, "wait_total_s": 0.0, "wait_max_s": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            with self._stats_lock:
+                self.wait_stats["timeouts"] += 1
+            raise
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            s = self.wait_stats
+            s["checkouts"] += 1
+            s["wait_total_s"] += waited
+            s["wait_max_s"] = max(s["wait_max_s"], waited)
+            if waited > 0.005:
+                s["waited"] += 1
+        return conn
+
+    def recreate(self):
+        new = super().recreate()
+        new.wait_stats = self.wait_stats
+        return new
+
+
+def _engine_kwargs(url: str) -> dict:
+    if url.startswith("sqlite"):
+        return {}  # SQLite picks its own pool class
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": True,  # drop connections killed by failovers / idle timeouts before use
+    }
+
+
 # --- SQLAlchemy setup ---
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **_engine_kwargs(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+replica_engine = create_engine(REPLICA_DATABASE_URL, **_engine_kwargs(REPLICA_DATABASE_URL)) if REPLICA_DATABASE_URL else None
 
 Base = declarative_base()
 
@@ -20,3 +86,121 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+@contextmanager
+def session_scope():
+    """Short-lived session for one unit of work (WebSocket messages, background tasks).
+
+    Long-lived handlers must not hold a session between operations: each one pins
+    a pooled connection for as long as it is open.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# ---------------------------
+# Read routing (primary / replica)
+# ---------------------------
+replica_state = {"healthy": True, "lag_s": None, "checked_at": 0.0, "error": None,
+                 "replica_reads": 0, "primary_fallbacks": 0}
+
+
+def replica_lag_seconds(conn) -> float:
+    """Replay lag of a streaming replica; 0 for a primary or a non-Postgres stand-in.
+
+    now() - last replay timestamp keeps growing while the primary is idle, so a
+    replica that has replayed everything it received counts as 0 lag.
+    """
+    if conn.dialect.name != "postgresql":
+        return 0.0
+    lag = conn.execute(text(
+        "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+        "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    )).scalar()
+    return float(lag or 0)
+
+
+def _replica_usable(now=None) -> bool:
+    """Re-probe the replica at most every REPLICA_CHECK_INTERVAL_S; unreachable or lagging -> unusable."""
+    now = now if now is not None else time.monotonic()
+    if now - replica_state["checked_at"] >= REPLICA_CHECK_INTERVAL_S:
+        replica_state["checked_at"] = now
+        try:
+            with replica_engine.connect() as conn:
+                lag = replica_lag_seconds(conn)
+            replica_state.update(lag_s=round(lag, 3), error=None, healthy=lag <= REPLICA_MAX_LAG_S)
+        except Exception as e:
+            replica_state.update(lag_s=None, error=str(e), healthy=False)
+        if not replica_state["healthy"]:
+            logger.warning(f"⚠️ Read replica unusable (lag={replica_state['lag_s']}s, error={replica_state['error']}); "
+                           f"reading from primary")
+    return replica_state["healthy"]
+
+
+def read_engine():
+    """Replica when configured and fresh enough, else the primary."""
+    if replica_engine is not None and _replica_usable():
+        replica_state["replica_reads"] += 1
+        return replica_engine
+    if replica_engine is not None:
+        replica_state["primary_fallbacks"] += 1
+    return engine
+
+
+class RoutingSession(Session):
+    """Session for read-mostly endpoints.
+
+    Queries go to the engine picked by `read_engine()` when the session first
+    needs a connection, and stay there (one consistent snapshot per session).
+    Flushes — any INSERT/UPDATE/DELETE — always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing:
+            return engine
+        if "read_bind" not in self.info:
+            self.info["read_bind"] = read_engine()
+        return self.info["read_bind"]
+
+
+ReadSessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+
+
+def get_read_db():
+    """Dependency for read-only endpoints (history, audits, listings)."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def pool_stats(bind=None) -> dict:
+    """Pool occupancy and checkout wait times for /metrics/db."""
+    pool = (bind or engine).pool
+    stats = {"pool": pool.__class__.__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        stats.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "saturation": round(pool.checkedout() / capacity, 3) if capacity else None,
+        })
+    wait = getattr(pool, "wait_stats", None)
+    if wait:
+        stats.update({
+            "checkouts": wait["checkouts"],
+            "checkouts_waited": wait["waited"],
+            "checkout_timeouts": wait["timeouts"],
+            "wait_avg_ms": round(1000 * wait["wait_total_s"] / wait["checkouts"], 2) if wait["checkouts"] else 0.0,
+            "wait_max_ms": round(1000 * wait["wait_max_s"], 2),
+        })
+    return stats
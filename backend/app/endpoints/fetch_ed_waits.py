@@ -1,80 +1,66 @@
 # src/api/ws_wait_times.py
-import asyncio
-import json
-import requests
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.endpoints.recommend import _fetch_from_ahs
+from app.endpoints.ws_wait_times import fetch_snapshot, flatten_wait_times
+from app.services import ahs_cache, http_cache, wire_format, ws_fanout
+from app.services.ws_keepalive import hold_open
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
 
 # Router for both WebSocket + HTTP
 router = APIRouter(prefix="/ed-waits", tags=["ED Waits"])
 
-# Keep track of connected clients
-clients = set()
-latest_data = []
+# Encoded (and compressed) list per snapshot version: polling clients share the same bytes
+_bodies = wire_format.SnapshotBodies()
 
 
-def fetch_wait_times():
-    """Fetch and flatten Alberta wait times from AHS API."""
-    url = "https://www.albertahealthservices.ca/WebApps/WaitTimes/api/WaitTimes"
-    r = requests.get(url, timeout=10)
-    data = r.json()
-
-    results = []
-    for region, categories in data.items():
-        for category, hospitals in categories.items():
-            for hospital in hospitals:
-                results.append({
-                    "region": region,
-                    "category": category,
-                    "name": hospital.get("Name"),
-                    "wait_time": hospital.get("WaitTime"),
-                    "note": hospital.get("Note")
-                })
-    return results
+async def fetch_wait_times():
+    """Flattened Alberta wait times from the shared AHS snapshot."""
+    snapshot = await fetch_snapshot()
+    return snapshot[1] if snapshot else []
 
 
 @router.get("/", summary="Get latest ED wait times (HTTP)")
-def get_latest_wait_times():
+async def get_latest_wait_times(request: Request):
     """
     Returns the most recent cached wait times (or fetches fresh if empty).
     Useful for Swagger testing and non-realtime clients.
+    Send `Accept: application/msgpack` for a MessagePack body; responses carry
+    an ETag (revalidate with If-None-Match) and are gzip/brotli compressed.
     """
-    global latest_data
-    if not latest_data:
-        latest_data = fetch_wait_times()
-    return latest_data
-
-
-async def broadcast_data():
-    """Background task to fetch & broadcast wait times to all WebSocket clients."""
-    global latest_data
-    while True:
-        try:
-            latest_data = fetch_wait_times()
-            # Send JSON to all connected WebSocket clients
-            for ws in list(clients):
-                try:
-                    await ws.send_text(json.dumps(latest_data))
-                except Exception:
-                    clients.remove(ws)
-        except Exception as e:
-            print(f"Error fetching/broadcasting: {e}")
-        await asyncio.sleep(30)  # fetch every 30s
+    snapshot = await ahs_cache.get_snapshot(_fetch_from_ahs)
+    if not snapshot or not isinstance(snapshot["data"], dict):
+        return http_cache.snapshot_response(request, _bodies, None, "all", list)
+    # Flattened only when this version/encoding isn't cached yet (never for a 304)
+    return http_cache.snapshot_response(request, _bodies, snapshot["version"], "all",
+                                        lambda: flatten_wait_times(snapshot["data"]))
 
 
 @router.websocket("/ws")
 async def ws_ed_wait_times(websocket: WebSocket):
     """
     WebSocket endpoint for live ED wait times.
-    Clients will receive updates every 30s.
+    Clients receive each new snapshot as it is published (same hub as /ws/ed-waits);
+    `?encoding=msgpack` sends them as binary MessagePack frames.
     """
-    await websocket.accept()
-    clients.add(websocket)
+    fmt, subprotocol = wire_format.websocket_format(websocket)
+    await websocket.accept(subprotocol=subprotocol)
+    ws_fanout.hub.add(websocket, fmt=fmt)
     try:
         # Send latest data immediately after connection
-        if latest_data:
-            await websocket.send_text(json.dumps(latest_data))
+        await ws_fanout.hub.send_latest(websocket)
 
-        while True:
-            await asyncio.sleep(30)  # keep connection alive
+        # keepalive pings and subscribe messages; returns on disconnect
+        await hold_open(websocket, on_message=lambda message: ws_fanout.handle_control(websocket, message))
     except WebSocketDisconnect:
-        clients.remove(websocket)
+        pass
+    finally:
+        ws_fanout.hub.discard(websocket)
+
+
+
+
+
+
+
+
+
+
@@ -0,0 +1,46 @@
+# app/endpoints/metrics.py
+from fastapi import APIRouter
+from app import database
+from app.services import admission, audit_spool, degradation, hospital_snapshot, ws_fanout
+from app.services.http_client import get_http_client
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("/http", summary="Outbound HTTP pool usage")
+def http_metrics():
+    """Connection pool usage, retry budget and circuit breaker state of the shared HTTP client."""
+    return get_http_client().stats()
+
+
+@router.get("/db", summary="Database connection pool usage")
+def db_metrics():
+    """Pool saturation (checked out vs size + overflow) and how long checkouts wait."""
+    stats = {"primary": database.pool_stats()}
+    if database.replica_engine is not None:
+        stats["replica"] = {**database.pool_stats(database.replica_engine), **database.replica_state,
+                            "max_lag_s": database.REPLICA_MAX_LAG_S}
+    return stats
+
+
+@router.get("/ws", summary="Wait-time WebSocket fan-out")
+def ws_metrics():
+    """Local wait-time sockets, distinct subscription filters and encode/send counters for this worker."""
+    hub = ws_fanout.hub
+    return {"clients": len(hub.clients), "filters": len(hub.index), "version": hub.version, **hub.stats}
+
+
+@router.get("/admission", summary="Triage admission control")
+def admission_metrics():
+    """In-flight and queued requests, shed counts and service time per route group (this worker)."""
+    return {route: controller.snapshot() for route, controller in admission.controllers.items()}
+
+
+@router.get("/degradation", summary="Triage dependency health and fallbacks")
+def degradation_metrics():
+    """Breaker state per dependency (model, redis, postgres), audit WAL backlog and hospital snapshot age."""
+    return {
+        "dependencies": degradation.status(),
+        "audit_spool": audit_spool.status(),
+        "hospital_snapshot_age_s": hospital_snapshot.age_seconds(),
+    }
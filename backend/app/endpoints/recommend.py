@@ -1,47 +1,29 @@
 import logging
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Query
-import httpx
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect, Query
 import time
-import random
 import asyncio
 import json
 from math import radians, cos, sin, asin, sqrt
-from pathlib import Path
-from rapidfuzz import process  # fuzzy matching
+from app.services import ahs_cache, facility_registry
+from app.services.http_client import get_http_client
+from app.services import wait_forecast, travel_time, reco_cache, wire_format, http_cache
+from app.services.wait_forecast import effective_wait_minutes
+from app.utils.wait_time import parse_wait_time
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-# ---------------------------
-# Cache settings
-# ---------------------------
-CACHE_TTL = 300  # 5 minutes
-cached_data = None
-last_fetch_time = 0
-
 # ---------------------------
 # Config
 # ---------------------------
 AHS_API_URL = "https://www.albertahealthservices.ca/WebApps/WaitTimes/api/WaitTimes"
 WAIT_TIME_THRESHOLD = 120  # minutes
-HOSPITAL_COORDS_FILE = Path("hospital_coordinates.json")  # precomputed lat/lng
-
-# ---------------------------
-# Load Coordinates
-# ---------------------------
-def load_hospital_coords():
-    if not HOSPITAL_COORDS_FILE.exists():
-        print("⚠️ hospital_coordinates.json not found. Returning empty dict.")
-        return {}
-    try:
-        with open(HOSPITAL_COORDS_FILE, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"❌ Failed to load hospital_coordinates.json: {e}")
-        return {}
+STALE_AFTER = 1800  # seconds; older live data is replaced by forecasts
 
-HOSPITAL_COORDS = load_hospital_coords()
+# Encoded bodies per snapshot version (region answers, the raw AHS stream)
+_region_bodies = wire_format.SnapshotBodies()
+_stream_bodies = wire_format.SnapshotBodies(max_entries=4)
 
 # ---------------------------
 # Helper functions
@@ -51,56 +33,71 @@ HOSPITAL_COORDS = load_hospital_coords()
 logger = logging.getLogger("ahs_cache")
 logging.basicConfig(level=logging.INFO)
 
-async def fetch_ahs_data():
-    """Fetch data from Alberta Health Services API (with caching)."""
-    global cached_data, last_fetch_time
-    now = time.time()
-
-    if cached_data and (now - last_fetch_time) < CACHE_TTL:
-        logger.info("📌 Cache hit for AHS wait times")
-        return cached_data  # ✅ Return cached result
-
-    logger.info("⚠️ Cache miss — fetching fresh AHS wait times")
+async def _fetch_from_ahs():
+    """Fetch data straight from the Alberta Health Services API."""
     try:
-        async with httpx.AsyncClient(timeout=15, follow_redirects=True) as client:
-            response = await client.get(AHS_API_URL)
-            response.raise_for_status()
-            data = response.json()
-            cached_data = data
-            last_fetch_time = now
-            logger.info("✅ AHS data fetched and cache updated")
-            return data
+        return await get_http_client().get_json(AHS_API_URL)
     except Exception as e:
         logger.warning(f"❌ Error fetching AHS data: {e}")
-        if cached_data:
-            logger.info("📌 Returning stale cached data due to fetch error")
-            return cached_data
         return None
 
-# Existing helper functions remain unchanged
-def parse_wait_time(wait_str: str) -> int:
-    """Convert wait time string like '2 hr 30 min' to total minutes."""
-    if not wait_str:
-        return 0
-    wait_str = wait_str.lower()
-    hours, minutes = 0, 0
-    if "hr" in wait_str:
-        parts = wait_str.split("hr")
-        try:
-            hours = int(parts[0].strip())
-        except ValueError:
-            hours = 0
-        if "min" in parts[1]:
-            try:
-                minutes = int(parts[1].replace("min", "").strip())
-            except ValueError:
-                minutes = 0
-    elif "min" in wait_str:
-        try:
-            minutes = int(wait_str.replace("min", "").strip())
-        except ValueError:
-            minutes = 0
-    return hours * 60 + minutes
+async def fetch_ahs_data():
+    """Fetch AHS wait times through the shared (L1 + Redis) snapshot cache."""
+    snapshot = await ahs_cache.get_snapshot(_fetch_from_ahs)
+    return snapshot["data"] if snapshot else None
+
+def flatten_ahs_data(ahs_data) -> list:
+    """Accept both a flat list and the nested {region: {category: [sites]}} AHS payload."""
+    if isinstance(ahs_data, list):
+        return [h for h in ahs_data if isinstance(h, dict)]
+    rows = []
+    if isinstance(ahs_data, dict):
+        for region, categories in ahs_data.items():
+            if not isinstance(categories, dict):
+                continue
+            for category, sites in categories.items():
+                for site in sites or []:
+                    rows.append({
+                        "name": site.get("Name") or site.get("name"),
+                        "wait_time": site.get("WaitTime") or site.get("wait_time"),
+                        "note": site.get("Note") or site.get("note") or "",
+                        "category": site.get("Category") or category,
+                        "region": region,
+                        "address": site.get("Address") or site.get("address") or "",
+                    })
+    return rows
+
+_resolved = {"version": None}  # last snapshot whose names this worker has resolved
+
+async def _resolve_facility_names(version: str, hospitals: list):
+    """New spellings in a snapshot are resolved to facility IDs (and persisted) once per version."""
+    if version == _resolved["version"]:
+        return
+    regions = {h["name"]: h.get("region") for h in hospitals if h.get("name")}
+    try:
+        await asyncio.to_thread(facility_registry.resolve_names, list(regions), regions)
+    except Exception as e:
+        logger.warning(f"⚠️ Facility registry unavailable: {e}")
+        return  # retried with the next request
+    _resolved["version"] = version
+
+async def fetch_live_hospitals():
+    """
+    Return (flattened hospitals, is_stale, cache version) from the shared AHS
+    snapshot. The version is that of the snapshot actually served (re-reading
+    the current version later could pair this data with a newer snapshot's
+    ETag / cache key), with "-stale" appended for stale data; None if unknown.
+    """
+    snapshot = await ahs_cache.get_snapshot(_fetch_from_ahs)
+    if not snapshot:
+        return [], True, None
+    hospitals = flatten_ahs_data(snapshot["data"])
+    await _resolve_facility_names(snapshot["version"], hospitals)
+    stale = (time.time() - snapshot["fetched_at"]) > STALE_AFTER
+    version = snapshot.get("version")
+    if version and stale:
+        version = f"{version}-stale"
+    return hospitals, stale, version or None
 
 def haversine(lat1, lon1, lat2, lon2):
     """Calculate distance (km) between two lat/lng points."""
@@ -111,12 +108,24 @@ def haversine(lat1, lon1, lat2, lon2):
     c = 2 * asin(sqrt(a))
     return R * c
 
-def ai_predict_fallback():
-    """Mock AI fallback (replace with ML model)."""
+def ai_predict_fallback(location: str = None):
+    """Best hospital by precomputed wait forecast (used when live data is unavailable)."""
+    candidates = [
+        f for f in wait_forecast.all_forecasts()
+        if not location or location.lower() in (f.get("region") or "").lower()
+    ]
+    if not candidates:
+        return {
+            "hospital": None,
+            "predicted_wait_time": None,
+            "note": "No live or forecast wait-time data available."
+        }
+    best = min(candidates, key=lambda f: f["predicted_wait_minutes"])
     return {
-        "hospital": "AI-Predicted Hospital",
-        "predicted_wait_time": random.randint(30, 150),
-        "note": "Fallback AI prediction due to stale/unavailable live data."
+        "hospital": best["hospital"],
+        "predicted_wait_time": best["predicted_wait_minutes"],
+        "forecast_horizons": best["horizons"],
+        "note": "Forecast wait time — live data is stale or unavailable."
     }
 
 
@@ -186,100 +195,130 @@ def ai_predict_fallback():
 # REST Endpoint (region-based)
 # ---------------------------
 @router.get("/recommend")
-async def recommend(location: str = "Calgary"):
-    """Recommend best hospital using region filter + wait time only."""
-    ahs_data = await fetch_ahs_data()
-    if not ahs_data or not isinstance(ahs_data, list):
-        return ai_predict_fallback()
+async def recommend(request: Request, location: str = "Calgary"):
+    """Recommend best hospital using region filter + wait time only (ETag / 304 per snapshot)."""
+    hospitals, stale, version = await fetch_live_hospitals()
+    if not hospitals:
+        return wire_format.respond(request, ai_predict_fallback(location))
+
+    # Same snapshot + same region -> same answer, encoded and compressed once
+    return http_cache.snapshot_response(request, _region_bodies, version, location.lower(),
+                                        lambda: recommend_in_region(hospitals, stale, location))
 
+
+def wait_status(wait_minutes) -> str:
+    if wait_minutes is None:
+        return "❔ Wait time unavailable"
+    return "✅ Recommended" if wait_minutes <= WAIT_TIME_THRESHOLD else "⚠️ Long wait"
+
+
+def recommend_in_region(hospitals: list, stale: bool, location: str) -> dict:
     nearby_hospitals = [
-        h for h in ahs_data
-        if isinstance(h, dict) and location.lower() in h.get("region", "").lower()
+        h for h in hospitals
+        if location.lower() in (h.get("region") or "").lower()
     ]
 
     if not nearby_hospitals:
         raise HTTPException(status_code=404, detail="No hospitals found for this location.")
 
-    best_hospital = min(
-        nearby_hospitals,
-        key=lambda x: parse_wait_time(x.get("wait_time", "0"))
-    )
-    wait_time = parse_wait_time(best_hospital.get("wait_time", "0"))
-    status = "✅ Recommended" if wait_time <= WAIT_TIME_THRESHOLD else "⚠️ Long wait"
+    waits = {id(h): effective_wait_minutes(h.get("name"), h.get("wait_time"), stale) for h in nearby_hospitals}
+    # Unknown waits ("Not available", no forecast) rank last instead of as 0 minutes
+    best_hospital = min(nearby_hospitals, key=lambda x: (waits[id(x)][0] is None, waits[id(x)][0] or 0))
+    wait_time, source = waits[id(best_hospital)]
+    status = wait_status(wait_time)
 
-    return {
+    result = {
         "hospital": best_hospital.get("name"),
         "wait_time": best_hospital.get("wait_time"),
         "status": status,
         "recommendation": "Best option in region based on current data."
     }
+    if source == "forecast":
+        result["predicted_wait_time"] = wait_time
+        result["recommendation"] = "Best option in region based on forecast wait times."
+    return result
 
 # ---------------------------
 # REST Endpoint (GPS-based, normalized & flattened with fuzzy matching)
 # ---------------------------
 
 @router.get("/recommend/gps")
-async def recommend_gps(lat: float = Query(...), lng: float = Query(...)):
+async def recommend_gps(request: Request, lat: float = Query(...), lng: float = Query(...)):
     """Recommend top 3 hospitals using patient GPS + wait time + distance with full details."""
-    ahs_data = await fetch_ahs_data()
-    if not ahs_data or not isinstance(ahs_data, list):
-        return ai_predict_fallback()
+    hospitals, stale, version = await fetch_live_hospitals()
+    if not hospitals:
+        # No live data at all: rank the hospitals we have forecasts for
+        hospitals = [
+            {"name": f["hospital"], "wait_time": None, "category": f.get("category"),
+             "region": f.get("region"), "note": "Forecast wait time"}
+            for f in wait_forecast.all_forecasts()
+        ]
+        if not hospitals:
+            return wire_format.respond(request, ai_predict_fallback())
+        version = None  # forecast-only rankings are not cached
+
+    # Same cell + same snapshot -> same list; computed once at the cell centre
+    async def compute(cell_lat: float, cell_lng: float):
+        return rank_hospitals_gps(hospitals, stale, cell_lat, cell_lng)
+
+    sorted_recommendations = await reco_cache.get_or_compute("gps", version, "all", lat, lng, compute)
 
-    # Normalize hospital coordinates keys
-    HOSPITAL_COORDS_NORMALIZED = {k.lower().strip(): v for k, v in HOSPITAL_COORDS.items()}
+   # --- Log the final top recommendations ---
+    logger.info(f"Top GPS-based hospital recommendations: {sorted_recommendations}")
+    return wire_format.respond(request, {
+        "patient_location": {"lat": lat, "lng": lng},
+        "top_recommendations": sorted_recommendations
+    })
 
+
+def rank_hospitals_gps(hospitals: list, stale: bool, lat: float, lng: float) -> list:
+    """Top 3 hospitals for a location by wait time + drive time."""
     recommendations = []
-    for h in ahs_data:
-        if not isinstance(h, dict):
-            continue
+    for h in hospitals:
         hospital_name = h.get("name") or h.get("Name")
-        wait_str = h.get("wait_time") or h.get("WaitTime") or "0"
+        wait_str = h.get("wait_time") or h.get("WaitTime")
         category = h.get("category") or h.get("Category") or "Unknown"
         region = h.get("region") or h.get("Region") or "Unknown"
         note = h.get("note") or h.get("Note") or ""
 
-        wait_minutes = parse_wait_time(wait_str)
-        coords = None
+        wait_minutes, wait_source = effective_wait_minutes(hospital_name, wait_str, stale)
 
-        # Fuzzy match hospital name to coordinates
-        if HOSPITAL_COORDS_NORMALIZED and hospital_name:
-            match_name, score, _ = process.extractOne(
-                hospital_name.lower(),
-                HOSPITAL_COORDS_NORMALIZED.keys()
-            )
-            if score >= 80:
-                coords = HOSPITAL_COORDS_NORMALIZED[match_name]
+        # Join on the canonical facility ID (no per-request fuzzy matching)
+        facility_id = facility_registry.lookup(hospital_name) if hospital_name else None
+        coords = facility_registry.get(facility_id)
+        if coords and coords["lat"] is None:
+            coords = None
 
         distance_km = haversine(lat, lng, coords["lat"], coords["lng"]) if coords else None
-        score_metric = wait_minutes + (distance_km * 2 if distance_km else 0)
+        drive = travel_time.drive_minutes(lat, lng, facility_id, coords["lat"], coords["lng"]) if coords else None
+        score_metric = (wait_minutes or 0) + (drive or 0)
 
         recommendations.append({
             "hospital": hospital_name,
-            "wait_time": wait_str,           # keep actual wait time
+            "facility_id": facility_id,
+            "wait_time": wait_str or "0",    # keep actual wait time
+            "wait_minutes": wait_minutes,
+            "wait_source": wait_source,      # "live", "forecast" or "unknown"
             "note": note,
             "category": category,
             "region": region,
             "distance_km": round(distance_km, 1) if distance_km else None,
+            "drive_minutes": drive,
             "score": round(score_metric, 1)
         })
 
     if not recommendations:
         raise HTTPException(status_code=404, detail="No hospitals available for recommendation.")
 
-    # Sort by score (wait + distance) and pick top 3
-    sorted_recommendations = sorted(recommendations, key=lambda x: x["score"])[:3]
+    # Sort by score (wait + drive time), unknown waits last, and pick top 3
+    sorted_recommendations = sorted(recommendations, key=lambda x: (x["wait_minutes"] is None, x["score"]))[:3]
 
     # Add status and recommendation text
     for idx, r in enumerate(sorted_recommendations):
-        r["status"] = "✅ Recommended" if parse_wait_time(r["wait_time"]) <= WAIT_TIME_THRESHOLD else "⚠️ Long wait"
-        r["recommendation"] = "Balanced choice (wait time + distance)" if idx == 0 else "Alternative option"
+        r["status"] = wait_status(r["wait_minutes"])
+        r["recommendation"] = "Balanced choice (wait time + drive time)" if idx == 0 else "Alternative option"
 
-   # --- Log the final top recommendations ---
-    logger.info(f"Top GPS-based hospital recommendations: {sorted_recommendations}")
-    return {
-        "patient_location": {"lat": lat, "lng": lng},
-        "top_recommendations": sorted_recommendations
-    }
+    return sorted_recommendations
 
 
 # @router.get("/recommend/gps")
@@ -360,13 +399,18 @@ async def recommend_gps(lat: float = Query(...), lng: float = Query(...)):
 # ---------------------------
 @router.websocket("/ws/recommend")
 async def websocket_recommend(websocket: WebSocket):
-    """Stream live AHS wait times to WebSocket clients."""
-    await websocket.accept()
+    """Stream live AHS wait times to WebSocket clients (`?encoding=msgpack` for binary frames)."""
+    fmt, subprotocol = wire_format.websocket_format(websocket)
+    await websocket.accept(subprotocol=subprotocol)
     try:
         while True:
-            ahs_data = await fetch_ahs_data()
-            update = ahs_data if ahs_data else ai_predict_fallback()
-            await websocket.send_json(update)
+            snapshot = await ahs_cache.get_snapshot(_fetch_from_ahs)
+            if snapshot:
+                # Every client on this worker gets the same encoded bytes for a snapshot
+                body = _stream_bodies.get(snapshot["version"], "ahs", fmt, lambda: snapshot["data"])
+                await wire_format.send_body(websocket, body, fmt)
+            else:
+                await wire_format.send(websocket, ai_predict_fallback(), fmt)
             await asyncio.sleep(60)
     except WebSocketDisconnect:
         print("❌ WebSocket client disconnected")
@@ -1,14 +1,152 @@
 # app/endpoints/triage.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.services.triage_service import process_triage
+from typing import Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from app.database import get_db, session_scope
+from app.services import admission, triage_batch
+from app.services.triage_service import degraded_triage, is_critical, process_triage, triage_events
 
 router = APIRouter()
 
+
+def _overloaded(payload: dict, exc: admission.Overloaded):
+    """Shed request: rules-only answer (default) or a fast 503 with Retry-After."""
+    if admission.degrade_on_overload():
+        return JSONResponse(degraded_triage(payload, "overload"), headers=admission.retry_headers(exc))
+    return JSONResponse({"detail": "Triage is at capacity, please retry shortly."}, status_code=503,
+                        headers=admission.retry_headers(exc))
+
+
 @router.post("/triage")
-def triage(payload: dict, db: Session = Depends(get_db)):
-    return process_triage(payload, db)
+async def triage(payload: dict, db: Session = Depends(get_db)):
+    # Bounded concurrency; safety-override payloads are admitted first
+    try:
+        ticket = await admission.triage.acquire(admission.priority_for(is_critical(payload)))
+    except admission.Overloaded as e:
+        return _overloaded(payload, e)
+    try:
+        return await process_triage(payload, db)
+    finally:
+        ticket.release()
+
+
+@router.post("/triage/stream", summary="Triage as Server-Sent Events (triage -> hospitals -> ack)")
+async def triage_stream(payload: dict):
+    """
+    Same pipeline as POST /triage, streamed: the `triage` event (level and action)
+    is sent as soon as classification finishes, then `hospitals`, then `ack` once
+    the audit is durable in the local WAL.
+    """
+    try:
+        ticket = await admission.triage.acquire(admission.priority_for(is_critical(payload)))
+    except admission.Overloaded as e:
+        if not admission.degrade_on_overload():
+            return _overloaded(payload, e)
+        frame = {"type": "triage", "final": True, **degraded_triage(payload, "overload")}
+        return StreamingResponse(iter([f"event: triage\ndata: {json.dumps(frame)}\n\n"]),
+                                 media_type="text/event-stream", headers=admission.retry_headers(e))
+
+    async def events():
+        try:
+            # Own session: request-scoped dependencies are closed before the body streams
+            with session_scope() as db:
+                async for frame in triage_events(payload, db):
+                    yield f"event: {frame['type']}\ndata: {json.dumps(frame)}\n\n"
+        finally:
+            ticket.release()
+
+    # The background task also runs if the client leaves before the stream starts
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+                             background=BackgroundTask(ticket.arelease))
+
+
+async def _spool_body(request: Request) -> Tuple[str, str]:
+    """Copy the request body to a temp file; returns its path and SHA-256.
+
+    StreamingResponse listens on `receive` for disconnects, so the body can't be
+    read lazily while results are streaming.
+    """
+    fd, path = tempfile.mkstemp(prefix="triage_batch_")
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in request.stream():
+                digest.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        _remove_spool(path)
+        raise
+    return path, digest.hexdigest()
+
+
+def _remove_spool(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass  # already removed by whichever cleanup ran first
+
+
+async def _finish_batch(ticket: admission.Ticket, path: str):
+    """Runs after the response, even when the client left before the body started."""
+    await ticket.arelease()
+    _remove_spool(path)
+
+
+@router.post("/triage/batch", summary="Score many triage payloads (NDJSON or CSV in, NDJSON out)")
+async def triage_batch_endpoint(
+    request: Request,
+    format: Optional[str] = Query(None, description="ndjson | csv (default: from Content-Type)"),
+    persist: bool = Query(False, description="Write audit rows and messages"),
+    hospitals: bool = Query(False, description="Include hospital recommendations"),
+):
+    """
+    One payload per NDJSON line (same fields as POST /triage, plus an optional `id`
+    echoed back), or CSV with a header row. Results stream back as NDJSON in input order.
+
+    With `persist`, re-sending the same body (or the same `Idempotency-Key` header)
+    doesn't write its audit rows twice.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if fmt not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    # Bulk jobs have their own small limit and never queue: a busy server answers 503 at once
+    try:
+        ticket = await admission.triage_batch.acquire()
+    except admission.Overloaded as e:
+        return JSONResponse({"detail": "Batch triage is at capacity, please retry later."}, status_code=503,
+                            headers=admission.retry_headers(e))
+    try:
+        path, body_hash = await _spool_body(request)
+    except BaseException:
+        ticket.release()
+        raise
+
+    async def lines():
+        f = open(path, "r", encoding="utf-8", newline="")
+        try:
+            chunks = triage_batch.score_stream(triage_batch.iter_payloads(f, fmt), hospitals=hospitals, persist=persist,
+                                               batch_id=request.headers.get("idempotency-key") or body_hash)
+            while True:
+                # Scoring is CPU-bound: keep it off the event loop, one chunk at a time
+                results = await asyncio.to_thread(next, chunks, None)
+                if results is None:
+                    break
+                yield "".join(json.dumps(r, default=str) + "\n" for r in results)
+        finally:
+            f.close()
+            _remove_spool(path)
+            ticket.release()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson",
+                             background=BackgroundTask(_finish_batch, ticket, path))
 
 
 
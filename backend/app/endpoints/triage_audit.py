@@ -0,0 +1,90 @@
+# app/endpoints/triage_audit.py
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import get_read_db, ReadSessionLocal
+from app.models.triage import TriageAudit, TriageMessage
+from app.services.pagination import MAX_PAGE_SIZE, keyset_iter, keyset_page
+
+router = APIRouter(prefix="/triage/audits", tags=["Triage Audit"])
+
+
+def audit_to_dict(a: TriageAudit) -> dict:
+    return {
+        "id": a.id,
+        "received_at": a.received_at.isoformat() if a.received_at else None,
+        "symptoms": a.symptoms,
+        "age": a.age,
+        "known_conditions": a.known_conditions,
+        "recommended_level": a.recommended_level,
+        "score": a.score,
+        "reasons": a.reasons,
+        "suggested_action": a.suggested_action,
+        "hospital_recommendation": a.hospital_recommendation,
+        "meta": a.meta,
+    }
+
+
+def message_to_dict(m: TriageMessage) -> dict:
+    return {
+        "id": m.id,
+        "audit_id": m.audit_id,
+        "created_at": m.created_at.isoformat() if m.created_at else None,
+        "direction": m.direction,
+        "text": m.text,
+        "meta": m.meta,
+    }
+
+
+def _audits_query(recommended_level: Optional[str]):
+    stmt = select(TriageAudit)
+    if recommended_level:
+        stmt = stmt.where(TriageAudit.recommended_level == recommended_level)
+    return stmt
+
+
+@router.get("", summary="Triage audit records, newest first (keyset-paginated)")
+def list_audits(
+    recommended_level: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        rows, next_cursor = keyset_page(
+            db, _audits_query(recommended_level), TriageAudit.received_at, TriageAudit.id, cursor, limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": [audit_to_dict(a) for a in rows], "next_cursor": next_cursor}
+
+
+@router.get("/export.ndjson", summary="Stream all matching audit records as NDJSON")
+def export_audits(recommended_level: Optional[str] = Query(None)):
+    stmt = _audits_query(recommended_level)
+
+    def lines():
+        for audit in keyset_iter(ReadSessionLocal, stmt, TriageAudit.received_at, TriageAudit.id):
+            yield json.dumps(audit_to_dict(audit), default=str) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/{audit_id}/messages", summary="Chat messages of one triage session")
+def list_messages(
+    audit_id: int,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
+):
+    stmt = select(TriageMessage).where(TriageMessage.audit_id == audit_id)
+    try:
+        rows, next_cursor = keyset_page(db, stmt, TriageMessage.created_at, TriageMessage.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": [message_to_dict(m) for m in rows], "next_cursor": next_cursor}
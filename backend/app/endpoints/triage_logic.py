@@ -1,7 +1,7 @@
 import json
 import re
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timezone
 
 from app.models.triage_models import TriageReqModel, TriageResult  # import Pydantic models
@@ -98,34 +98,50 @@ def clean_text(text):
     text = re.sub(r'\s+', ' ', text)             # Normalize whitespace
     return text.strip()
 
-def predict_from_text(symptoms_text: str, age: int, sex: int = 1) -> str:
-    """Predict triage level from symptom text using NLP model"""
-    if not nlp_model_data:  # ✅ Fixed: use the actual variable that holds tfidf + model
-        return None
+LEVEL_MAP = {
+    1: "Emergency",
+    2: "Emergency",
+    3: "Urgent",
+    4: "PrimaryCare",
+    5: "Pharmacy"
+}
+
+def predict_levels(texts: List[str], ages: List[int], sexes: List[int] = None,
+                   raise_errors: bool = False) -> List[Optional[str]]:
+    """Predict triage levels for many texts with one TF-IDF transform and one model call.
+
+    Entries whose cleaned text is empty come back as None (rules fallback). Model
+    errors are logged and also come back as None, unless `raise_errors` is set.
+    """
+    if not nlp_model_data:
+        return [None] * len(texts)
     try:
         tfidf = nlp_model_data['tfidf']
         model = nlp_model_data['model']
-        
-        clean = clean_text(symptoms_text)
-        if not clean:
-            return None
-            
-        X_tfidf = tfidf.transform([clean])
-        X_meta = [[age, sex]]
-        X_full = hstack([X_tfidf, X_meta])
-        
-        pred = model.predict(X_full)[0]
-        level_map = {
-            1: "Emergency",
-            2: "Emergency",
-            3: "Urgent",
-            4: "PrimaryCare",
-            5: "Pharmacy"
-        }
-        return level_map.get(pred, "PrimaryCare")
+
+        cleaned = [clean_text(t) for t in texts]
+        rows = [i for i, c in enumerate(cleaned) if c]
+        levels: List[Optional[str]] = [None] * len(texts)
+        if not rows:
+            return levels
+
+        sexes = sexes or [1] * len(texts)
+        X_tfidf = tfidf.transform([cleaned[i] for i in rows])
+        X_meta = [[ages[i], sexes[i]] for i in rows]
+        X_full = hstack([X_tfidf, X_meta]).tocsr()
+
+        for i, pred in zip(rows, model.predict(X_full)):
+            levels[i] = LEVEL_MAP.get(pred, "PrimaryCare")
+        return levels
     except Exception as e:
         print(f"⚠️ NLP prediction error: {e}")
-        return None
+        if raise_errors:
+            raise
+        return [None] * len(texts)
+
+def predict_from_text(symptoms_text: str, age: int, sex: int = 1) -> str:
+    """Predict triage level from symptom text using NLP model"""
+    return predict_levels([symptoms_text], [age], [sex])[0]
 
 # -------------------------------
 # Rule-based fallback
@@ -197,6 +213,46 @@ def _triage_logic_fallback(req: TriageReqModel) -> TriageResult:
 # -------------------------------
 # Hybrid Logic (NLP → Rules)
 # -------------------------------
+def nlp_result(req: TriageReqModel, predicted_level: str) -> TriageResult:
+    """Score, reasons and action for an NLP-predicted level."""
+    # Scoring based on level
+    score_map = {
+        "Emergency": 100,
+        "Urgent": 90,
+        "PrimaryCare": 80,
+        "Pharmacy": 60,
+        "SelfCare": 20   # ← Keep SelfCare low
+    }
+    score = score_map.get(predicted_level, 80)
+
+    # Boost score for high-risk factors
+    if req.age and req.age >= 65:
+        score = min(score + 10, 100)
+    if req.known_conditions:
+        score = min(score + 10, 100)
+
+    reasons = [f"NLP model prediction based on: '{req.symptoms}'"]
+    if req.age and req.age >= 65:
+        reasons.append("Age ≥ 65 increases risk")
+    if req.known_conditions:
+        reasons.append(f"Known conditions: {', '.join(req.known_conditions)} increase risk")
+
+    # ✅ Use _compose_response to generate valid suggested_action string
+    composed = _compose_response(predicted_level, score, reasons, req)
+    return TriageResult(
+        recommended_level=predicted_level,
+        score=score,
+        reasons=reasons,
+        suggested_action=composed.suggested_action,
+        hospital_recommendation=None,
+        meta={
+            "original_symptoms": req.symptoms,
+            "age": req.age,
+            "known_conditions": req.known_conditions or [],
+            "model_used": "NLP"
+        }
+    )
+
 def triage_logic(req: TriageReqModel) -> TriageResult:
     # ➤ STEP 1: Try NLP model if symptoms provided
     if nlp_model_data and req.symptoms:
@@ -206,44 +262,7 @@ def triage_logic(req: TriageReqModel) -> TriageResult:
             1  # default sex=1 if not provided
         )
         if predicted_level:
-            # Scoring based on level
-            score_map = {
-                "Emergency": 100,
-                "Urgent": 90,
-                "PrimaryCare": 80,
-                "Pharmacy": 60,
-                "SelfCare": 20   # ← Keep SelfCare low
-            }
-            score = score_map.get(predicted_level, 80)
-
-            # Boost score for high-risk factors
-            if req.age and req.age >= 65:
-                score = min(score + 10, 100)
-            if req.known_conditions:
-                score = min(score + 10, 100)
-
-            reasons = [f"NLP model prediction based on: '{req.symptoms}'"]
-            if req.age and req.age >= 65:
-                reasons.append("Age ≥ 65 increases risk")
-            if req.known_conditions:
-                reasons.append(f"Known conditions: {', '.join(req.known_conditions)} increase risk")
-                
-
-            # ✅ Use _compose_response to generate valid suggested_action string
-            composed = _compose_response(predicted_level, score, reasons, req)
-            return TriageResult(
-                recommended_level=predicted_level,
-                score=score,
-                reasons=reasons,
-                suggested_action=composed.suggested_action,
-                hospital_recommendation=None,
-                meta={
-                    "original_symptoms": req.symptoms,
-                    "age": req.age,
-                    "known_conditions": req.known_conditions or [],
-                    "model_used": "NLP"
-                }
-            )
+            return nlp_result(req, predicted_level)
 
     # ➤ STEP 2: Final fallback to rule-based engine
-    return _triage_logic_fallback(req)
\ No newline at end of file
+    return _triage_logic_fallback(req)
@@ -1,32 +1,140 @@
 # app/endpoints/triage_ws.py
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+import asyncio
 import json
-from app.database import get_db
-from app.services.triage_service import process_triage
+import os
+from app.database import session_scope
+from app.services import admission
+from app.services.triage_service import degraded_triage, is_critical, process_triage, triage_events
+from app.services.ws_keepalive import HEARTBEAT_INTERVAL, hold_open
 
 router = APIRouter()
 
-@router.websocket("/ws/triage")
-async def ws_triage(websocket: WebSocket, db: Session = Depends(get_db)):
-    await websocket.accept()
-    try:
+# ---------------------------
+# Config
+# ---------------------------
+MAX_IN_FLIGHT = int(os.getenv("WS_TRIAGE_MAX_IN_FLIGHT", "4"))  # concurrent requests per socket
+
+_END = object()  # end of one request's frames
+
+
+class TriageSocket:
+    """
+    One /ws/triage connection, multiplexed.
+
+    Each message may carry an `id`; every frame answering it echoes that id, so
+    several requests can be in flight at once (up to MAX_IN_FLIGHT — beyond that
+    the request is answered with a `busy` error). Replies are written by a
+    single writer task:
+
+      * ordered (default): replies leave in request order, so clients that
+        don't send ids see exactly the old one-request-one-reply behaviour;
+      * unordered (`?delivery=unordered`): each frame is sent as soon as it's ready.
+    """
+
+    def __init__(self, websocket: WebSocket, ordered: bool = True, max_in_flight: int = MAX_IN_FLIGHT):
+        self.websocket = websocket
+        self.ordered = ordered
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.send_lock = asyncio.Lock()
+        self.replies: asyncio.Queue = asyncio.Queue()  # ordered: one queue per request; unordered: frames
+        self.tasks = set()
+
+    async def send(self, frame: dict):
+        async with self.send_lock:
+            await self.websocket.send_text(json.dumps(frame))
+
+    async def writer(self):
         while True:
-            text = await websocket.receive_text()
-            try:
-                payload = json.loads(text)
-            except Exception:
-                await websocket.send_text(json.dumps({"response": "Invalid request format"}))
+            item = await self.replies.get()
+            if not self.ordered:
+                await self.send(item)
                 continue
+            while (frame := await item.get()) is not _END:
+                await self.send(frame)
 
-            # ✅ Await async triage processing
-            result = await process_triage(payload, db)
-            human_response = result.get("response", "No response generated")
+    def reply(self, frame: dict):
+        """Queue an immediate reply, keeping its place in ordered mode."""
+        if not self.ordered:
+            self.replies.put_nowait(frame)
+            return
+        out = asyncio.Queue()
+        out.put_nowait(frame)
+        out.put_nowait(_END)
+        self.replies.put_nowait(out)
 
-            # Send back humanized response along with full triage info
-            await websocket.send_text(json.dumps(result))
+    def submit(self, message: dict):
+        """Start processing one request (called from the read loop, never blocks)."""
+        if self.in_flight >= self.max_in_flight:
+            busy = {"type": "error", "error": "busy", "detail": f"Too many requests in flight (limit {self.max_in_flight})"}
+            self.reply(self.tag(busy, message.get("id")))
+            return
+        out = asyncio.Queue() if self.ordered else self.replies
+        if self.ordered:
+            self.replies.put_nowait(out)
+        self.in_flight += 1
+        task = asyncio.create_task(self.handle(message, out))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
 
+    async def handle(self, payload: dict, out: asyncio.Queue):
+        request_id = payload.get("id")
+        try:
+            # Same admission limits as POST /triage, shared across all sockets
+            async with admission.triage.slot(admission.priority_for(is_critical(payload))):
+                # ✅ One short-lived session per request; an idle socket holds no DB connection
+                with session_scope() as db:
+                    if payload.get("stream"):
+                        # Incremental protocol: triage -> hospitals -> ack frames as each stage finishes
+                        async for frame in triage_events(payload, db):
+                            await out.put(self.tag(frame, request_id))
+                    else:
+                        # Humanized response along with full triage info
+                        await out.put(self.tag(await process_triage(payload, db), request_id))
+        except admission.Overloaded as e:
+            await out.put(self.tag(self.overloaded(payload, e), request_id))
+        except Exception as e:
+            await out.put(self.tag({"type": "error", "error": "triage_failed", "detail": str(e)}, request_id))
+        finally:
+            self.in_flight -= 1
+            if self.ordered:
+                await out.put(_END)
+
+    @staticmethod
+    def overloaded(payload: dict, exc: admission.Overloaded) -> dict:
+        if not admission.degrade_on_overload():
+            return {"type": "error", "error": "overloaded", "retry_after": exc.retry_after}
+        result = degraded_triage(payload, "overload")
+        return {"type": "triage", "final": True, **result} if payload.get("stream") else result
+
+    @staticmethod
+    def tag(frame: dict, request_id) -> dict:
+        return {**frame, "id": request_id} if request_id is not None else frame
+
+    async def on_message(self, message: dict):
+        self.submit(message)
+
+    async def on_invalid(self, text: str):
+        self.reply({"response": "Invalid request format"})
+
+    async def close(self):
+        for task in list(self.tasks):
+            task.cancel()
+
+
+@router.websocket("/ws/triage")
+async def ws_triage(websocket: WebSocket):
+    await websocket.accept()
+    delivery = websocket.query_params.get("delivery", "ordered")
+    conn = TriageSocket(websocket, ordered=delivery != "unordered", max_in_flight=MAX_IN_FLIGHT)
+    writer = asyncio.create_task(conn.writer())
+    try:
+        # Reads keep going while requests are in flight; pings are answered immediately
+        await hold_open(websocket, on_message=conn.on_message, interval=HEARTBEAT_INTERVAL,
+                        send_lock=conn.send_lock, on_invalid=conn.on_invalid)
     except WebSocketDisconnect:
         print("⚠️ WebSocket disconnected")
-        return
-
+    finally:
+        writer.cancel()
+        await conn.close()
@@ -1,6 +1,22 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.datastructures import UploadFile
 from datetime import datetime
+from typing import Optional
+import json
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import get_db, get_read_db, ReadSessionLocal
+from app.endpoints.upload_csv import start_ingest_job
+from app.models.appointment import Appointment as AppointmentRow
+from app.models.facility import Facility
+from app.services import facility_registry
+from app.services.pagination import MAX_PAGE_SIZE, keyset_iter, keyset_page
+from app.utils.pseudonym import patient_pseudonym
 
 router = APIRouter()
 
@@ -9,24 +25,125 @@ class Appointment(BaseModel):
     patient_name: str
     hospital: str
     appointment_time: datetime
-
-# In-memory storage (replace with DB later)
-appointments = []
-
-@router.post("/upload-appointments")
-async def upload_appointments(appointment: Appointment):
+    modality: str = "unspecified"
+    status: str = "scheduled"
+
+def _as_dict(row: AppointmentRow, hospital: str) -> dict:
+    return {
+        "id": row.id,
+        "facility_id": row.facility_id,
+        "hospital": hospital,
+        "patient_id": row.patient_id,
+        "modality": row.modality,
+        "scheduled_time": row.scheduled_time,
+        "status": row.status,
+        "urgency": row.urgency,
+        "created_at": row.created_at,
+    }
+
+# JSON bodies on /upload-appointments are the original single-appointment contract
+DEPRECATION_HEADERS = {"Deprecation": "true", "Link": '</appointments>; rel="successor-version"'}
+
+@router.post("/upload-appointments", status_code=202)
+async def upload_appointments(request: Request, db: Session = Depends(get_db)):
+    """
+    Bulk-import appointments from a CSV sent as multipart form field `file`
+    (facility_name, patient_id, modality, scheduled_time, status; optional
+    region, urgency, referrer). Bad rows are reported per row without aborting
+    the import.
+
+    Deprecated: a JSON body with one appointment is still accepted and saved
+    as before (200, with Deprecation/Link headers); new callers should POST it
+    to /appointments.
+    """
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            appointment = Appointment.model_validate(await request.json())
+        except (ValueError, ValidationError) as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        row = await run_in_threadpool(_save_appointment, appointment, db)
+        body = {"message": "Appointment uploaded successfully",
+                "appointment": {**appointment.model_dump(), "id": row.id, "facility_id": row.facility_id}}
+        return JSONResponse(jsonable_encoder(body), headers=DEPRECATION_HEADERS)
+
+    form = await request.form()
+    file = form.get("file")
+    if not isinstance(file, UploadFile) or not (file.filename or "").endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Please upload a CSV file.")
+    return await start_ingest_job(file, "appointments")
+
+def _save_appointment(appointment: Appointment, db: Session) -> AppointmentRow:
+    facility_id = facility_registry.resolve(db, appointment.hospital)
+    row = AppointmentRow(
+        facility_id=facility_id,
+        patient_id=patient_pseudonym(appointment.patient_name),  # never the raw name
+        modality=appointment.modality,
+        scheduled_time=appointment.appointment_time,
+        status=appointment.status,
+    )
+    db.add(row)
+    db.commit()
+    db.refresh(row)
+    return row
+
+@router.post("/appointments")
+def create_appointment(appointment: Appointment, db: Session = Depends(get_db)):
     """
-    Upload a single appointment.
+    Add a single appointment.
     """
-    appointments.append(appointment.dict())
-    return {"message": "Appointment uploaded successfully", "appointment": appointment.dict()}
+    row = _save_appointment(appointment, db)
+    return {"message": "Appointment uploaded successfully", "appointment": _as_dict(row, appointment.hospital)}
+
+def _appointments_query(facility_id: Optional[int], status: Optional[str]):
+    stmt = select(AppointmentRow)
+    if facility_id is not None:
+        stmt = stmt.where(AppointmentRow.facility_id == facility_id)
+    if status:
+        stmt = stmt.where(AppointmentRow.status == status)
+    return stmt
+
+def _facility_names(facility_ids, db: Session) -> dict:
+    ids = {i for i in facility_ids if i is not None}
+    if not ids:
+        return {}
+    return dict(db.execute(select(Facility.id, Facility.name).where(Facility.id.in_(ids))).all())
 
 @router.get("/appointments")
-async def list_appointments():
+def list_appointments(
+    facility_id: Optional[int] = Query(None),
+    status: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
+):
     """
-    Get all uploaded appointments.
+    Appointments, newest first, keyset-paginated on (created_at, id).
     """
-    return appointments
+    try:
+        rows, next_cursor = keyset_page(
+            db, _appointments_query(facility_id, status), AppointmentRow.created_at, AppointmentRow.id, cursor, limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    names = _facility_names((r.facility_id for r in rows), db)
+    return {"items": [_as_dict(r, names.get(r.facility_id)) for r in rows], "next_cursor": next_cursor}
+
+@router.get("/appointments/export.ndjson")
+def export_appointments(facility_id: Optional[int] = Query(None), status: Optional[str] = Query(None)):
+    """
+    Stream every matching appointment as NDJSON (one JSON object per line).
+    """
+    stmt = _appointments_query(facility_id, status)
+
+    def lines():
+        names = {}
+        for row in keyset_iter(ReadSessionLocal, stmt, AppointmentRow.created_at, AppointmentRow.id):
+            if row.facility_id not in names:
+                with ReadSessionLocal() as db:
+                    names.update(_facility_names([row.facility_id], db))
+            yield json.dumps(_as_dict(row, names.get(row.facility_id)), default=str) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 
@@ -1,22 +1,85 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-import pandas as pd
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+import asyncio
+import os
+import tempfile
+
+from app.database import SessionLocal
+from app.models.ingest import IngestJob
+from app.services.csv_ingest import SCHEMAS, create_job, ingest_file, job_status
 
 router = APIRouter()
 
-@router.post("/upload-csv")
-async def upload_csv(file: UploadFile = File(...)):
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+_ingest_tasks = set()  # keep references so running ingests aren't garbage-collected
+
+
+async def spool_upload(file: UploadFile) -> str:
+    """Copy the upload to a temp file in 1 MB chunks (never holds the whole file)."""
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=".csv")
+    with os.fdopen(fd, "wb") as out:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            await asyncio.to_thread(out.write, chunk)
+    return path
+
+
+def _new_job(kind: str, filename: str, total_bytes: int) -> str:
+    db = SessionLocal()
+    try:
+        return create_job(db, kind, filename, total_bytes).id
+    finally:
+        db.close()
+
+
+def _run_ingest(job_id: str, path: str, kind: str):
+    try:
+        ingest_file(job_id, path, kind)
+    finally:
+        os.remove(path)
+
+
+async def start_ingest_job(file: UploadFile, kind: str) -> dict:
+    """Spool the upload, create the job row and ingest in a worker thread."""
+    path = await spool_upload(file)
+    try:
+        job_id = await asyncio.to_thread(_new_job, kind, file.filename, os.path.getsize(path))
+    except Exception as e:
+        os.remove(path)
+        raise HTTPException(status_code=500, detail=f"Failed to create ingest job: {e}")
+
+    task = asyncio.create_task(asyncio.to_thread(_run_ingest, job_id, path, kind))
+    _ingest_tasks.add(task)
+    task.add_done_callback(_ingest_tasks.discard)
+    return {"job_id": job_id, "status": "queued", "status_url": f"/upload-csv/jobs/{job_id}"}
+
+
+@router.post("/upload-csv", status_code=202)
+async def upload_csv(file: UploadFile = File(...), kind: str = Query("ed_waits")):
     """
-    Upload a CSV file and return its content as JSON.
+    Upload a CSV for bulk ingestion. Returns a job ID immediately; poll
+    /upload-csv/jobs/{job_id} for progress.
     """
     if not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="Only CSV files are allowed.")
-    
-    try:
-        df = pd.read_csv(file.file)
-        data = df.to_dict(orient="records")
-        return {"filename": file.filename, "data": data}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to process CSV: {e}")
+    if kind not in SCHEMAS:
+        raise HTTPException(status_code=400, detail=f"Unknown CSV kind. Expected one of: {sorted(SCHEMAS)}")
+    return await start_ingest_job(file, kind)
+
+
+@router.get("/upload-csv/jobs/{job_id}")
+async def get_ingest_job(job_id: str):
+    """Progress and result of a CSV ingest job."""
+    def load():
+        db = SessionLocal()
+        try:
+            job = db.get(IngestJob, job_id)
+            return job_status(job) if job else None
+        finally:
+            db.close()
+
+    status = await asyncio.to_thread(load)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Ingest job not found.")
+    return status
 
 
 
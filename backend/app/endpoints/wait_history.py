@@ -0,0 +1,44 @@
+# app/endpoints/wait_history.py
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_read_db
+from app.services.wait_history import BUCKETS, get_wait_history
+
+router = APIRouter(prefix="/wait-times", tags=["Wait Time History"])
+
+MAX_RANGE_DAYS = 90
+
+
+@router.get("/history", summary="Downsampled wait-time history for one hospital")
+def wait_time_history(
+    hospital: str = Query(..., description="Exact hospital name"),
+    start: Optional[datetime] = Query(None, description="Defaults to 7 days before end"),
+    end: Optional[datetime] = Query(None, description="Defaults to now"),
+    bucket: str = Query("1h", description=f"One of {', '.join(BUCKETS)}"),
+    db: Session = Depends(get_read_db),
+):
+    if bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {list(BUCKETS)}")
+
+    end_ts = int(end.timestamp()) if end else int(time.time())
+    start_ts = int(start.timestamp()) if start else end_ts - 7 * 86400
+    if start_ts >= end_ts:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if end_ts - start_ts > MAX_RANGE_DAYS * 86400:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_RANGE_DAYS} days")
+
+    points = get_wait_history(db, hospital, start_ts, end_ts, BUCKETS[bucket])
+    for p in points:
+        p["time"] = datetime.fromtimestamp(p["ts"], tz=timezone.utc).isoformat()
+    return {
+        "hospital": hospital,
+        "bucket": bucket,
+        "start": datetime.fromtimestamp(start_ts, tz=timezone.utc).isoformat(),
+        "end": datetime.fromtimestamp(end_ts, tz=timezone.utc).isoformat(),
+        "points": points,
+    }
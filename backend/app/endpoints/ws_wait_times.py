@@ -1,60 +1,66 @@
 # app/endpoints/ws_wait_times.py
-import asyncio
-import json
 import logging
-import requests
+from typing import Optional, Tuple
+from app.endpoints.recommend import _fetch_from_ahs
+from app.services import ahs_cache, facility_registry, wire_format, ws_fanout
+from app.services.ws_keepalive import hold_open
 from fastapi import WebSocket, WebSocketDisconnect
 
-# Shared across broadcast and websocket handler
-clients = set()
-latest_data = []
+# Local sockets live in ws_fanout.hub (shared with /ed-waits/ws); frames come from Redis pub/sub
+clients = ws_fanout.hub.clients
 
 logger = logging.getLogger("wait_times_ws")
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
-def fetch_wait_times():
-    url = "https://www.albertahealthservices.ca/WebApps/WaitTimes/api/WaitTimes"
-    r = requests.get(url, timeout=10)
-    data = r.json()
+def flatten_wait_times(data: dict) -> list:
     results = []
     for region, categories in data.items():
         for category, hospitals in categories.items():
             for hospital in hospitals:
+                # Registry coordinates make area subscriptions (bbox / near) possible
+                facility = facility_registry.get(facility_registry.lookup(hospital.get("Name") or ""))
                 results.append({
                     "region": region,
                     "category": category,
                     "name": hospital.get("Name"),
                     "wait_time": hospital.get("WaitTime"),
                     "note": hospital.get("Note"),
+                    "facility_id": facility["id"] if facility else None,
+                    "lat": facility["lat"] if facility else None,
+                    "lng": facility["lng"] if facility else None,
                 })
     return results
 
 
+async def fetch_snapshot() -> Optional[Tuple[str, list]]:
+    """(version, records) from the shared AHS snapshot — one upstream fetch across all workers."""
+    snapshot = await ahs_cache.get_snapshot(_fetch_from_ahs)
+    if not snapshot or not isinstance(snapshot["data"], dict):
+        return None
+    return snapshot["version"], flatten_wait_times(snapshot["data"])
+
+
 async def broadcast_data():
-    global latest_data
-    while True:
-        latest_data = fetch_wait_times()
-        logger.info(f"📡 Broadcasting {len(latest_data)} records to {len(clients)} clients.")
-        for ws in list(clients):
-            try:
-                await ws.send_text(json.dumps(latest_data))
-            except Exception as e:
-                clients.remove(ws)
-                logger.warning(f"⚠️ Removed client {id(ws)} due to error: {e}")
-        await asyncio.sleep(30)
+    """Publisher (if this worker holds the lease) + relay to this worker's sockets."""
+    await ws_fanout.run(fetch_snapshot)
 
 
 async def ws_ed_wait_times(websocket: WebSocket):
-    """Handle WebSocket connections and share the same clients set."""
-    await websocket.accept()
-    clients.add(websocket)
-    logger.info(f"✅ Client {id(websocket)} connected. Total: {len(clients)}")
+    """Handle WebSocket connections; updates arrive through the shared fan-out hub."""
+    # ?encoding=msgpack (or the msgpack subprotocol) switches snapshots to binary frames
+    fmt, subprotocol = wire_format.websocket_format(websocket)
+    await websocket.accept(subprotocol=subprotocol)
+    ws_fanout.hub.add(websocket, fmt=fmt)
+    logger.info(f"✅ Client {id(websocket)} connected ({fmt}). Total: {len(clients)}")
     try:
-        if latest_data:
-            await websocket.send_text(json.dumps(latest_data))
-        while True:
-            await asyncio.sleep(30)
+        await ws_fanout.hub.send_latest(websocket)
+        # pings/pongs and subscribe messages until the client goes away
+        await hold_open(websocket, on_message=lambda message: ws_fanout.handle_control(websocket, message))
     except WebSocketDisconnect:
-        clients.remove(websocket)
-        logger.info(f"🔌 Client {id(websocket)} disconnected. Total: {len(clients)}")
+        logger.info(f"🔌 Client {id(websocket)} disconnected. Total: {len(clients) - 1}")
+    finally:
+        ws_fanout.hub.discard(websocket)
+
+
+
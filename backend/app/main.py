@@ -1,22 +1,38 @@
 # app/main.py
 from fastapi import FastAPI
-from app.database import Base, engine
 from app.endpoints.fetch_ed_waits import router as fetch_ed_waits_router
 from app.endpoints.upload_csv import router as upload_csv_router
 from app.endpoints.upload_appointments import router as upload_appointments_router
 from app.endpoints.recommend import router as recommend_router
 from app.endpoints.triage import router as triage_router
+from app.endpoints.metrics import router as metrics_router
+from app.endpoints.wait_history import router as wait_history_router
+from app.endpoints.triage_audit import router as triage_audit_router
 from app.endpoints import ws_wait_times, triage_ws
-from app.startup_tasks import geocode_hospitals_on_startup  # ✅ import only the async geocoding
+from app.services import http_client, wait_forecast, travel_time, facility_registry, audit_spool
+from app.services.wire_format import FastJSONResponse
+from app.startup_tasks import geocode_hospitals_on_startup, run_audit_retention_scheduler
 import asyncio
 
-app = FastAPI(title="HealthFlow API", version="1.0.0")
+# orjson-backed JSON for every endpoint (falls back to the stdlib encoder if orjson is missing)
+app = FastAPI(title="HealthFlow API", version="1.0.0", default_response_class=FastJSONResponse)
 
 
 @app.on_event("startup")
 async def startup_event():
-    # Create database tables
-    Base.metadata.create_all(bind=engine)
+    # Schema is managed by migrations (`python -m app.migrate`, run before the server starts)
+
+    # Shared pooled HTTP client for AHS + geocoding calls
+    await http_client.startup()
+
+    # Memory-map the precomputed drive-time grid
+    travel_time.load_grid()
+
+    # Facility registry (name -> ID aliases, coordinates) into memory
+    try:
+        await asyncio.to_thread(facility_registry.ensure_loaded)
+    except Exception as e:
+        print("⚠️ Failed to load facility registry:", e)
 
     # Safely launch async hospital geocoding
     try:
@@ -25,6 +41,27 @@ async def startup_event():
     except Exception as e:
         print("⚠️ Failed to start hospital geocoding:", e)
 
+    # Precompute wait-time forecasts on a schedule
+    try:
+        asyncio.create_task(wait_forecast.run_forecast_scheduler())
+        print("✅ Wait-time forecast scheduler started")
+    except Exception as e:
+        print("⚠️ Failed to start forecast scheduler:", e)
+
+    # Load triage audits from the local write-ahead spool into Postgres
+    try:
+        asyncio.create_task(audit_spool.drain_loop())
+        print("✅ Audit WAL drainer started")
+    except Exception as e:
+        print("⚠️ Failed to start audit WAL drainer:", e)
+
+    # Audit partitions for the coming months + archival of expired ones (one worker per day)
+    try:
+        asyncio.create_task(run_audit_retention_scheduler())
+        print("✅ Audit retention scheduler started")
+    except Exception as e:
+        print("⚠️ Failed to start audit retention scheduler:", e)
+
     # Launch WebSocket broadcasting loop safely
     try:
         asyncio.create_task(ws_wait_times.broadcast_data())
@@ -33,12 +70,21 @@ async def startup_event():
         print("⚠️ Failed to start WebSocket broadcaster:", e)
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await http_client.shutdown()
+    await asyncio.to_thread(audit_spool.wal.close)  # seal the active segment for the next drain
+
+
 # Include HTTP routers
 app.include_router(fetch_ed_waits_router)
 app.include_router(upload_csv_router)
 app.include_router(upload_appointments_router)
 app.include_router(recommend_router)
 app.include_router(triage_router)
+app.include_router(wait_history_router)
+app.include_router(triage_audit_router)
+app.include_router(metrics_router)
 
 # Mount WebSocket endpoints
 app.add_api_websocket_route("/ws/ed-waits", ws_wait_times.ws_ed_wait_times)
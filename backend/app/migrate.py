@@ -0,0 +1,93 @@
+# app/migrate.py
+"""
+Minimal schema migration runner.
+
+Migrations live in app/migrations/mNNNN_<name>.py and define `upgrade(conn)`.
+Applied versions are recorded in schema_migrations; each migration runs in its
+own transaction, and on Postgres an advisory lock keeps concurrent runners
+(several app containers starting at once) from racing.
+
+    python -m app.migrate            # apply pending migrations
+    python -m app.migrate --status   # list applied / pending
+"""
+import argparse
+import importlib
+import logging
+import pkgutil
+from typing import List, Tuple
+
+from sqlalchemy import text
+
+from app.database import engine as default_engine
+import app.migrations as migrations_pkg
+
+logger = logging.getLogger("migrate")
+
+MIGRATIONS_LOCK_ID = 0x4846_4D47  # pg_advisory_lock key ("HFMG")
+
+
+def discover() -> List[Tuple[str, object]]:
+    found = []
+    for info in pkgutil.iter_modules(migrations_pkg.__path__):
+        if info.name.startswith("m") and info.name[1:5].isdigit():
+            found.append((info.name, importlib.import_module(f"app.migrations.{info.name}")))
+    return sorted(found, key=lambda m: m[0])
+
+
+def _ensure_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version VARCHAR(100) PRIMARY KEY,"
+        " applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    ))
+
+
+def applied_versions(conn) -> set:
+    _ensure_table(conn)
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def upgrade(bind=None) -> List[str]:
+    """Apply all pending migrations in order; returns the versions applied."""
+    bind = bind or default_engine
+    is_pg = bind.dialect.name == "postgresql"
+    applied_now = []
+    with bind.connect() as lock_conn:
+        if is_pg:
+            lock_conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": MIGRATIONS_LOCK_ID})
+        try:
+            with bind.begin() as conn:
+                done = applied_versions(conn)
+            for version, module in discover():
+                if version in done:
+                    continue
+                logger.info(f"⬆️ Applying migration {version}")
+                with bind.begin() as conn:
+                    module.upgrade(conn)
+                    conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:v)"), {"v": version})
+                applied_now.append(version)
+        finally:
+            if is_pg:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": MIGRATIONS_LOCK_ID})
+                lock_conn.commit()
+    if applied_now:
+        logger.info(f"✅ Applied {len(applied_now)} migration(s): {', '.join(applied_now)}")
+    return applied_now
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Apply database migrations")
+    parser.add_argument("--status", action="store_true", help="Show applied and pending migrations")
+    args = parser.parse_args()
+    if args.status:
+        with default_engine.begin() as conn:
+            done = applied_versions(conn)
+        for version, _ in discover():
+            print(f"{'✅' if version in done else '⏳'} {version}")
+        return
+    upgrade()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+# app/migrations/__init__.py
+# Schema migrations, applied in order by `python -m app.migrate`.
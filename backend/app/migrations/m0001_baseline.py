@@ -0,0 +1,80 @@
+# app/migrations/m0001_baseline.py
+"""Tables as they existed before migrations (previously created by create_all at startup)."""
+from sqlalchemy import (
+    BigInteger, Column, Float, ForeignKey, Index, Integer, JSON, MetaData, SmallInteger, String, Table, Text,
+    TIMESTAMP, DateTime, func,
+)
+
+
+def upgrade(conn):
+    # A frozen copy of the schema — later model changes must not leak into this step.
+    md = MetaData()
+    Table("triage_audit", md,
+          Column("id", Integer, primary_key=True),
+          Column("received_at", DateTime, nullable=False),
+          Column("symptoms", Text, nullable=False),
+          Column("age", Integer),
+          Column("known_conditions", JSON),
+          Column("recommended_level", String(50)),
+          Column("score", Integer),
+          Column("reasons", JSON),
+          Column("suggested_action", Text),
+          Column("hospital_recommendation", Text),
+          Column("meta", JSON))
+    Table("triage_message", md,
+          Column("id", Integer, primary_key=True),
+          Column("audit_id", Integer, ForeignKey("triage_audit.id")),
+          Column("created_at", DateTime, nullable=False),
+          Column("direction", String(10), nullable=False),
+          Column("text", Text, nullable=False),
+          Column("meta", JSON))
+    Table("wait_time_samples", md,
+          Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+          Column("hospital", String(200), nullable=False),
+          Column("category", String(20)),
+          Column("observed_ts", BigInteger, nullable=False),
+          Column("wait_minutes", SmallInteger, nullable=False),
+          Index("ix_wait_samples_hospital_ts", "hospital", "observed_ts"),
+          Index("ix_wait_samples_observed_brin", "observed_ts", postgresql_using="brin"))
+    Table("facilities", md,
+          Column("id", Integer, primary_key=True),
+          Column("name", String(200), unique=True, nullable=False),
+          Column("region", String(100)),
+          Column("modality", String),
+          Column("lat", Float),
+          Column("lng", Float),
+          Column("created_at", TIMESTAMP(timezone=True), server_default=func.now()))
+    Table("facility_aliases", md,
+          Column("alias", String(200), primary_key=True),
+          Column("facility_id", Integer, ForeignKey("facilities.id", ondelete="CASCADE"), nullable=False, index=True),
+          Column("source", String(20), nullable=False),
+          Column("created_at", TIMESTAMP(timezone=True), server_default=func.now()))
+    Table("ingest_jobs", md,
+          Column("id", String(36), primary_key=True),
+          Column("kind", String(40), nullable=False),
+          Column("filename", String(255)),
+          Column("status", String(20), nullable=False),
+          Column("total_bytes", BigInteger),
+          Column("bytes_read", BigInteger, nullable=False),
+          Column("rows_loaded", BigInteger, nullable=False),
+          Column("rows_rejected", BigInteger, nullable=False),
+          Column("errors", JSON),
+          Column("created_at", TIMESTAMP(timezone=True), server_default=func.now()),
+          Column("started_at", TIMESTAMP(timezone=True)),
+          Column("finished_at", TIMESTAMP(timezone=True)))
+    Table("staging_ed_waits", md,
+          Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+          Column("job_id", String(36), nullable=False, index=True),
+          Column("hospital_name", String(200), nullable=False),
+          Column("wait_time_minutes", Integer, nullable=False))
+    Table("appointments", md,
+          Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+          Column("facility_id", Integer, ForeignKey("facilities.id", ondelete="CASCADE"), nullable=False),
+          Column("patient_id", String(64)),
+          Column("modality", String(50), nullable=False),
+          Column("scheduled_time", TIMESTAMP(timezone=True), nullable=False),
+          Column("status", String(20), nullable=False),
+          Column("urgency", String(20)),
+          Column("referrer", Text),
+          Column("created_at", TIMESTAMP(timezone=True), server_default=func.now()))
+    md.create_all(conn, checkfirst=True)
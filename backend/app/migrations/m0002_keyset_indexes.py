@@ -0,0 +1,18 @@
+# app/migrations/m0002_keyset_indexes.py
+"""Composite indexes for keyset pagination (tables created before they were declared)."""
+from sqlalchemy import text
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_appointments_facility_scheduled ON appointments (facility_id, scheduled_time)",
+    "CREATE INDEX IF NOT EXISTS ix_appointments_created ON appointments (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_appointments_facility_created ON appointments (facility_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_appointments_status_created ON appointments (status, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_triage_audit_received ON triage_audit (received_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_triage_audit_level_received ON triage_audit (recommended_level, received_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_triage_message_audit_created ON triage_message (audit_id, created_at, id)",
+]
+
+
+def upgrade(conn):
+    for ddl in INDEXES:
+        conn.execute(text(ddl))
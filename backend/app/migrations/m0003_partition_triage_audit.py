@@ -0,0 +1,136 @@
+# app/migrations/m0003_partition_triage_audit.py
+"""
+Postgres: rebuild triage_audit / triage_message as monthly range-partitioned
+tables with JSONB columns and targeted GIN indexes, copying existing rows.
+
+Partitioned tables need the partition key in the primary key, so the PKs
+become (id, received_at) / (id, created_at) and the message -> audit foreign
+key is dropped (the relationship is kept in the ORM). The bot message no longer
+duplicates the audit payload; its text is just the response.
+
+No-op on other dialects (SQLite in tests keeps plain tables).
+"""
+from datetime import date
+
+from sqlalchemy import text
+
+# Frozen copy of the partition layout at the time of this migration (the live
+# job in app/services/audit_retention.py may change without rewriting history)
+MONTHS_AHEAD = 3
+
+STATEMENTS = [
+    # Keep the id sequences; they move to the new tables.
+    "ALTER TABLE triage_message RENAME TO triage_message_legacy",
+    "ALTER TABLE triage_audit RENAME TO triage_audit_legacy",
+    # Free the constraint/index names for the new tables
+    "ALTER TABLE triage_audit_legacy RENAME CONSTRAINT triage_audit_pkey TO triage_audit_legacy_pkey",
+    "ALTER TABLE triage_message_legacy RENAME CONSTRAINT triage_message_pkey TO triage_message_legacy_pkey",
+    "DROP INDEX IF EXISTS ix_triage_audit_id, ix_triage_audit_received, ix_triage_audit_level_received",
+    "DROP INDEX IF EXISTS ix_triage_message_id, ix_triage_message_audit_created",
+    "ALTER SEQUENCE triage_audit_id_seq OWNED BY NONE",
+    "ALTER SEQUENCE triage_message_id_seq OWNED BY NONE",
+    """
+    CREATE TABLE triage_audit (
+        id BIGINT NOT NULL DEFAULT nextval('triage_audit_id_seq'),
+        received_at TIMESTAMP NOT NULL,
+        symptoms TEXT NOT NULL,
+        age INTEGER,
+        known_conditions JSONB,
+        recommended_level VARCHAR(50),
+        score INTEGER,
+        reasons JSONB,
+        suggested_action TEXT,
+        hospital_recommendation TEXT,
+        meta JSONB,
+        PRIMARY KEY (id, received_at)
+    ) PARTITION BY RANGE (received_at)
+    """,
+    """
+    CREATE TABLE triage_message (
+        id BIGINT NOT NULL DEFAULT nextval('triage_message_id_seq'),
+        audit_id BIGINT,
+        created_at TIMESTAMP NOT NULL,
+        direction VARCHAR(10) NOT NULL,
+        text TEXT NOT NULL,
+        meta JSONB,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at)
+    """,
+    "ALTER SEQUENCE triage_audit_id_seq OWNED BY triage_audit.id",
+    "ALTER SEQUENCE triage_message_id_seq OWNED BY triage_message.id",
+    # Rows outside every monthly partition (clock skew, backfills) still have a home
+    "CREATE TABLE triage_audit_default PARTITION OF triage_audit DEFAULT",
+    "CREATE TABLE triage_message_default PARTITION OF triage_message DEFAULT",
+]
+
+INDEXES = [
+    "CREATE INDEX ix_triage_audit_id ON triage_audit (id)",
+    "CREATE INDEX ix_triage_message_id ON triage_message (id)",
+    "CREATE INDEX ix_triage_audit_received ON triage_audit (received_at, id)",
+    "CREATE INDEX ix_triage_audit_level_received ON triage_audit (recommended_level, received_at, id)",
+    "CREATE INDEX ix_triage_message_audit_created ON triage_message (audit_id, created_at, id)",
+    # Containment queries (known_conditions @> '["asthma"]') — jsonb_path_ops is smaller and faster for @>
+    "CREATE INDEX ix_triage_audit_conditions_gin ON triage_audit USING gin (known_conditions jsonb_path_ops)",
+    "CREATE INDEX ix_triage_audit_reasons_gin ON triage_audit USING gin (reasons jsonb_path_ops)",
+]
+
+COPY_ROWS = [
+    """
+    INSERT INTO triage_audit (id, received_at, symptoms, age, known_conditions, recommended_level, score,
+                              reasons, suggested_action, hospital_recommendation, meta)
+    SELECT id, received_at, symptoms, age, known_conditions::jsonb, recommended_level, score,
+           reasons::jsonb, suggested_action, hospital_recommendation, meta::jsonb
+    FROM triage_audit_legacy
+    """,
+    # Bot messages used to repeat the whole audit payload; keep only the response text
+    """
+    INSERT INTO triage_message (id, audit_id, created_at, direction, text, meta)
+    SELECT id, audit_id, created_at, direction,
+           CASE WHEN direction = 'bot' AND text LIKE '{%'
+                THEN jsonb_build_object('response', text::jsonb -> 'response')::text
+                ELSE text END,
+           meta::jsonb
+    FROM triage_message_legacy
+    """,
+]
+
+
+def _add_months(d: date, months: int) -> date:
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_partitions(conn, start: date):
+    """Monthly partitions of both tables from `start` through MONTHS_AHEAD months from now."""
+    last = _add_months(date.today().replace(day=1), MONTHS_AHEAD)
+    for parent in ("triage_audit", "triage_message"):
+        month = start.replace(day=1)
+        while month <= last:
+            upper = _add_months(month, 1)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {parent}_p{month.year:04d}_{month.month:02d} PARTITION OF {parent} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+            ))
+            month = upper
+
+
+def upgrade(conn):
+    if conn.dialect.name != "postgresql":
+        return
+    for ddl in STATEMENTS:
+        conn.execute(text(ddl))
+
+    oldest = conn.execute(text(
+        "SELECT LEAST((SELECT MIN(received_at) FROM triage_audit_legacy),"
+        "             (SELECT MIN(created_at) FROM triage_message_legacy))"
+    )).scalar()
+    _create_partitions(conn, start=oldest.date() if oldest else date.today())
+
+    for ddl in INDEXES:
+        conn.execute(text(ddl))
+    for dml in COPY_ROWS:
+        conn.execute(text(dml))
+    conn.execute(text("SELECT setval('triage_audit_id_seq', COALESCE((SELECT MAX(id) FROM triage_audit), 0) + 1, false)"))
+    conn.execute(text("SELECT setval('triage_message_id_seq', COALESCE((SELECT MAX(id) FROM triage_message), 0) + 1, false)"))
+    conn.execute(text("DROP TABLE triage_message_legacy"))
+    conn.execute(text("DROP TABLE triage_audit_legacy"))
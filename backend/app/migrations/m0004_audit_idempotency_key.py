@@ -0,0 +1,17 @@
+# app/migrations/m0004_audit_idempotency_key.py
+"""
+triage_audit.idempotency_key for the audit WAL drainer, unique together with
+received_at (the partition key on Postgres). Existing rows keep NULL, which
+never conflicts.
+"""
+from sqlalchemy import inspect, text
+
+
+def upgrade(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("triage_audit")}
+    if "idempotency_key" not in columns:
+        conn.execute(text("ALTER TABLE triage_audit ADD COLUMN idempotency_key VARCHAR(32)"))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_triage_audit_idempotency"
+        " ON triage_audit (idempotency_key, received_at)"
+    ))
@@ -0,0 +1,26 @@
+# app/models/appointment.py
+from sqlalchemy import Column, Integer, BigInteger, String, Text, TIMESTAMP, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base  # uses your existing Base
+
+class Appointment(Base):
+    __tablename__ = "appointments"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    facility_id = Column(Integer, ForeignKey("facilities.id", ondelete="CASCADE"), nullable=False)
+    patient_id = Column(String(64))  # hashed or anonymized
+    modality = Column(String(50), nullable=False)
+    scheduled_time = Column(TIMESTAMP(timezone=True), nullable=False)
+    status = Column(String(20), nullable=False)
+    urgency = Column(String(20))
+    referrer = Column(Text)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Per-facility schedule reads (also serves facility_id-only filters)
+        Index("ix_appointments_facility_scheduled", "facility_id", "scheduled_time"),
+        # Keyset pagination: unfiltered, by facility and by status
+        Index("ix_appointments_created", "created_at", "id"),
+        Index("ix_appointments_facility_created", "facility_id", "created_at", "id"),
+        Index("ix_appointments_status_created", "status", "created_at", "id"),
+    )
@@ -0,0 +1,26 @@
+# app/models/facility.py
+from sqlalchemy import Column, Integer, String, Float, TIMESTAMP, ForeignKey
+from sqlalchemy.sql import func
+from app.database import Base  # uses your existing Base
+
+class Facility(Base):
+    """Canonical facility with a stable ID; every other table joins on facilities.id."""
+    __tablename__ = "facilities"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(200), unique=True, nullable=False)
+    region = Column(String(100), nullable=True)
+    modality = Column(String)
+    lat = Column(Float, nullable=True)
+    lng = Column(Float, nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+
+class FacilityAlias(Base):
+    """Normalized spelling of a facility name -> facility ID (resolved once, then reused)."""
+    __tablename__ = "facility_aliases"
+
+    alias = Column(String(200), primary_key=True)
+    facility_id = Column(Integer, ForeignKey("facilities.id", ondelete="CASCADE"), nullable=False, index=True)
+    source = Column(String(20), nullable=False, default="seed")  # seed | new | provisional (fuzzy, for review)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
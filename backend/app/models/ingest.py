@@ -0,0 +1,31 @@
+# app/models/ingest.py
+from sqlalchemy import Column, Integer, BigInteger, String, JSON, TIMESTAMP
+from sqlalchemy.sql import func
+from app.database import Base  # uses your existing Base
+
+class IngestJob(Base):
+    """One bulk CSV upload; progress is visible to every worker while it runs."""
+    __tablename__ = "ingest_jobs"
+
+    id = Column(String(36), primary_key=True)
+    kind = Column(String(40), nullable=False)
+    filename = Column(String(255))
+    status = Column(String(20), nullable=False, default="queued")  # queued | running | done | failed
+    total_bytes = Column(BigInteger)
+    bytes_read = Column(BigInteger, nullable=False, default=0)
+    rows_loaded = Column(BigInteger, nullable=False, default=0)
+    rows_rejected = Column(BigInteger, nullable=False, default=0)
+    errors = Column(JSON)  # first N per-row errors: [{"row": 12, "error": "..."}]
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    started_at = Column(TIMESTAMP(timezone=True))
+    finished_at = Column(TIMESTAMP(timezone=True))
+
+
+class StagingEdWait(Base):
+    """Raw ED wait-time rows loaded by /upload-csv (kind=ed_waits), tagged with their job."""
+    __tablename__ = "staging_ed_waits"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    job_id = Column(String(36), nullable=False, index=True)
+    hospital_name = Column(String(200), nullable=False)
+    wait_time_minutes = Column(Integer, nullable=False)
@@ -1,33 +1,61 @@
 # app/models/triage.py
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Text, DateTime, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base  # uses your existing Base
 
+# On Postgres both tables are partitioned by month (see app/migrations/m0003 and
+# app/services/audit_retention.py); the DB primary key is (id, <partition key>)
+# and there is no DB-level FK from messages to audits.
+Id = BigInteger().with_variant(Integer, "sqlite")  # SQLite only autoincrements INTEGER
+JsonDoc = JSON().with_variant(JSONB, "postgresql")
+
 class TriageAudit(Base):
     __tablename__ = "triage_audit"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Id, primary_key=True, index=True)
     received_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     symptoms = Column(Text, nullable=False)
     age = Column(Integer, nullable=True)
-    known_conditions = Column(JSON, nullable=True)
+    known_conditions = Column(JsonDoc, nullable=True)
     recommended_level = Column(String(50), nullable=True)
     score = Column(Integer, nullable=True)
-    reasons = Column(JSON, nullable=True)
+    reasons = Column(JsonDoc, nullable=True)
     suggested_action = Column(Text, nullable=True)
     hospital_recommendation = Column(Text, nullable=True)
-    meta = Column(JSON, nullable=True)
+    meta = Column(JsonDoc, nullable=True)
+    # Set by the audit WAL (app/services/audit_spool.py) so replayed segments never duplicate rows
+    idempotency_key = Column(String(32), nullable=True)
 
     # optional relationship to chat messages
-    messages = relationship("TriageMessage", back_populates="audit", cascade="all, delete-orphan")
+    messages = relationship("TriageMessage", back_populates="audit", cascade="all, delete-orphan",
+                            primaryjoin="TriageAudit.id == foreign(TriageMessage.audit_id)")
+
+    __table_args__ = (
+        # Keyset pagination / time-range reads, newest first
+        Index("ix_triage_audit_received", "received_at", "id"),
+        Index("ix_triage_audit_level_received", "recommended_level", "received_at", "id"),
+        # Unique keys on a partitioned table must include the partition key
+        Index("ux_triage_audit_idempotency", "idempotency_key", "received_at", unique=True),
+        # Containment filters (?condition=asthma)
+        Index("ix_triage_audit_conditions_gin", "known_conditions",
+              postgresql_using="gin", postgresql_ops={"known_conditions": "jsonb_path_ops"}),
+        Index("ix_triage_audit_reasons_gin", "reasons",
+              postgresql_using="gin", postgresql_ops={"reasons": "jsonb_path_ops"}),
+    )
 
 class TriageMessage(Base):
     __tablename__ = "triage_message"
-    id = Column(Integer, primary_key=True, index=True)
-    audit_id = Column(Integer, ForeignKey("triage_audit.id"), nullable=True)
+    id = Column(Id, primary_key=True, index=True)
+    audit_id = Column(Id, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     direction = Column(String(10), nullable=False)  # "user" or "bot"
     text = Column(Text, nullable=False)
-    meta = Column(JSON, nullable=True)
+    meta = Column(JsonDoc, nullable=True)
+
+    audit = relationship("TriageAudit", back_populates="messages",
+                         primaryjoin="TriageAudit.id == foreign(TriageMessage.audit_id)")
 
-    audit = relationship("TriageAudit", back_populates="messages")
+    __table_args__ = (
+        Index("ix_triage_message_audit_created", "audit_id", "created_at", "id"),
+    )
@@ -0,0 +1,19 @@
+# app/models/wait_time.py
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, String, Index
+from app.database import Base  # uses your existing Base
+
+class WaitTimeSample(Base):
+    """One hospital's wait time at one ingestion cycle (append-only time series)."""
+    __tablename__ = "wait_time_samples"
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    hospital = Column(String(200), nullable=False)
+    category = Column(String(20), nullable=True)
+    observed_ts = Column(BigInteger, nullable=False)  # epoch seconds (compact, dialect-neutral bucketing)
+    wait_minutes = Column(SmallInteger, nullable=False)
+
+    __table_args__ = (
+        # Per-hospital history range scans
+        Index("ix_wait_samples_hospital_ts", "hospital", "observed_ts"),
+        # Rows arrive in time order, so a BRIN index stays tiny for time-range scans
+        Index("ix_wait_samples_observed_brin", "observed_ts", postgresql_using="brin"),
+    )
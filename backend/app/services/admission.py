@@ -0,0 +1,186 @@
+# app/services/admission.py
+"""
+Admission control for the triage endpoints.
+
+Without a limit, a surge queues unbounded work in the event loop and the DB
+pool until every request times out together. Each route group instead gets
+
+* a concurrency limit (requests actually running);
+* a bounded wait queue, served highest priority first — payloads that hit
+  the clinical safety override jump ahead of everything else and may push
+  the newest normal request out of a full queue;
+* deadline-aware shedding: a request is refused immediately if the expected
+  wait already exceeds the route's max queue time, and dropped if its time
+  runs out while queued.
+
+A refused request raises `Overloaded` (with a Retry-After estimate) within
+microseconds; the endpoint answers 503 or a degraded rules-only result.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List
+
+# ---------------------------
+# Config
+# ---------------------------
+TRIAGE_CONCURRENCY = int(os.getenv("ADMISSION_TRIAGE_CONCURRENCY", "32"))
+TRIAGE_QUEUE = int(os.getenv("ADMISSION_TRIAGE_QUEUE", "64"))
+TRIAGE_MAX_WAIT = float(os.getenv("ADMISSION_TRIAGE_MAX_WAIT_MS", "1000")) / 1000
+BATCH_CONCURRENCY = int(os.getenv("ADMISSION_BATCH_CONCURRENCY", "2"))
+BATCH_QUEUE = int(os.getenv("ADMISSION_BATCH_QUEUE", "0"))  # bulk jobs never wait behind each other
+SHED_MODE = os.getenv("ADMISSION_SHED_MODE", "degrade")   # "degrade" (rules-only answer) | "reject" (503)
+
+PRIORITY_CRITICAL = 0  # matched the clinical safety override
+PRIORITY_NORMAL = 1
+
+_EWMA_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    def __init__(self, route: str, reason: str, retry_after: int):
+        super().__init__(f"{route} overloaded ({reason})")
+        self.route = route
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """An admitted request's slot; `release()` is idempotent."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self.controller = controller
+        self.started = time.monotonic()
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.controller._release(time.monotonic() - self.started)
+
+    async def arelease(self):
+        """For Starlette background tasks (sync callables would run in a thread)."""
+        self.release()
+
+
+class AdmissionController:
+    def __init__(self, route: str, limit: int, queue_size: int, max_wait: float):
+        self.route = route
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self._waiters: List[tuple] = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self.service_time = 0.05         # EWMA of seconds per admitted request
+        self.stats = {"admitted": 0, "queued": 0, "shed_full": 0, "shed_deadline": 0, "evicted": 0}
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    def expected_wait(self, ahead: int) -> float:
+        return self.service_time * (ahead + 1) / max(self.limit, 1)
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.expected_wait(self.queued)))
+
+    def _shed(self, reason: str) -> Overloaded:
+        self.stats[f"shed_{reason}"] += 1
+        return Overloaded(self.route, reason, self.retry_after())
+
+    def _ahead_of(self, priority: int) -> int:
+        return sum(1 for p, _, fut in self._waiters if p <= priority and not fut.done())
+
+    def _evict_newest(self, below: int) -> bool:
+        """Shed the newest queued request with a lower priority than `below`."""
+        victims = [w for w in self._waiters if w[0] > below and not w[2].done()]
+        if not victims:
+            return False
+        _, _, fut = max(victims, key=lambda w: (w[0], w[1]))
+        fut.set_exception(self._shed("full"))
+        self.stats["evicted"] += 1
+        return True
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL) -> Ticket:
+        if self.in_flight < self.limit and not self.queued:
+            self.in_flight += 1
+            self.stats["admitted"] += 1
+            return Ticket(self)
+
+        if self.expected_wait(self._ahead_of(priority)) > self.max_wait:
+            raise self._shed("deadline")  # would time out in the queue anyway: fail now
+        if self.queued >= self.queue_size and not self._evict_newest(priority):
+            raise self._shed("full")
+
+        fut = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._seq), fut)
+        heapq.heappush(self._waiters, entry)
+        self.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            if not fut.done():
+                fut.cancel()
+                raise self._shed("deadline")
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                self._release(0)  # handed a slot just as the caller went away
+            else:
+                fut.cancel()
+            raise
+        fut.result()  # raises Overloaded if evicted
+        self.stats["admitted"] += 1
+        return Ticket(self)
+
+    def _release(self, elapsed: float):
+        if elapsed:
+            self.service_time += _EWMA_ALPHA * (elapsed - self.service_time)
+        # Hand the slot straight to the best waiter (in_flight stays the same)
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_NORMAL):
+        ticket = await self.acquire(priority)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "queue_size": self.queue_size,
+            "service_ms": round(self.service_time * 1000, 1),
+            **self.stats,
+        }
+
+
+triage = AdmissionController("triage", TRIAGE_CONCURRENCY, TRIAGE_QUEUE, TRIAGE_MAX_WAIT)
+triage_batch = AdmissionController("triage_batch", BATCH_CONCURRENCY, BATCH_QUEUE, TRIAGE_MAX_WAIT)
+
+controllers: Dict[str, AdmissionController] = {c.route: c for c in (triage, triage_batch)}
+
+
+def retry_headers(exc: Overloaded) -> Dict[str, str]:
+    return {"Retry-After": str(exc.retry_after)}
+
+
+def degrade_on_overload() -> bool:
+    return SHED_MODE != "reject"
+
+
+def priority_for(critical: bool) -> int:
+    return PRIORITY_CRITICAL if critical else PRIORITY_NORMAL
+
@@ -0,0 +1,196 @@
+# app/services/ahs_cache.py
+"""
+Two-tier cache for the AHS wait-times payload.
+
+L1 is a short-lived copy inside each worker process. L2 is a shared snapshot in
+Redis that every worker and pod reads. A Redis lease (SET NX PX) makes sure only
+one worker refreshes from AHS per TTL; the others wait briefly for the new
+snapshot or keep serving the previous one.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from redis.exceptions import RedisError
+
+from app.services.redis_client import async_r
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, JSON is the fallback encoding
+    msgpack = None
+
+logger = logging.getLogger("ahs_cache")
+
+# ---------------------------
+# Config
+# ---------------------------
+CACHE_TTL = int(os.getenv("AHS_CACHE_TTL", "300"))            # snapshot freshness (seconds)
+L1_TTL = int(os.getenv("AHS_L1_TTL", "15"))                   # how often a worker re-checks Redis
+SNAPSHOT_RETENTION = int(os.getenv("AHS_SNAPSHOT_RETENTION", "86400"))  # keep stale copy for outages
+LOCK_LEASE_MS = int(os.getenv("AHS_LOCK_LEASE_MS", "20000"))  # must exceed the AHS fetch timeout
+LOCK_WAIT_SEC = float(os.getenv("AHS_LOCK_WAIT_SEC", "5"))    # how long followers wait for the leader
+
+SNAPSHOT_KEY = "ahs:snapshot"
+LOCK_KEY = "ahs:refresh_lock"
+
+# Only delete the lock if we still own it (the lease may have expired and been re-taken)
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_redis = async_r
+_l1: Dict[str, Any] = {"snapshot": None, "checked_at": 0.0, "retry_after": 0.0}
+_refresh_lock = asyncio.Lock()  # collapses concurrent misses inside one worker
+
+
+# ---------------------------
+# Encoding
+# ---------------------------
+def encode_snapshot(snapshot: dict) -> bytes:
+    if msgpack is not None:
+        return msgpack.packb(snapshot, use_bin_type=True)
+    return json.dumps(snapshot, separators=(",", ":")).encode("utf-8")
+
+
+def decode_snapshot(raw: bytes) -> Optional[dict]:
+    if not raw:
+        return None
+    try:
+        if raw[:1] == b"{":
+            return json.loads(raw)
+        if msgpack is None:
+            return None
+        return msgpack.unpackb(raw, raw=False)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not decode shared AHS snapshot: {e}")
+        return None
+
+
+def build_snapshot(data: Any, fetched_at: Optional[float] = None) -> dict:
+    """Wrap an AHS payload with a content-derived version and fetch timestamp."""
+    digest = hashlib.sha1(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return {"version": digest, "fetched_at": fetched_at or time.time(), "data": data}
+
+
+def _is_fresh(snapshot: Optional[dict], now: float) -> bool:
+    return bool(snapshot) and (now - snapshot.get("fetched_at", 0)) < CACHE_TTL
+
+
+def _remember(snapshot: dict):
+    _l1["snapshot"] = snapshot
+    _l1["checked_at"] = time.time()
+
+
+def _serve_local(now: float) -> Optional[dict]:
+    local = _l1["snapshot"]
+    if _is_fresh(local, now) and (now - _l1["checked_at"]) < L1_TTL:
+        return local
+    if local and now < _l1["retry_after"]:
+        return local  # recent refresh failed; don't hammer AHS/Redis again yet
+    return None
+
+
+# ---------------------------
+# Shared tier (Redis)
+# ---------------------------
+async def _read_shared() -> Optional[dict]:
+    return decode_snapshot(await _redis.get(SNAPSHOT_KEY))
+
+
+async def _write_shared(snapshot: dict):
+    await _redis.set(SNAPSHOT_KEY, encode_snapshot(snapshot), ex=SNAPSHOT_RETENTION)
+
+
+async def _wait_for_leader(previous: Optional[dict]) -> Optional[dict]:
+    """Poll the shared snapshot while another worker holds the refresh lease."""
+    deadline = time.time() + LOCK_WAIT_SEC
+    while time.time() < deadline:
+        await asyncio.sleep(0.1)
+        shared = await _read_shared()
+        if _is_fresh(shared, time.time()):
+            return shared
+    return previous
+
+
+async def _refresh(fetch: Callable[[], Awaitable[Any]], stale: Optional[dict]) -> Optional[dict]:
+    token = uuid.uuid4().hex
+    try:
+        acquired = await _redis.set(LOCK_KEY, token, nx=True, px=LOCK_LEASE_MS)
+    except RedisError as e:
+        # Redis unavailable: behave like the old per-process cache
+        logger.warning(f"⚠️ Redis unavailable for AHS cache ({e}); fetching locally")
+        data = await fetch()
+        return build_snapshot(data) if data else stale
+
+    if not acquired:
+        logger.info("⏳ Another worker is refreshing AHS data — waiting for shared snapshot")
+        return await _wait_for_leader(stale)
+
+    try:
+        logger.info("⚠️ Cache miss — fetching fresh AHS wait times")
+        data = await fetch()
+        if not data:
+            return stale
+        snapshot = build_snapshot(data)
+        try:
+            await _write_shared(snapshot)
+            logger.info(f"✅ AHS snapshot {snapshot['version']} published to shared cache")
+        except RedisError as e:
+            logger.warning(f"⚠️ Could not publish AHS snapshot: {e}")
+        return snapshot
+    finally:
+        try:
+            await _redis.eval(_RELEASE_LOCK_SCRIPT, 1, LOCK_KEY, token)
+        except RedisError:
+            pass  # lease expires on its own
+
+
+# ---------------------------
+# Public API
+# ---------------------------
+async def get_snapshot(fetch: Callable[[], Awaitable[Any]]) -> Optional[dict]:
+    """
+    Return the current AHS snapshot ({"version", "fetched_at", "data"}).
+
+    `fetch` is only called by the single worker that wins the refresh lease.
+    When nothing fresh is available the last known snapshot is returned.
+    """
+    local = _serve_local(time.time())
+    if local:
+        return local
+
+    async with _refresh_lock:
+        now = time.time()
+        local = _serve_local(now)
+        if local:
+            return local
+        local = _l1["snapshot"]
+
+        try:
+            shared = await _read_shared()
+        except RedisError as e:
+            logger.warning(f"⚠️ Could not read shared AHS snapshot: {e}")
+            shared = None
+
+        if _is_fresh(shared, now):
+            logger.info("📌 Shared cache hit for AHS wait times")
+            _remember(shared)
+            return shared
+
+        stale = shared or local
+        snapshot = await _refresh(fetch, stale)
+        if snapshot:
+            _remember(snapshot)
+            if snapshot is stale:
+                _l1["retry_after"] = time.time() + L1_TTL
+                logger.info("📌 Returning stale AHS snapshot")
+        return snapshot
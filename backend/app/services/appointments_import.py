@@ -0,0 +1,26 @@
+# app/services/appointments_import.py
+"""
+Bulk appointments import (kind="appointments" in csv_ingest).
+
+Per chunk: one set-based facility upsert over the distinct facility names,
+then the appointment rows go in with COPY. The old CSV importer did a
+Facility query + commit + refresh for every row.
+"""
+import pandas as pd
+
+from app.services import facility_registry
+
+APPOINTMENT_COLUMNS = ["facility_id", "patient_id", "modality", "scheduled_time", "status", "urgency", "referrer"]
+
+
+def attach_facility_ids(conn, df: pd.DataFrame) -> pd.DataFrame:
+    """Replace facility_name/region with facility_id (creating facilities as needed)."""
+    names = (
+        df[["facility_name", "region"]]
+        .drop_duplicates("facility_name")
+        .set_index("facility_name")["region"]
+        .to_dict()
+    )
+    ids = facility_registry.upsert_names(conn, {n: (r if isinstance(r, str) else None) for n, r in names.items()})
+    out = df.assign(facility_id=df["facility_name"].map(ids).astype("int64"))
+    return out[APPOINTMENT_COLUMNS]
@@ -0,0 +1,257 @@
+# app/services/audit_retention.py
+"""
+Monthly partitions for triage_audit / triage_message, and their retention.
+
+On Postgres both tables are range-partitioned by month (received_at /
+created_at). This job runs daily in one API worker (a Redis-leased background
+task, see app/startup_tasks.py), or by hand with
+`python -m app.services.audit_retention`:
+
+  * creates partitions for the next few months, so inserts never land in the
+    default partition. If rows for a month already sit in DEFAULT (the job
+    didn't run in time), Postgres refuses to create that month, so DEFAULT
+    is detached, the month created, its rows moved across and DEFAULT
+    re-attached — in one transaction, holding the parent's lock throughout;
+  * detaches partitions older than the retention window, writes them to
+    zstd-compressed Parquet files, and drops them. Dropping a whole partition
+    replaces the DELETE + VACUUM churn a single heap would need.
+
+Lock window: DETACH PARTITION takes an ACCESS EXCLUSIVE lock on the parent,
+so audit reads and inserts wait while it runs. It is catalog-only and commits
+on its own, so the hold is milliseconds; the risk is *waiting* for the lock
+behind a long query while everything else queues behind the DETACH. Each
+attempt therefore runs with a short lock_timeout and is retried a few times.
+(DETACH ... CONCURRENTLY is not an option: Postgres refuses it on parents with
+a DEFAULT partition, which both tables have.) Triage itself never waits —
+audits go through the local WAL, whose drainer just retries.
+"""
+import json
+import logging
+import os
+import re
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.database import engine as default_engine
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Config
+# ---------------------------
+RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", "13"))
+MONTHS_AHEAD = int(os.getenv("AUDIT_PARTITIONS_AHEAD", "3"))
+ARCHIVE_DIR = Path(os.getenv("AUDIT_ARCHIVE_DIR", "/var/lib/healthflow/audit_archive"))
+EXPORT_BATCH_ROWS = 50_000
+DETACH_LOCK_TIMEOUT_MS = int(os.getenv("AUDIT_DETACH_LOCK_TIMEOUT_MS", "2000"))
+DETACH_ATTEMPTS = int(os.getenv("AUDIT_DETACH_ATTEMPTS", "5"))
+
+# parent table -> partition key column
+PARTITIONED_TABLES = {"triage_audit": "received_at", "triage_message": "created_at"}
+
+_PARTITION_RE = re.compile(r"^(?P<parent>\w+)_p(?P<year>\d{4})_(?P<month>\d{2})$")
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(parent: str, month_start: date) -> str:
+    return f"{parent}_p{month_start.year:04d}_{month_start.month:02d}"
+
+
+def parse_partition(name: str) -> Optional[Tuple[str, date]]:
+    m = _PARTITION_RE.match(name)
+    if not m:
+        return None
+    return m.group("parent"), date(int(m.group("year")), int(m.group("month")), 1)
+
+
+def partitions_to_archive(names: Iterable[str], today: date, retention_months: int = RETENTION_MONTHS) -> List[str]:
+    """Monthly partitions that end before the retention window starts (oldest first)."""
+    cutoff = add_months(today.replace(day=1), -retention_months)
+    old = []
+    for name in names:
+        parsed = parse_partition(name)
+        if parsed and add_months(parsed[1], 1) <= cutoff:
+            old.append((parsed[1], name))
+    return [name for _, name in sorted(old)]
+
+
+# ---------------------------
+# DDL (Postgres only)
+# ---------------------------
+def default_partition(parent: str) -> str:
+    return f"{parent}_default"
+
+
+def create_month_partition(conn, parent: str, month_start: date):
+    """Create one month's partition, moving any of its rows already in DEFAULT (see module docstring)."""
+    name = partition_name(parent, month_start)
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+        return name
+    column = PARTITIONED_TABLES[parent]
+    default = default_partition(parent)
+    lower, upper = month_start.isoformat(), add_months(month_start, 1).isoformat()
+    bounds = f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    in_month = f"{column} >= '{lower}' AND {column} < '{upper}'"
+    conn.execute(text(f"SET LOCAL lock_timeout = {DETACH_LOCK_TIMEOUT_MS}"))
+    stranded = conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_month})")).scalar()
+    if not stranded:
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {parent} {bounds}"))
+        return name
+    conn.execute(text(f"ALTER TABLE {parent} DETACH PARTITION {default}"))
+    conn.execute(text(f"CREATE TABLE {name} PARTITION OF {parent} {bounds}"))
+    columns = ", ".join(r[0] for r in conn.execute(text(
+        "SELECT column_name FROM information_schema.columns WHERE table_name = :parent ORDER BY ordinal_position"
+    ), {"parent": parent}))
+    moved = conn.execute(text(
+        f"WITH moved AS (DELETE FROM {default} WHERE {in_month} RETURNING {columns}) "
+        f"INSERT INTO {name} ({columns}) SELECT {columns} FROM moved"
+    )).rowcount
+    conn.execute(text(f"ALTER TABLE {parent} ATTACH PARTITION {default} DEFAULT"))
+    logger.warning(f"⚠️ Moved {moved} rows of {name} out of {default}")
+    return name
+
+
+def ensure_partitions(conn, today: Optional[date] = None, months_ahead: int = MONTHS_AHEAD, start: Optional[date] = None):
+    """Create monthly partitions from `start` (default: this month) through `months_ahead`."""
+    today = today or datetime.now(timezone.utc).date()
+    first = (start or today).replace(day=1)
+    last = add_months(today.replace(day=1), months_ahead)
+    created = []
+    for parent in PARTITIONED_TABLES:
+        month = first
+        while month <= last:
+            created.append(create_month_partition(conn, parent, month))
+            month = add_months(month, 1)
+    return created
+
+
+def list_partitions(conn, parent: str) -> List[str]:
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :parent"
+    ), {"parent": parent})
+    return [r[0] for r in rows]
+
+
+# ---------------------------
+# Archival
+# ---------------------------
+def list_detached(conn, parent: str) -> List[str]:
+    """Month tables left detached by an interrupted run (exported and dropped on the next run)."""
+    rows = conn.execute(text(
+        "SELECT relname FROM pg_class WHERE relkind = 'r' AND NOT relispartition AND relname LIKE :pattern"
+    ), {"pattern": f"{parent}\\_p%"})
+    return [r[0] for r in rows if parse_partition(r[0])]
+
+
+def _arrow_schema(conn, name: str):
+    import pyarrow as pa
+
+    types = {
+        "bigint": pa.int64(), "integer": pa.int32(), "smallint": pa.int16(),
+        "double precision": pa.float64(), "real": pa.float32(), "boolean": pa.bool_(),
+        "timestamp without time zone": pa.timestamp("us"),
+        "timestamp with time zone": pa.timestamp("us", tz="UTC"),
+    }
+    rows = conn.execute(text(
+        "SELECT column_name, data_type FROM information_schema.columns "
+        "WHERE table_name = :name ORDER BY ordinal_position"
+    ), {"name": name})
+    # text, varchar, json/jsonb (serialized) -> string
+    return pa.schema([(col, types.get(dtype, pa.string())) for col, dtype in rows])
+
+
+def export_partition(conn, name: str, archive_dir: Path) -> Path:
+    """Stream a (detached) partition into a zstd Parquet file; returns its path."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    final_path = archive_dir / f"{name}.parquet"
+    tmp_path = final_path.with_suffix(".parquet.tmp")
+
+    schema = _arrow_schema(conn, name)
+    json_columns = {f.name for f in schema if f.type == pa.string()}
+    result = conn.execution_options(stream_results=True, max_row_buffer=EXPORT_BATCH_ROWS).execute(
+        text(f"SELECT * FROM {name} ORDER BY id")
+    )
+    rows = 0
+    with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+        while True:
+            batch = result.fetchmany(EXPORT_BATCH_ROWS)
+            if not batch:
+                break
+            data = {}
+            for i, field in enumerate(schema):
+                values = [r[i] for r in batch]
+                if field.name in json_columns:
+                    values = [v if v is None or isinstance(v, str) else json.dumps(v, default=str) for v in values]
+                data[field.name] = values
+            writer.write_table(pa.table(data, schema=schema))
+            rows += len(batch)
+    os.replace(tmp_path, final_path)
+    logger.info(f"📦 Archived {rows} rows of {name} to {final_path}")
+    return final_path
+
+
+def detach_partition(bind, parent: str, name: str, attempts: int = DETACH_ATTEMPTS):
+    """DETACH with a bounded wait for the parent's lock (see the module docstring), retried."""
+    for attempt in range(1, attempts + 1):
+        try:
+            with bind.begin() as conn:
+                conn.execute(text(f"SET LOCAL lock_timeout = {DETACH_LOCK_TIMEOUT_MS}"))
+                conn.execute(text(f"ALTER TABLE {parent} DETACH PARTITION {name}"))
+            return
+        except OperationalError as e:
+            if attempt == attempts:
+                raise
+            logger.warning(f"⚠️ Could not lock {parent} to detach {name} ({e.orig}); retry {attempt}/{attempts}")
+            time.sleep(attempt)
+
+
+def archive_old_partitions(bind=None, today: Optional[date] = None, archive_dir: Path = ARCHIVE_DIR,
+                           retention_months: int = RETENTION_MONTHS) -> List[Path]:
+    """Detach -> export to Parquet -> drop, one partition (and transaction) at a time."""
+    bind = bind or default_engine
+    today = today or datetime.now(timezone.utc).date()
+    archived = []
+    # Messages first: their audits may still be read while the month is being archived
+    for parent in ("triage_message", "triage_audit"):
+        with bind.connect() as conn:
+            names = list_partitions(conn, parent)
+            leftovers = list_detached(conn, parent)
+        for name in leftovers + partitions_to_archive(names, today, retention_months):
+            if name not in leftovers:
+                detach_partition(bind, parent, name)
+            with bind.connect() as conn:
+                path = export_partition(conn, name, archive_dir)
+            with bind.begin() as conn:
+                conn.execute(text(f"DROP TABLE {name}"))
+            archived.append(path)
+    return archived
+
+
+def run_retention(bind=None):
+    bind = bind or default_engine
+    if bind.dialect.name != "postgresql":
+        logger.info("ℹ️ Audit partitioning is Postgres-only; nothing to do")
+        return []
+    with bind.begin() as conn:
+        ensure_partitions(conn)
+    return archive_old_partitions(bind)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_retention()
@@ -0,0 +1,493 @@
+# app/services/audit_spool.py
+"""
+Write-ahead spool for triage audits.
+
+Every audit (and the reply that goes in its bot message) is written here
+first, and triage acknowledges it as soon as it is on local disk:
+
+  append   one JSON line per audit in the worker's active segment file
+           (LOCAL_STATE_DIR/audit_wal/<ns>-<pid>.wal.open). A single writer thread
+           group-commits: whatever arrives while the previous fsync runs (plus
+           a short AUDIT_WAL_GROUP_COMMIT_MS linger) is written and fsynced
+           together, so one fsync covers many concurrent triages.
+  seal     the active segment is renamed to `.wal` (still under its flock)
+           when it fills up, every few seconds, and on shutdown.
+  drain    `drain_loop` seals the active segment every few seconds and
+           bulk-loads sealed segments into Postgres, then deletes them.
+
+Each record carries an idempotency key (unique with received_at in
+triage_audit), so a segment that is loaded twice — a crash between commit
+and delete, two workers racing — never duplicates rows. Drainers only look at
+sealed `.wal` files, so they can't take an active segment before its writer
+has locked it. The writer holds an flock on its `.wal.open` file until it is
+sealed; one whose lock is free was left by a crashed worker and is sealed by
+whichever worker drains next. While Postgres is down the segments simply
+accumulate.
+
+A record Postgres rejects outright (bad data, constraint violation) would
+otherwise hold its segment back forever: such a batch is retried record by
+record and the rejects are moved to quarantine.jsonl in the WAL directory.
+Local disk errors while draining raise `WalIOError` and are not counted
+against the Postgres breaker.
+"""
+import asyncio
+import fcntl
+import glob
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.triage import TriageAudit, TriageMessage
+from app.services import degradation
+
+logger = logging.getLogger("audit_spool")
+
+# ---------------------------
+# Config
+# ---------------------------
+LOCAL_STATE_DIR = os.getenv("LOCAL_STATE_DIR", "var")
+WAL_DIR = os.getenv("AUDIT_WAL_DIR", os.path.join(LOCAL_STATE_DIR, "audit_wal"))
+GROUP_COMMIT = float(os.getenv("AUDIT_WAL_GROUP_COMMIT_MS", "2")) / 1000
+MAX_BATCH = int(os.getenv("AUDIT_WAL_MAX_BATCH", "256"))
+SEGMENT_BYTES = int(float(os.getenv("AUDIT_WAL_SEGMENT_MB", "8")) * 1024 * 1024)
+DRAIN_INTERVAL = float(os.getenv("AUDIT_WAL_DRAIN_INTERVAL", "2"))
+DRAIN_BATCH = int(os.getenv("AUDIT_WAL_DRAIN_BATCH", "500"))
+DRAIN_TIMEOUT_MS = int(os.getenv("AUDIT_WAL_DRAIN_TIMEOUT_MS", "10000"))
+# The single-file spool used before segments; drained like a sealed segment
+LEGACY_SPOOL_PATH = os.getenv("AUDIT_SPOOL_PATH", os.path.join(LOCAL_STATE_DIR, "audit_spool.jsonl"))
+
+OPEN_SUFFIX = ".open"
+QUARANTINE_FILE = "quarantine.jsonl"
+# Retrying won't help: malformed records and rows the database refuses
+PERMANENT_ERRORS = (DataError, IntegrityError, KeyError, TypeError, ValueError)
+
+_SEAL = object()
+_STOP = object()
+
+
+def record_for(payload: dict, symptoms: str, received_at: datetime, triage: dict,
+               hospital_reco: list, human_response: str) -> dict:
+    return {
+        "key": uuid.uuid4().hex,
+        "received_at": received_at.isoformat(),
+        "symptoms": symptoms,
+        "age": payload.get("age"),
+        "known_conditions": payload.get("known_conditions", []),
+        "recommended_level": triage["recommended_level"],
+        "score": triage["score"],
+        "reasons": triage["reasons"],
+        "suggested_action": triage["suggested_action"],
+        "hospital_recommendation": hospital_reco,
+        "meta": {"human_like": True, **triage["meta"]},
+        "response": human_response,
+    }
+
+
+def _fsync_dir(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WalIOError(OSError):
+    """A drain failed on local disk (the WAL itself), not in the database."""
+
+
+@contextmanager
+def _local_io():
+    try:
+        yield
+    except WalIOError:
+        raise
+    except OSError as e:
+        raise WalIOError(e.errno, f"audit WAL: {e}") from e
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _same_file(f, path: str) -> bool:
+    """Whether `path` still names the file open as `f` (it may have been renamed or removed)."""
+    try:
+        return os.stat(path).st_ino == os.fstat(f.fileno()).st_ino
+    except FileNotFoundError:
+        return False
+
+
+class SegmentLog:
+    """Append-only segment files with a group-committing writer thread (one per worker)."""
+
+    def __init__(self, directory: str, group_commit: float = GROUP_COMMIT, max_batch: int = MAX_BATCH,
+                 segment_bytes: int = SEGMENT_BYTES):
+        self.directory = directory
+        self.group_commit = group_commit
+        self.max_batch = max_batch
+        self.segment_bytes = segment_bytes
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._file = None
+        self._active: Optional[str] = None
+        self.stats = {"appended": 0, "fsyncs": 0, "segments_sealed": 0, "drained": 0, "duplicates": 0,
+                      "torn": 0, "recovered": 0, "quarantined": 0}
+
+    # ---------------- writer ----------------
+    def submit(self, record: dict) -> Future:
+        """Queue a record; the future resolves once it is fsynced."""
+        line = (json.dumps(record, default=str) + "\n").encode("utf-8")
+        return self._put(line)
+
+    def seal(self):
+        """Close the active segment so it can be drained (no-op when empty)."""
+        self._put(_SEAL).result()
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put((_STOP, None))
+            self._thread.join()
+            self._thread = None
+
+    def _put(self, item) -> Future:
+        fut = Future()
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="audit-wal", daemon=True)
+                    self._thread.start()
+        self._queue.put((item, fut))
+        return fut
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.group_commit
+            while len(batch) < self.max_batch and batch[-1][0] is not _STOP:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1][0] is _STOP
+            self._commit([(item, fut) for item, fut in batch if item is not _STOP])
+            if stop:
+                self._close_segment()
+                return
+
+    def _commit(self, batch):
+        try:
+            lines = [item for item, _ in batch if item is not _SEAL]
+            if lines:
+                f = self._file or self._open_segment()
+                f.write(b"".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+                self.stats["appended"] += len(lines)
+                self.stats["fsyncs"] += 1
+            if any(item is _SEAL for item, _ in batch) or (self._file and self._file.tell() >= self.segment_bytes):
+                self._close_segment()
+        except Exception as e:
+            logger.error(f"❌ Audit WAL write failed: {e}")
+            self._close_segment()  # next write starts a fresh segment
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+        for _, fut in batch:
+            fut.set_result(None)
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        while True:
+            path = os.path.join(self.directory, f"{time.time_ns():020d}-{os.getpid()}.wal{OPEN_SUFFIX}")
+            f = open(path, "ab")
+            fcntl.flock(f, fcntl.LOCK_EX)  # held until sealed: recovery skips this file
+            if _same_file(f, path):
+                break
+            f.close()  # recovery took the empty file between open and flock; start another
+        _fsync_dir(self.directory)
+        self._file, self._active = f, path
+        return f
+
+    def _close_segment(self):
+        """Seal the active segment: rename it to `.wal` while still holding its lock."""
+        if self._file is None:
+            return
+        f, path = self._file, self._active
+        self._file = self._active = None
+        try:
+            if f.tell() == 0:
+                os.remove(path)
+            else:
+                os.rename(path, path[:-len(OPEN_SUFFIX)])
+                self.stats["segments_sealed"] += 1
+            _fsync_dir(self.directory)
+        except OSError as e:
+            logger.error(f"❌ Could not seal audit segment {os.path.basename(path)}: {e}")  # recovered later
+        finally:
+            try:
+                f.close()  # releases the flock
+            except OSError:
+                pass
+
+    # ---------------- drainer ----------------
+    def segments(self) -> List[str]:
+        """Sealed segments (and the legacy spool) ready to drain; empty files are skipped."""
+        found = sorted(p for p in glob.glob(os.path.join(self.directory, "*.wal")) if _size(p))
+        legacy = [p for p in (LEGACY_SPOOL_PATH + ".replaying", LEGACY_SPOOL_PATH) if os.path.exists(p)]
+        return legacy + found
+
+    def open_segments(self) -> List[str]:
+        """Segments still being written — or left behind by a crashed worker."""
+        return sorted(glob.glob(os.path.join(self.directory, f"*.wal{OPEN_SUFFIX}")))
+
+    def has_pending(self) -> bool:
+        return self._file is not None or bool(self.segments()) or bool(self.open_segments())
+
+    def drain(self, session_factory=None, batch_size: int = DRAIN_BATCH) -> int:
+        """Load every sealed, unlocked segment into the database; returns audits written."""
+        if session_factory is None:
+            from app.database import SessionLocal as session_factory
+        with _local_io():
+            self.seal()
+            self.recover()
+        written = 0
+        for path in self.segments():
+            written += self._drain_segment(path, session_factory, batch_size)
+        return written
+
+    def recover(self) -> int:
+        """Seal `.wal.open` segments whose writer is gone (their flock is free); returns how many."""
+        recovered = 0
+        for path in self.open_segments():
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                continue  # sealed meanwhile
+            with f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # a live writer's active segment
+                if not _same_file(f, path):
+                    continue
+                if os.fstat(f.fileno()).st_size == 0:
+                    os.remove(path)  # created but never written (or its writer hasn't locked it yet)
+                    continue
+                os.rename(path, path[:-len(OPEN_SUFFIX)])
+                recovered += 1
+        if recovered:
+            _fsync_dir(self.directory)
+            self.stats["recovered"] += recovered
+            logger.warning(f"⚠️ Recovered {recovered} audit segment(s) left open by a stopped worker")
+        return recovered
+
+    def _drain_segment(self, path: str, session_factory, batch_size: int) -> int:
+        with _local_io():
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                return 0  # another worker finished it
+        with f:
+            with _local_io():
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return 0  # another worker is draining it
+                if not os.path.exists(path):
+                    return 0
+                records = self._read(f, path)
+            written = 0
+            for i in range(0, len(records), batch_size):
+                chunk = records[i:i + batch_size]
+                inserted, rejected = self._load(chunk, session_factory)
+                if rejected:
+                    with _local_io():
+                        self._quarantine(path, rejected)
+                written += inserted
+                self.stats["duplicates"] += len(chunk) - inserted - len(rejected)
+            with _local_io():
+                os.remove(path)
+        self.stats["drained"] += written
+        if written:
+            logger.info(f"✅ Drained {written} triage audits from {os.path.basename(path)}")
+        return written
+
+    def _load(self, records: List[Dict], session_factory) -> Tuple[int, List[Tuple[Dict, Exception]]]:
+        """(inserted, rejected): a batch refused for good is retried one record at a time."""
+        try:
+            with session_factory() as db:
+                try:
+                    return insert_records(db, records), []
+                except Exception:
+                    db.rollback()
+                    raise
+        except PERMANENT_ERRORS as e:
+            if len(records) == 1:
+                return 0, [(records[0], e)]
+        inserted, rejected = 0, []
+        for rec in records:
+            n, bad = self._load([rec], session_factory)
+            inserted += n
+            rejected += bad
+        return inserted, rejected
+
+    def _quarantine(self, path: str, rejected: List[Tuple[Dict, Exception]]):
+        """Append records the database won't take to the dead-letter file (fsynced)."""
+        segment = os.path.basename(path)
+        now = datetime.utcnow().isoformat()
+        lines = [json.dumps({"segment": segment, "quarantined_at": now, "error": str(e)[:500], "record": rec},
+                            default=str) + "\n" for rec, e in rejected]
+        with open(os.path.join(self.directory, QUARANTINE_FILE), "ab") as f:
+            f.write("".join(lines).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        self.stats["quarantined"] += len(rejected)
+        logger.error(f"❌ Quarantined {len(rejected)} audit record(s) from {segment} that the database "
+                     f"rejected: {rejected[0][1]}")
+
+    def _read(self, f, path: str) -> List[Dict]:
+        records = []
+        for raw in f.read().splitlines():
+            if not raw.strip():
+                continue
+            try:
+                rec = json.loads(raw)
+            except ValueError:
+                # A write cut short by a crash; it was never acknowledged
+                self.stats["torn"] += 1
+                logger.warning(f"⚠️ Skipping torn audit record in {os.path.basename(path)}")
+                continue
+            # Legacy spool lines have no key: derive a stable one so retries stay idempotent
+            rec.setdefault("key", hashlib.sha1(raw).hexdigest()[:32])
+            records.append(rec)
+        return records
+
+    def pending(self) -> int:
+        count = 0
+        for path in self.segments() + self.open_segments():
+            try:
+                with open(path, "rb") as f:
+                    count += sum(1 for line in f if line.strip())
+            except OSError:
+                pass
+        return count
+
+    def status(self) -> dict:
+        paths = self.segments()
+        open_paths = self.open_segments()
+        size = sum(_size(path) for path in paths + open_paths)
+        return {"segments": len(paths), "open_segments": len(open_paths), "bytes": size, **self.stats}
+
+
+wal = SegmentLog(WAL_DIR)
+
+
+async def write(record: dict):
+    """Durable once this returns (group-committed fsync); raises OSError if local disk fails."""
+    await asyncio.wrap_future(wal.submit(record))
+
+
+def append(record: dict):
+    """Blocking `write` for sync callers."""
+    wal.submit(record).result()
+
+
+def pending() -> int:
+    return wal.pending()
+
+
+def status() -> dict:
+    return {"pending": wal.pending(), **wal.status()}
+
+
+def insert_direct(record: Dict, session_factory=None) -> int:
+    """Blocking single-record insert on a session of its own (fallback when the WAL can't be written)."""
+    if session_factory is None:
+        from app.database import SessionLocal as session_factory
+    with session_factory() as db:
+        return insert_records(db, [record])
+
+
+def insert_records(db: Session, records: List[Dict], lookback: timedelta = timedelta(0)) -> int:
+    """
+    Audit rows + user/bot messages for WAL records, in one transaction.
+    Records whose idempotency key is already in the table are skipped;
+    returns how many were inserted. Keys are looked up between the earliest
+    received_at minus `lookback` and the latest; callers whose retries get a
+    new received_at (batch re-uploads) widen it.
+    """
+    by_key = {rec["key"]: rec for rec in records}
+    if not by_key:
+        return 0
+    received = [datetime.fromisoformat(rec["received_at"]) for rec in by_key.values()]
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(f"SET LOCAL statement_timeout = {DRAIN_TIMEOUT_MS}"))
+    # The received_at range lets Postgres prune to the partitions involved
+    existing = {key for (key,) in db.query(TriageAudit.idempotency_key).filter(
+        TriageAudit.idempotency_key.in_(list(by_key)),
+        TriageAudit.received_at.between(min(received) - lookback, max(received)),
+    )}
+    fresh = [rec for key, rec in by_key.items() if key not in existing]
+    audits = [TriageAudit(
+        idempotency_key=rec["key"],
+        received_at=datetime.fromisoformat(rec["received_at"]),
+        symptoms=rec["symptoms"],
+        age=rec.get("age"),
+        known_conditions=rec.get("known_conditions") or [],
+        recommended_level=rec["recommended_level"],
+        score=rec["score"],
+        reasons=rec["reasons"],
+        suggested_action=rec["suggested_action"],
+        hospital_recommendation=json.dumps(rec["hospital_recommendation"]),
+        meta=rec["meta"],
+    ) for rec in fresh]
+    db.add_all(audits)
+    db.flush()  # one multi-row INSERT ... RETURNING id
+    messages = []
+    for audit, rec in zip(audits, fresh):
+        messages.append(TriageMessage(audit_id=audit.id, direction="user", text=audit.symptoms,
+                                      created_at=audit.received_at))
+        # The structured result lives on the audit row; the message only carries the reply
+        messages.append(TriageMessage(audit_id=audit.id, direction="bot",
+                                      text=json.dumps({"response": rec["response"]}), created_at=audit.received_at,
+                                      meta={"audit_received_at": audit.received_at.isoformat()}))
+    db.add_all(messages)
+    db.commit()
+    return len(audits)
+
+
+async def drain_loop(interval: float = DRAIN_INTERVAL):
+    """Drain sealed segments whenever there are some and Postgres isn't known to be down."""
+    while True:
+        await asyncio.sleep(interval)
+        if not wal.has_pending() or not degradation.postgres.available():
+            continue
+        try:
+            await asyncio.to_thread(wal.drain)
+        except WalIOError as e:
+            # Local disk, not Postgres: leave the breaker alone
+            logger.error(f"❌ Audit WAL drain failed on local disk ({e}); segments kept for the next attempt")
+            continue
+        except Exception as e:
+            degradation.postgres.record_failure(e)
+            logger.warning(f"⚠️ Audit WAL drain failed ({e}); segments kept for the next attempt")
+            continue
+        degradation.postgres.record_success()
@@ -0,0 +1,34 @@
+# app/services/bulk_load.py
+"""
+Bulk loading helpers shared by the CSV importers.
+
+On Postgres, rows are streamed with COPY ... FROM STDIN (psycopg2 copy_expert),
+which is an order of magnitude faster than INSERTs. Other dialects (SQLite in
+tests) fall back to one executemany INSERT per batch.
+"""
+import io
+
+import pandas as pd
+from sqlalchemy import insert
+
+from app.database import Base
+
+
+def copy_dataframe(conn, table: str, df: pd.DataFrame):
+    """Append `df` (columns named like the table's) to `table` on a SQLAlchemy connection."""
+    if df.empty:
+        return 0
+    if conn.dialect.name == "postgresql":
+        buf = io.StringIO()
+        df.to_csv(buf, index=False, header=False)  # NaN/None -> empty unquoted field -> NULL
+        buf.seek(0)
+        columns = ", ".join(f'"{c}"' for c in df.columns)
+        cursor = conn.connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buf)
+        finally:
+            cursor.close()
+    else:
+        records = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+        conn.execute(insert(Base.metadata.tables[table]), records)
+    return len(df)
@@ -0,0 +1,164 @@
+# app/services/csv_ingest.py
+"""
+Streaming CSV ingestion for /upload-csv.
+
+The upload is spooled to a temp file, then parsed in fixed-size chunks
+(memory stays flat regardless of file size). Each chunk is validated against
+its schema — bad rows are counted and a sample of errors is kept, good rows
+are COPY'd into the staging table — and the job row is updated so clients can
+poll progress instead of receiving the data back.
+"""
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.database import engine as default_engine
+from app.models.ingest import IngestJob
+from app.services.appointments_import import attach_facility_ids
+from app.services.bulk_load import copy_dataframe
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Config
+# ---------------------------
+CHUNK_ROWS = int(os.getenv("CSV_INGEST_CHUNK_ROWS", "100000"))
+MAX_ERRORS_KEPT = 100
+
+# kind -> target table, column types ("str" | "int" | "datetime") and an optional
+# per-chunk `prepare(conn, df) -> df` hook that runs inside the load transaction.
+SCHEMAS: Dict[str, dict] = {
+    "ed_waits": {
+        "table": "staging_ed_waits",
+        "columns": {"hospital_name": "str", "wait_time_minutes": "int"},
+        "tag_job": True,  # staging rows carry their job_id
+    },
+    "appointments": {
+        "table": "appointments",
+        "columns": {"facility_name": "str", "patient_id": "str", "modality": "str",
+                    "scheduled_time": "datetime", "status": "str"},
+        "optional": {"region": "str", "urgency": "str", "referrer": "str"},
+        "prepare": attach_facility_ids,
+    },
+}
+
+
+def _coerce(raw: pd.Series, kind: str) -> Tuple[pd.Series, pd.Series]:
+    """Typed values and a mask of values that are missing or unparseable."""
+    if kind == "int":
+        values = pd.to_numeric(raw, errors="coerce")
+        invalid = values.isna() | (values % 1 != 0)
+        return values.where(~invalid).astype("Int64"), invalid
+    if kind == "datetime":
+        values = pd.to_datetime(raw, errors="coerce", utc=True, format="mixed")
+        return values, values.isna()
+    values = raw.str.strip()
+    return values.where(values != ""), values.isna() | (values == "")
+
+
+def validate_chunk(df: pd.DataFrame, schema: dict, first_row: int) -> Tuple[pd.DataFrame, List[dict]]:
+    """Coerce a chunk to the schema; returns (valid rows, per-row errors)."""
+    missing = set(schema["columns"]) - set(df.columns)
+    if missing:
+        raise ValueError(f"CSV must contain columns: {sorted(schema['columns'])} (missing {sorted(missing)})")
+
+    out = pd.DataFrame(index=df.index)
+    bad = pd.Series(False, index=df.index)
+    reasons = pd.Series("", index=df.index)
+    for column, kind in schema["columns"].items():
+        values, invalid = _coerce(df[column], kind)
+        reasons = reasons.where(~invalid | (reasons != ""), f"invalid {column}")
+        bad |= invalid
+        out[column] = values
+    for column, kind in schema.get("optional", {}).items():
+        if column not in df.columns:
+            out[column] = None
+            continue
+        values, invalid = _coerce(df[column], kind)
+        invalid &= df[column].notna()  # blank is fine for optional columns
+        reasons = reasons.where(~invalid | (reasons != ""), f"invalid {column}")
+        bad |= invalid
+        out[column] = values
+
+    bad_pos = np.flatnonzero(bad.to_numpy())
+    errors = [{"row": int(first_row + pos), "error": reasons.iloc[pos]} for pos in bad_pos]
+    return out[~bad], errors
+
+
+def create_job(db: Session, kind: str, filename: str, total_bytes: Optional[int]) -> IngestJob:
+    job = IngestJob(id=str(uuid.uuid4()), kind=kind, filename=filename, total_bytes=total_bytes,
+                    status="queued", bytes_read=0, rows_loaded=0, rows_rejected=0, errors=[])
+    db.add(job)
+    db.commit()
+    return job
+
+
+def job_status(job: IngestJob) -> dict:
+    progress = None
+    if job.total_bytes:
+        progress = round(min(1.0, (job.bytes_read or 0) / job.total_bytes), 3)
+    rows_per_sec = None
+    if job.started_at and job.finished_at:
+        elapsed = (job.finished_at - job.started_at).total_seconds()
+        rows_per_sec = round(job.rows_loaded / elapsed) if elapsed > 0 else None
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "filename": job.filename,
+        "status": job.status,
+        "progress": 1.0 if job.status == "done" else progress,
+        "rows_loaded": job.rows_loaded,
+        "rows_rejected": job.rows_rejected,
+        "rows_per_sec": rows_per_sec,
+        "errors": job.errors or [],
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def ingest_file(job_id: str, path: str, kind: str, bind=None, chunk_rows: int = CHUNK_ROWS) -> dict:
+    """Parse `path` chunk by chunk and COPY valid rows into the kind's staging table."""
+    bind = bind or default_engine
+    schema = SCHEMAS[kind]
+    with Session(bind) as db:
+        job = db.get(IngestJob, job_id)
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        db.commit()
+
+        errors: List[dict] = []
+        loaded = rejected = 0
+        try:
+            with open(path, "rb") as f:
+                reader = pd.read_csv(f, chunksize=chunk_rows, dtype=str, keep_default_na=False,
+                                     na_values=[""], skipinitialspace=True)
+                first_row = 2  # 1-based, after the header line
+                for chunk in reader:
+                    valid, chunk_errors = validate_chunk(chunk, schema, first_row)
+                    first_row += len(chunk)
+                    if schema.get("tag_job"):
+                        valid.insert(0, "job_id", job_id)
+                    with bind.begin() as conn:
+                        if "prepare" in schema and not valid.empty:
+                            valid = schema["prepare"](conn, valid)
+                        loaded += copy_dataframe(conn, schema["table"], valid)
+                    rejected += len(chunk_errors)
+                    errors.extend(chunk_errors[: max(0, MAX_ERRORS_KEPT - len(errors))])
+
+                    job.bytes_read = f.tell()
+                    job.rows_loaded, job.rows_rejected, job.errors = loaded, rejected, list(errors)
+                    db.commit()
+            job.status = "done"
+        except Exception as e:
+            logger.exception(f"❌ CSV ingest {job_id} failed: {e}")
+            job.status = "failed"
+            job.errors = list(errors) + [{"row": None, "error": str(e)}]
+        job.finished_at = datetime.now(timezone.utc)
+        db.commit()
+        logger.info(f"📥 CSV ingest {job_id}: {loaded} rows loaded, {rejected} rejected ({job.status})")
+        return job_status(job)
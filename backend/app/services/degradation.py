@@ -0,0 +1,102 @@
+# app/services/degradation.py
+"""
+Degradation tiers for triage when a backend is failing.
+
+Triage depends on three things that can fail independently:
+
+  model     NLP classifier        -> rules-only classification
+  redis     live hospital data    -> last-known-good hospital snapshot on local disk
+  postgres  audit persistence     -> audits wait in the local WAL until it recovers
+
+Each dependency has a circuit breaker and a latency budget. A call that
+raises, times out or runs over budget counts as a failure; after a few in a
+row the breaker opens and triage goes straight to the fallback (no waiting on
+a dead backend) until the cool-down lets one probe through. Either way a
+triage answer never waits longer than the budgets below.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.services.http_client import CircuitBreaker
+
+logger = logging.getLogger("degradation")
+
+# ---------------------------
+# Config
+# ---------------------------
+MODEL_BUDGET = float(os.getenv("DEGRADE_MODEL_BUDGET_MS", "200")) / 1000
+REDIS_TIMEOUT = float(os.getenv("DEGRADE_REDIS_TIMEOUT_MS", "500")) / 1000
+POSTGRES_TIMEOUT = float(os.getenv("DEGRADE_POSTGRES_TIMEOUT_MS", "1000")) / 1000
+FAILURE_THRESHOLD = int(os.getenv("DEGRADE_FAILURE_THRESHOLD", "3"))
+RESET_AFTER = float(os.getenv("DEGRADE_RESET_SEC", "15"))
+
+
+class DependencyUnavailable(Exception):
+    """The dependency's breaker is open, or the call failed / timed out."""
+
+
+class Dependency:
+    def __init__(self, name: str, timeout: float):
+        self.name = name
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold=FAILURE_THRESHOLD, reset_after=RESET_AFTER)
+        self.last_error: Optional[str] = None
+        self.stats = {"ok": 0, "failed": 0, "skipped": 0}
+
+    def available(self) -> bool:
+        if self.breaker.allow():
+            return True
+        self.stats["skipped"] += 1
+        return False
+
+    def record_success(self, elapsed: float = 0.0):
+        if elapsed > self.timeout:
+            self.record_failure(f"slow: {elapsed * 1000:.0f} ms (budget {self.timeout * 1000:.0f} ms)")
+            return
+        if self.breaker.state != "closed":
+            logger.info(f"✅ {self.name} healthy again")
+        self.breaker.record_success()
+        self.stats["ok"] += 1
+
+    def record_failure(self, error: Any):
+        was_open = self.breaker.state == "open"
+        self.breaker.record_failure()
+        self.last_error = str(error) or type(error).__name__
+        self.stats["failed"] += 1
+        if not was_open and self.breaker.state == "open":
+            logger.warning(f"⚠️ {self.name} marked unhealthy ({self.last_error}); serving degraded")
+
+    def snapshot(self) -> dict:
+        return {"state": self.breaker.state, "timeout_ms": self.timeout * 1000,
+                "last_error": self.last_error, **self.stats}
+
+
+model = Dependency("model", MODEL_BUDGET)
+redis = Dependency("redis", REDIS_TIMEOUT)
+postgres = Dependency("postgres", POSTGRES_TIMEOUT)
+
+dependencies: Dict[str, Dependency] = {d.name: d for d in (model, redis, postgres)}
+
+
+async def call_in_thread(dependency: Dependency, fn: Callable, *args):
+    """Run a blocking call with the dependency's timeout; raises DependencyUnavailable."""
+    if not dependency.available():
+        raise DependencyUnavailable(f"{dependency.name} unavailable")
+    start = time.monotonic()
+    try:
+        result = await asyncio.wait_for(asyncio.to_thread(fn, *args), timeout=dependency.timeout)
+    except asyncio.TimeoutError:
+        dependency.record_failure(f"timed out after {dependency.timeout * 1000:.0f} ms")
+        raise DependencyUnavailable(f"{dependency.name} timed out")
+    except Exception as e:
+        dependency.record_failure(e)
+        raise DependencyUnavailable(f"{dependency.name} failed: {e}") from e
+    dependency.record_success(time.monotonic() - start)
+    return result
+
+
+def status() -> dict:
+    return {name: d.snapshot() for name, d in dependencies.items()}
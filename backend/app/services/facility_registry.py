@@ -0,0 +1,333 @@
+# app/services/facility_registry.py
+"""
+Canonical facility registry: stable IDs, aliases and coordinates.
+
+AHS spells facility names inconsistently, so every spelling is resolved to a
+facility ID exactly once — the first time it shows up — and persisted in
+facility_aliases. After that, request paths only do an in-memory dict lookup
+(normalized name -> ID) and join everything else by ID; no fuzzy matching
+happens per request.
+
+A new spelling is only fuzzy-matched to a facility in the same region whose
+name has the same direction words ("Northwest ..." is never "Northeast ...",
+however close the scores), and such an alias is stored as "provisional" —
+used, but logged for review and never itself a match target. Without a region
+the name becomes a new facility: a duplicate is harmless, routing patients to
+another site's coordinates is not.
+
+The registry is seeded from app/data/facilities.json on first load.
+"""
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from rapidfuzz import fuzz, process
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import IntegrityError
+
+from app.database import SessionLocal
+from app.models.facility import Facility, FacilityAlias
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Config
+# ---------------------------
+SEED_FILE = Path(__file__).parent.parent / "data" / "facilities.json"
+FUZZY_THRESHOLD = 90  # score needed to treat a new spelling as an existing facility
+PROVISIONAL = "provisional"  # alias source of fuzzy matches awaiting review
+# Names differing in any of these are different sites, whatever the fuzzy score
+DIRECTION_WORDS = {"north", "south", "east", "west", "northeast", "northwest", "southeast", "southwest",
+                   "northern", "southern", "eastern", "western"}
+
+_facilities: Dict[int, dict] = {}   # id -> {"id", "name", "region", "lat", "lng"}
+_aliases: Dict[str, int] = {}       # normalized name -> id
+_write_lock = threading.Lock()      # one resolver at a time per process
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, '&' -> 'and', drop punctuation, collapse whitespace."""
+    name = (name or "").lower().replace("&", " and ")
+    name = re.sub(r"[^a-z0-9 ]+", "", name)
+    return " ".join(name.split())
+
+
+def normalize_region(region: Optional[str]) -> str:
+    """'Calgary Zone' and 'Calgary' are the same AHS zone."""
+    return " ".join(w for w in normalize_name(region).split() if w != "zone")
+
+
+def _directions(alias: str) -> frozenset:
+    return frozenset(w for w in alias.split() if w in DIRECTION_WORDS)
+
+
+def _fuzzy_match(alias: str, region: Optional[str], candidates: Dict[str, tuple]):
+    """
+    Value of the closest candidate ({alias: (value, region)}) in the same
+    region with the same direction words, or None.
+    """
+    region = normalize_region(region)
+    if not region:
+        return None
+    directions = _directions(alias)
+    pool = {a: value for a, (value, r) in candidates.items()
+            if normalize_region(r) == region and _directions(a) == directions}
+    match = process.extractOne(alias, list(pool), scorer=fuzz.token_sort_ratio, score_cutoff=FUZZY_THRESHOLD)
+    return pool[match[0]] if match else None
+
+
+def _match_candidates(db) -> Dict[str, tuple]:
+    """Confirmed aliases (not provisional ones) with their facility's region."""
+    rows = db.execute(
+        select(FacilityAlias.alias, FacilityAlias.facility_id, Facility.region)
+        .join(Facility, Facility.id == FacilityAlias.facility_id)
+        .where(FacilityAlias.source != PROVISIONAL)
+    )
+    return {alias: (fid, region) for alias, fid, region in rows}
+
+
+def _log_provisional(name: str, facility_id: int, region: Optional[str]):
+    logger.warning(f"🔎 '{name}' provisionally matched to facility #{facility_id} ({region}); "
+                   f"review facility_aliases where source = '{PROVISIONAL}'")
+
+
+def _as_dict(f: Facility) -> dict:
+    return {"id": f.id, "name": f.name, "region": f.region, "lat": f.lat, "lng": f.lng}
+
+
+# ---------------------------
+# Loading / seeding
+# ---------------------------
+def seed(db, path: Path = SEED_FILE) -> int:
+    """Insert seed facilities (and their aliases) that are not in the table yet."""
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    existing = set(db.scalars(select(Facility.id)))
+    known_aliases = set(db.scalars(select(FacilityAlias.alias)))
+    added = 0
+    for entry in entries:
+        if entry["id"] not in existing:
+            db.add(Facility(id=entry["id"], name=entry["name"], region=entry.get("region"),
+                            lat=entry.get("lat"), lng=entry.get("lng")))
+            added += 1
+        for spelling in [entry["name"], *entry.get("aliases", [])]:
+            alias = normalize_name(spelling)
+            if alias not in known_aliases:
+                db.add(FacilityAlias(alias=alias, facility_id=entry["id"], source="seed"))
+                known_aliases.add(alias)
+    db.flush()
+    if db.bind.dialect.name == "postgresql":
+        # Seed rows carry explicit IDs; move the sequence past them
+        db.execute(text("SELECT setval(pg_get_serial_sequence('facilities', 'id'), "
+                        "(SELECT COALESCE(MAX(id), 1) FROM facilities))"))
+    db.commit()
+    return added
+
+
+def backfill_regions(db, path: Path = SEED_FILE) -> int:
+    """Give seeded facilities stored before the seed had regions their zone (fuzzy matching needs it)."""
+    with open(path, "r", encoding="utf-8") as f:
+        regions = {entry["id"]: entry["region"] for entry in json.load(f) if entry.get("region")}
+    filled = 0
+    for facility in db.scalars(select(Facility).where(Facility.region.is_(None), Facility.id.in_(list(regions)))):
+        facility.region = regions[facility.id]
+        filled += 1
+    if filled:
+        db.commit()
+    return filled
+
+
+def load(db) -> int:
+    """(Re)load the registry into memory, seeding an empty table first."""
+    global _facilities, _aliases
+    if not db.scalar(select(func.count()).select_from(Facility)):
+        logger.info(f"🌱 Seeding facility registry from {SEED_FILE.name}: {seed(db)} facilities")
+    else:
+        backfill_regions(db)
+    _facilities = {f.id: _as_dict(f) for f in db.scalars(select(Facility))}
+    _aliases = {a.alias: a.facility_id for a in db.scalars(select(FacilityAlias))}
+    logger.info(f"🏥 Facility registry loaded: {len(_facilities)} facilities, {len(_aliases)} aliases")
+    return len(_facilities)
+
+
+def ensure_loaded():
+    if _facilities:
+        return
+    db = SessionLocal()
+    try:
+        load(db)
+    finally:
+        db.close()
+
+
+# ---------------------------
+# Hot path: O(1) lookups
+# ---------------------------
+def lookup(name: str) -> Optional[int]:
+    return _aliases.get(normalize_name(name))
+
+
+def get(facility_id: Optional[int]) -> Optional[dict]:
+    return _facilities.get(facility_id) if facility_id is not None else None
+
+
+def all_facilities() -> list:
+    return list(_facilities.values())
+
+
+# ---------------------------
+# Resolution of new spellings (runs once per new name)
+# ---------------------------
+def resolve(db, name: str, region: Optional[str] = None) -> int:
+    """Facility ID for `name`, matching or creating a facility and persisting the alias."""
+    alias = normalize_name(name)
+    facility_id = _aliases.get(alias)
+    if facility_id is not None:
+        return facility_id
+
+    with _write_lock:
+        row = db.get(FacilityAlias, alias)  # another worker may have resolved it already
+        if row is not None:
+            facility_id, source = row.facility_id, None
+        else:
+            try:
+                facility_id, source = _insert_alias(db, name, alias, region)
+            except IntegrityError:
+                # Another worker inserted this alias (or facility name) between our read and write
+                db.rollback()
+                facility_id, source = _existing_facility(db, name, alias), "concurrent"
+            logger.info(f"🆕 Facility name '{name}' resolved to #{facility_id} ({source})")
+        _aliases[alias] = facility_id
+        if facility_id not in _facilities:
+            _facilities[facility_id] = _as_dict(db.get(Facility, facility_id))
+    return facility_id
+
+
+def _insert_alias(db, name: str, alias: str, region: Optional[str]):
+    facility_id = _fuzzy_match(alias, region, _match_candidates(db))
+    if facility_id is not None:
+        source = PROVISIONAL
+        _log_provisional(name, facility_id, region)
+    else:
+        facility = Facility(name=name.strip(), region=region)
+        db.add(facility)
+        db.flush()
+        facility_id, source = facility.id, "new"
+    db.add(FacilityAlias(alias=alias, facility_id=facility_id, source=source))
+    db.commit()
+    return facility_id, source
+
+
+def _existing_facility(db, name: str, alias: str) -> int:
+    """Facility ID after losing an insert race: the winner's alias row, or its facility by name."""
+    row = db.get(FacilityAlias, alias)
+    if row is not None:
+        return row.facility_id
+    facility_id = db.scalar(select(Facility.id).where(Facility.name == name.strip()))
+    if facility_id is None:
+        raise LookupError(f"facility '{name}' vanished after a conflicting insert")
+    try:
+        db.add(FacilityAlias(alias=alias, facility_id=facility_id, source="new"))
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # the winner's alias landed meanwhile; it points at the same facility
+    return facility_id
+
+
+def resolve_names(names: Iterable[str], regions: Optional[Dict[str, str]] = None) -> Dict[str, int]:
+    """Resolve many names; only opens a DB session if some are unknown."""
+    ensure_loaded()
+    regions = regions or {}
+    unknown = {n for n in names if n and lookup(n) is None}
+    if unknown:
+        db = SessionLocal()
+        try:
+            for name in sorted(unknown):
+                resolve(db, name, regions.get(name))
+        finally:
+            db.close()
+    return {n: lookup(n) for n in names if n}
+
+
+def upsert_names(conn, names: Dict[str, Optional[str]]) -> Dict[str, int]:
+    """
+    Set-based resolution for bulk imports: {name: region} -> {name: facility ID}.
+    Known spellings come from one SELECT on the alias table; unseen spellings
+    go through the same region- and direction-guarded fuzzy match as `resolve`
+    (against confirmed aliases, then against names new in this batch), and only
+    the remainder is created, with a single INSERT ... ON CONFLICT (name) over
+    the distinct names.
+    Runs on the caller's connection/transaction; in-memory maps are left alone
+    (request paths pick new aliases up from the table on first sight).
+    """
+    by_alias: Dict[str, list] = {}
+    for name in names:
+        by_alias.setdefault(normalize_name(name), []).append(name)
+    known = dict(conn.execute(select(FacilityAlias.alias, FacilityAlias.facility_id)).all())
+    ids = {n: known[a] for a, group in by_alias.items() if a in known for n in group}
+    candidates = _match_candidates(conn)
+
+    fuzzy: Dict[str, int] = {}           # alias -> existing facility ID
+    new: Dict[str, tuple] = {}           # alias -> (name to create, region)
+    same_as_new: Dict[str, str] = {}     # alias -> alias of a facility created in this batch
+    for alias, group in by_alias.items():
+        if alias in known:
+            continue
+        region = names[group[0]]
+        facility_id = _fuzzy_match(alias, region, candidates)
+        if facility_id is not None:
+            fuzzy[alias] = facility_id
+            _log_provisional(group[0], facility_id, region)
+            continue
+        target = _fuzzy_match(alias, region, {a: (a, r) for a, (_, r) in new.items()})
+        if target is not None:
+            same_as_new[alias] = target
+        else:
+            new[alias] = (group[0].strip(), region)
+    if not (fuzzy or new):
+        return ids
+
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    new_ids: Dict[str, int] = {}
+    if new:
+        stmt = upsert(Facility).values([{"name": n, "region": region} for n, region in new.values()])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Facility.name],
+            set_={"region": func.coalesce(Facility.region, stmt.excluded.region)},
+        ).returning(Facility.id, Facility.name)
+        created = dict((row.name, row.id) for row in conn.execute(stmt))
+        new_ids = {alias: created[n] for alias, (n, _) in new.items()}
+
+    resolved = {**fuzzy, **new_ids, **{a: new_ids[target] for a, target in same_as_new.items()}}
+    conn.execute(upsert(FacilityAlias).values([
+        {"alias": alias, "facility_id": fid, "source": "new" if alias in new else PROVISIONAL}
+        for alias, fid in resolved.items()
+    ]).on_conflict_do_nothing(index_elements=[FacilityAlias.alias]))
+    for alias, fid in resolved.items():
+        for name in by_alias[alias]:
+            ids[name] = fid
+    return ids
+
+
+def set_coordinates(db, facility_id: int, lat: float, lng: float):
+    """Store geocoded coordinates for a facility (persisted + in memory)."""
+    facility = db.get(Facility, facility_id)
+    if facility is None:
+        return
+    facility.lat, facility.lng = lat, lng
+    db.commit()
+    _facilities[facility_id] = _as_dict(facility)
+
+
+def update_coordinates(facility_id: int, lat: float, lng: float):
+    db = SessionLocal()
+    try:
+        set_coordinates(db, facility_id, lat, lng)
+    finally:
+        db.close()
@@ -0,0 +1,186 @@
+# app/services/geocoding.py
+"""
+Geocoding pipeline: persistent cache + token-bucket rate limit + thread pool.
+
+* Results (and misses) are cached on disk in SQLite, keyed by the normalized
+  address, so an address is only ever sent to the provider once.
+* A token bucket keeps us inside the provider's rate limit (Nominatim: 1 req/s)
+  no matter how many lookups are in flight.
+* The geocoder is a callable `query -> (lat, lng) | None`. The production one
+  (Nominatim) is async and goes through the shared pooled HTTP client, with its
+  circuit breaker and retry budget; a plain blocking callable (tests pass a
+  fake) runs in a small thread pool, so the event loop never blocks on it.
+* Each result is written (cache row + `on_result` callback) as soon as it
+  arrives; nothing is rewritten in bulk at the end.
+"""
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable, Optional, Tuple, Union
+
+logger = logging.getLogger("geocoding")
+
+# ---------------------------
+# Config
+# ---------------------------
+CACHE_PATH = Path(os.getenv("GEOCODE_CACHE_PATH", Path(__file__).parent.parent / "data" / "geocode_cache.sqlite3"))
+RATE_PER_SEC = float(os.getenv("GEOCODE_RATE_PER_SEC", "1.0"))   # Nominatim usage policy
+BURST = int(os.getenv("GEOCODE_BURST", "1"))
+CONCURRENCY = int(os.getenv("GEOCODE_CONCURRENCY", "2"))
+MAX_ATTEMPTS = 3
+MISS_RETRY_AFTER = 7 * 86400  # re-ask the provider about unknown addresses weekly
+USER_AGENT = "healthflow_ai"
+
+Coords = Tuple[float, float]
+Geocoder = Callable[[str], Union[Optional[Coords], Awaitable[Optional[Coords]]]]
+MISSING = object()  # cache has no usable answer for this key
+
+
+def normalize_address(address: str) -> str:
+    address = re.sub(r"[^\w\s,.-]", "", (address or "").lower())
+    address = re.sub(r"\s*,\s*", ", ", address)
+    return " ".join(address.split()).strip(" ,")
+
+
+# ---------------------------
+# Persistent cache (SQLite)
+# ---------------------------
+class GeocodeCache:
+    def __init__(self, path=CACHE_PATH):
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode_cache ("
+                " key TEXT PRIMARY KEY, query TEXT NOT NULL,"
+                " lat REAL, lng REAL, updated_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str):
+        """(lat, lng) on a hit, None on a cached miss, MISSING when unknown or due for retry."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lat, lng, updated_at FROM geocode_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return MISSING
+        lat, lng, updated_at = row
+        if lat is None:
+            return None if time.time() - updated_at < MISS_RETRY_AFTER else MISSING
+        return lat, lng
+
+    def put(self, key: str, query: str, coords: Optional[Coords]):
+        lat, lng = coords if coords else (None, None)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode_cache (key, query, lat, lng, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (key, query, lat, lng, time.time()),
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+# ---------------------------
+# Rate limiting
+# ---------------------------
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, at most `capacity` banked."""
+
+    def __init__(self, rate: float = RATE_PER_SEC, capacity: int = BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def nominatim_geocoder(timeout: int = 10) -> Geocoder:
+    """Async Nominatim lookup over the shared HTTP client (pool, breaker, retry budget)."""
+    from geopy.geocoders import Nominatim
+
+    from app.services.http_client import SharedClientAdapter
+
+    geolocator = Nominatim(user_agent=USER_AGENT, timeout=timeout, adapter_factory=SharedClientAdapter)
+
+    async def geocode(query: str) -> Optional[Coords]:
+        loc = await geolocator.geocode(query)
+        return (loc.latitude, loc.longitude) if loc else None
+
+    return geocode
+
+
+# ---------------------------
+# Pipeline
+# ---------------------------
+class GeocodingPipeline:
+    def __init__(self, geocoder: Geocoder, cache: GeocodeCache, bucket: Optional[TokenBucket] = None,
+                 concurrency: int = CONCURRENCY):
+        self.geocoder = geocoder
+        self.cache = cache
+        self.bucket = bucket or TokenBucket()
+        self.concurrency = concurrency
+        self.stats = {"cache_hits": 0, "geocoded": 0, "misses": 0, "errors": 0}
+
+    async def geocode(self, query: str, executor: Optional[ThreadPoolExecutor] = None) -> Optional[Coords]:
+        loop = asyncio.get_running_loop()
+        key = normalize_address(query)
+        cached = await loop.run_in_executor(executor, self.cache.get, key)
+        if cached is not MISSING:
+            self.stats["cache_hits"] += 1
+            return cached
+
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            await self.bucket.acquire()
+            try:
+                if asyncio.iscoroutinefunction(self.geocoder):
+                    coords = await self.geocoder(query)
+                else:
+                    coords = await loop.run_in_executor(executor, self.geocoder, query)
+            except Exception as e:
+                logger.warning(f"❌ Geocoding '{query}' failed (attempt {attempt}/{MAX_ATTEMPTS}): {e}")
+                await asyncio.sleep(min(2 ** attempt, 10))
+                continue
+            await loop.run_in_executor(executor, self.cache.put, key, query, coords)
+            self.stats["geocoded" if coords else "misses"] += 1
+            return coords
+        self.stats["errors"] += 1
+        return None
+
+    async def run(self, items: Iterable[Tuple[object, str]],
+                  on_result: Optional[Callable[[object, Coords], Awaitable[None]]] = None) -> dict:
+        """Geocode (item_id, query) pairs; `on_result` is awaited for each success as it lands."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = {}
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="geocode") as executor:
+            async def one(item_id, query):
+                async with semaphore:
+                    coords = await self.geocode(query, executor)
+                if coords:
+                    results[item_id] = coords
+                    if on_result is not None:
+                        await on_result(item_id, coords)
+
+            await asyncio.gather(*(one(item_id, query) for item_id, query in items))
+        return results
@@ -1,24 +1,46 @@
 # app/services/hospital_service.py
+import os
 import redis
 import json
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 # ---------------- Redis Client ----------------
-redis_client = redis.Redis(host="redis", port=6379, db=0, decode_responses=True)
+# Socket timeouts so a hung Redis fails the call instead of blocking a worker thread indefinitely
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "2"))
+redis_client = redis.Redis(host=os.getenv("REDIS_HOST", "redis"), port=6379, db=0, decode_responses=True,
+                           socket_connect_timeout=REDIS_SOCKET_TIMEOUT, socket_timeout=REDIS_SOCKET_TIMEOUT)
+
+# ---------------- Snapshot keyspace (written by update_hospital_data) ----------------
+HOSPITALS_CURRENT_KEY = "hospitals:current"      # -> version of the live snapshot
+HOSPITALS_UPDATES_CHANNEL = "hospitals:updates"  # pub/sub change notifications
+
+def hospitals_version_key(version: str) -> str:
+    return f"hospitals:v:{version}"
+
+def get_hospitals_version() -> Optional[str]:
+    return redis_client.get(HOSPITALS_CURRENT_KEY)
+
+def get_all_hospitals_from_redis() -> List[Dict]:
+    # The previous version is kept alive briefly after a swap, so a concurrent
+    # update can't empty this read; retry once if the pointer moved under us.
+    for _ in range(2):
+        version = redis_client.get(HOSPITALS_CURRENT_KEY)
+        if not version:
+            return []
+        raw_values = redis_client.hvals(hospitals_version_key(version))
+        if raw_values:
+            break
+    else:
+        return []
 
-def get_all_hospitals_from_redis():
-    keys = redis_client.keys("hospital:*")
     hospitals = []
-    for key in keys:
-        # Skip non-hospital keys like "hospital:count"
-        if key == "hospital:count":
-            continue
+    for raw in raw_values:
         try:
-            data = json.loads(redis_client.get(key))
+            data = json.loads(raw)
             # Optional: validate it's a dict with 'name'
             if isinstance(data, dict) and "name" in data:
                 hospitals.append(data)
         except (TypeError, json.JSONDecodeError):
             continue  # skip invalid entries
     hospitals.sort(key=lambda x: x.get("name", ""))
-    return hospitals
\ No newline at end of file
+    return hospitals
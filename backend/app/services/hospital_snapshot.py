@@ -0,0 +1,60 @@
+# app/services/hospital_snapshot.py
+"""
+Last-known-good copy of the hospital list on local disk.
+
+Every time triage reads a new hospitals version from Redis, the list is
+written to LOCAL_STATE_DIR/hospitals_lkg.json (atomic replace). When Redis is
+down, recommendations are ranked from that file — possibly a few minutes old,
+but far better than no hospitals at all — and it survives restarts.
+"""
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("hospital_snapshot")
+
+# ---------------------------
+# Config
+# ---------------------------
+LOCAL_STATE_DIR = os.getenv("LOCAL_STATE_DIR", "var")
+SNAPSHOT_PATH = os.getenv("HOSPITAL_SNAPSHOT_PATH", os.path.join(LOCAL_STATE_DIR, "hospitals_lkg.json"))
+
+_state: Dict[str, object] = {"version": None, "hospitals": None, "saved_at": None}
+
+
+def save(version: Optional[str], hospitals: List[Dict], path: Optional[str] = None):
+    """Remember `hospitals` as last known good (writes the file once per version)."""
+    if not hospitals or (version is not None and version == _state["version"]):
+        return
+    path = path or SNAPSHOT_PATH
+    saved_at = time.time()
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".hospitals_")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"version": version, "saved_at": saved_at, "hospitals": hospitals}, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"⚠️ Could not write hospital snapshot: {e}")
+    _state.update(version=version, hospitals=hospitals, saved_at=saved_at)
+
+
+def load(path: Optional[str] = None) -> List[Dict]:
+    """The last-known-good list (memory first, then the file; [] if there is none)."""
+    if _state["hospitals"] is None:
+        try:
+            with open(path or SNAPSHOT_PATH) as f:
+                data = json.load(f)
+            _state.update(version=data.get("version"), hospitals=data.get("hospitals") or [],
+                          saved_at=data.get("saved_at"))
+            logger.info(f"📂 Loaded hospital snapshot {data.get('version')} from disk")
+        except (OSError, ValueError):
+            return []
+    return [dict(h) for h in _state["hospitals"]]  # callers annotate their copies
+
+
+def age_seconds() -> Optional[float]:
+    return time.time() - _state["saved_at"] if _state["saved_at"] else None
@@ -0,0 +1,95 @@
+# app/services/http_cache.py
+"""
+HTTP caching for endpoints whose answer only changes with the AHS snapshot
+(`GET /ed-waits/`, `GET /recommend`).
+
+`snapshot_response` gives them:
+
+* a strong ETag derived from the snapshot version, the variant (e.g. the
+  region asked for) and the encoding — same tag, same bytes;
+* `304 Not Modified` when If-None-Match matches, before any body is built;
+* `Cache-Control: public, max-age, stale-while-revalidate` so browsers and a
+  CDN in front of the API can absorb most polling;
+* the gzip / brotli body compressed once per version (see
+  wire_format.SnapshotBodies) instead of per response.
+"""
+import hashlib
+import os
+from typing import Any, Callable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.services import wire_format
+
+# ---------------------------
+# Config
+# ---------------------------
+MAX_AGE = int(os.getenv("SNAPSHOT_MAX_AGE", "15"))  # about as long as a worker keeps serving one snapshot (AHS_L1_TTL)
+STALE_WHILE_REVALIDATE = int(os.getenv("SNAPSHOT_STALE_WHILE_REVALIDATE", "60"))
+
+VARY = "Accept, Accept-Encoding"
+
+
+def etag_for(version: str, variant: str, fmt: str, coding: str = wire_format.IDENTITY) -> str:
+    """Strong ETag; each content coding is its own representation, so it gets its own tag."""
+    digest = hashlib.sha1(f"{version}|{variant}|{fmt}".encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"' if coding == wire_format.IDENTITY else f'"{digest}-{coding}"'
+
+
+def _opaque(tag: str) -> str:
+    """Tag without W/, quotes or content-coding suffix (If-None-Match uses weak comparison)."""
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    return tag.strip('"').split("-", 1)[0]
+
+
+def matching_tag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """The client's tag that matches `etag` (any content coding of it), or None."""
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    for tag in if_none_match.split(","):
+        if _opaque(tag) == _opaque(etag):
+            return tag.strip()
+    return None
+
+
+def snapshot_response(request: Request, bodies: wire_format.SnapshotBodies, version: Optional[str],
+                      variant: str, build: Callable[[], Any]) -> Response:
+    """The (possibly 304) response for one view of a snapshot.
+
+    `build()` runs at most once per version, variant and encoding; with no
+    version (fallback data) the body is built every time and not cached downstream.
+    """
+    fmt = wire_format.request_format(request)
+    coding = wire_format.negotiate_coding(request.headers.get("accept-encoding"))
+    headers = {"Vary": VARY}
+
+    if version is None:
+        headers["Cache-Control"] = "no-cache"
+    else:
+        headers["Cache-Control"] = f"public, max-age={MAX_AGE}, stale-while-revalidate={STALE_WHILE_REVALIDATE}"
+
+    if version is not None:
+        # The tag the client holds came from a 200 for the same Accept / Accept-Encoding
+        matched = matching_tag(request.headers.get("if-none-match"), etag_for(version, variant, fmt))
+        if matched:
+            headers["ETag"] = matched
+            return Response(status_code=304, headers=headers)
+
+    body = bodies.get(version, variant, fmt, build)
+    if coding == wire_format.IDENTITY or len(body) < wire_format.COMPRESS_MIN_BYTES:
+        coding = wire_format.IDENTITY  # small bodies aren't worth a compressed variant
+    elif version is None:
+        body = wire_format.compress(body, coding)
+    else:
+        body = bodies.get(version, variant, fmt, build, coding)  # compressed once per version
+
+    if coding != wire_format.IDENTITY:
+        headers["Content-Encoding"] = coding
+    if version is not None:
+        headers["ETag"] = etag_for(version, variant, fmt, coding)
+    return Response(body, media_type=wire_format.media_type(fmt), headers=headers)
@@ -0,0 +1,267 @@
+# app/services/http_client.py
+"""
+One pooled async HTTP client for every outbound call (AHS wait times, geocoding).
+
+The client is created in the app startup hook and closed on shutdown, so
+connections (DNS, TCP, TLS) are reused across requests. Each upstream host gets
+its own circuit breaker, and retries are limited by a shared retry budget so an
+outage can't be amplified by our own retry traffic.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+from geopy.adapters import AdapterHTTPError, BaseAsyncAdapter
+from geopy.exc import GeocoderParseError, GeocoderServiceError, GeocoderTimedOut, GeocoderUnavailable
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger("http_client")
+
+# ---------------------------
+# Config
+# ---------------------------
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "15"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "5"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+RETRY_BUDGET_RATIO = float(os.getenv("HTTP_RETRY_BUDGET_RATIO", "0.2"))  # retries per request
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("HTTP_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SEC = float(os.getenv("HTTP_BREAKER_RESET_SEC", "30"))
+
+USER_AGENT = "Mozilla/5.0 (HealthFlow AI; +https://github.com/yourname/healthflow)"
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Closed → open after N consecutive failures → half-open after a cool-down."""
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_after: float = BREAKER_RESET_SEC):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold or self.state == "half_open":
+            self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """
+    Token bucket that earns `ratio` tokens per request and spends one per retry,
+    so retries never exceed roughly `ratio` × normal traffic.
+    """
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, min_tokens: float = 3.0, max_tokens: float = 50.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = min_tokens
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class SharedHTTPClient:
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT, pool=HTTP_POOL_TIMEOUT
+            ),
+            transport=transport,
+        )
+        self.retry_budget = RetryBudget()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.counters = {"requests": 0, "retries": 0, "failures": 0, "short_circuited": 0, "in_flight": 0}
+
+    def _breaker(self, url: str) -> CircuitBreaker:
+        host = urlparse(url).netloc
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker()
+        return self.breakers[host]
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request with per-host circuit breaking and budgeted retries."""
+        breaker = self._breaker(url)
+        if not breaker.allow():
+            self.counters["short_circuited"] += 1
+            raise CircuitOpenError(f"Circuit open for {urlparse(url).netloc}")
+
+        self.counters["requests"] += 1
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            self.counters["in_flight"] += 1
+            try:
+                response = await self.client.request(method, url, **kwargs)
+                if response.status_code not in RETRYABLE_STATUS:
+                    breaker.record_success()
+                    return response
+                error: Exception = httpx.HTTPStatusError(
+                    f"Retryable status {response.status_code}", request=response.request, response=response
+                )
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                error = e
+            finally:
+                self.counters["in_flight"] -= 1
+
+            breaker.record_failure()
+            if attempt >= HTTP_MAX_RETRIES or not breaker.allow() or not self.retry_budget.withdraw():
+                self.counters["failures"] += 1
+                if isinstance(error, httpx.HTTPStatusError):
+                    return error.response
+                raise error
+
+            attempt += 1
+            self.counters["retries"] += 1
+            delay = min(2.0, 0.2 * 2 ** attempt) * (0.5 + random.random())
+            logger.warning(f"🔁 Retrying {method} {url} in {delay:.2f}s (attempt {attempt}): {error}")
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def get_json(self, url: str, **kwargs):
+        response = await self.get(url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def stats(self) -> dict:
+        """Pool usage and resilience counters for the metrics endpoint."""
+        pool = getattr(getattr(self.client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for c in connections if c.is_idle())
+        return {
+            "http2": HTTP2_AVAILABLE,
+            "pool": {
+                "max_connections": HTTP_MAX_CONNECTIONS,
+                "max_keepalive": HTTP_MAX_KEEPALIVE,
+                "open_connections": len(connections),
+                "idle_connections": idle,
+                "active_connections": len(connections) - idle,
+            },
+            "retry_budget_tokens": round(self.retry_budget.tokens, 2),
+            "breakers": {host: b.state for host, b in self.breakers.items()},
+            **self.counters,
+        }
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+# ---------------------------
+# Application-scoped instance
+# ---------------------------
+_client: Optional[SharedHTTPClient] = None
+
+
+def get_http_client() -> SharedHTTPClient:
+    """Return the shared client, creating it lazily for scripts and tests."""
+    global _client
+    if _client is None:
+        _client = SharedHTTPClient()
+    return _client
+
+
+async def startup():
+    get_http_client()
+    logger.info(f"✅ Shared HTTP client ready (http2={HTTP2_AVAILABLE})")
+
+
+async def shutdown():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# ---------------------------
+# geopy adapter (geocoders share the same pool)
+# ---------------------------
+class SharedClientAdapter(BaseAsyncAdapter):
+    """geopy async adapter backed by the shared httpx client."""
+
+    def __init__(self, *, proxies=None, ssl_context=None):
+        super().__init__(proxies=proxies, ssl_context=ssl_context)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass  # the pool outlives individual geocoders
+
+    async def _get(self, url, *, timeout, headers) -> httpx.Response:
+        try:
+            response = await get_http_client().get(url, timeout=timeout, headers=headers)
+        except httpx.TimeoutException as e:
+            raise GeocoderTimedOut(str(e))
+        except CircuitOpenError as e:
+            raise GeocoderUnavailable(str(e))
+        except httpx.TransportError as e:
+            raise GeocoderUnavailable(str(e))
+        except httpx.HTTPError as e:
+            raise GeocoderServiceError(str(e))
+        if response.status_code >= 400:
+            raise AdapterHTTPError(
+                f"Non-successful status code {response.status_code}",
+                status_code=response.status_code,
+                headers=response.headers,
+                text=response.text,
+            )
+        return response
+
+    async def get_text(self, url, *, timeout, headers):
+        return (await self._get(url, timeout=timeout, headers=headers)).text
+
+    async def get_json(self, url, *, timeout, headers):
+        response = await self._get(url, timeout=timeout, headers=headers)
+        try:
+            return response.json()
+        except ValueError:
+            raise GeocoderParseError(f"Could not deserialize using deserializer:\n{response.text}")
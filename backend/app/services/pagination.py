@@ -0,0 +1,62 @@
+# app/services/pagination.py
+"""
+Keyset (seek) pagination on (timestamp, id), newest first.
+
+Each page is `WHERE (ts, id) < (:last_ts, :last_id) ORDER BY ts DESC, id DESC
+LIMIT n` — an index range scan on a composite (ts, id) index — so page 10,000
+costs the same as page 1, unlike OFFSET. Cursors are opaque base64 tokens.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH_SIZE = 2000
+
+
+def encode_cursor(ts: datetime, row_id: int) -> str:
+    raw = json.dumps([ts.isoformat(), row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raises ValueError on a malformed cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(ts), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def keyset_page(db, stmt, ts_col, id_col, cursor: Optional[str], limit: int) -> Tuple[List, Optional[str]]:
+    """One page of `stmt` (a select of ORM entities) plus the cursor for the next page."""
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(ts_col, id_col) < tuple_(ts, row_id))
+    rows = list(db.scalars(stmt.order_by(ts_col.desc(), id_col.desc()).limit(limit + 1)))
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, ts_col.key), getattr(last, id_col.key))
+    return rows, next_cursor
+
+
+def keyset_iter(session_factory, stmt, ts_col, id_col, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator:
+    """Walk every row of `stmt` in keyset batches (constant memory, short transactions)."""
+    cursor = None
+    while True:
+        db = session_factory()
+        try:
+            rows, cursor = keyset_page(db, stmt, ts_col, id_col, cursor, batch_size)
+            db.expunge_all()
+        finally:
+            db.close()
+        yield from rows
+        if not cursor:
+            return
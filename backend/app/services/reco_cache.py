@@ -0,0 +1,134 @@
+# app/services/reco_cache.py
+"""
+Recommendation result cache, bucketed by geohash cell.
+
+Patients in the same precision-6 cell (~1.2 × 0.6 km) asking against the same
+data snapshot get the same ranked list, so it is computed once per cell,
+category and snapshot version — at the cell centre — and then served from the
+worker's memory (L1) or from Redis (L2, shared by all workers).
+
+The snapshot version is part of the key, so a new wait-time snapshot is an
+automatic invalidation: L1 drops everything when it sees a new version and the
+old Redis entries simply expire.
+"""
+import json
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from app.services.redis_client import async_r, r
+from app.utils.geo import geohash_center, geohash_encode
+
+logger = logging.getLogger("reco_cache")
+
+# ---------------------------
+# Config
+# ---------------------------
+GEOHASH_PRECISION = int(os.getenv("RECO_CACHE_PRECISION", "6"))
+REDIS_TTL = int(os.getenv("RECO_CACHE_TTL", "900"))          # seconds; > snapshot interval
+L1_MAX_ENTRIES = int(os.getenv("RECO_CACHE_L1_MAX", "5000"))
+
+_redis = async_r   # async paths (/recommend/gps)
+_redis_sync = r    # sync paths (triage service)
+_l1: Dict[str, Any] = {}
+_l1_versions: Dict[str, str] = {}  # namespace -> version currently held in L1
+stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0}
+
+
+def cell_for(lat: float, lng: float) -> Tuple[str, float, float]:
+    """Geohash cell of a point and the cell centre used to compute its result."""
+    cell = geohash_encode(lat, lng, GEOHASH_PRECISION)
+    center_lat, center_lng = geohash_center(cell)
+    return cell, center_lat, center_lng
+
+
+def cache_key(namespace: str, version: str, category: str, cell: str) -> str:
+    return f"reco:{namespace}:{version}:{category}:{cell}"
+
+
+def _l1_get(namespace: str, version: str, key: str):
+    if _l1_versions.get(namespace) != version:
+        # New snapshot for this namespace: everything we hold for it is stale
+        prefix = f"reco:{namespace}:"
+        for k in [k for k in _l1 if k.startswith(prefix)]:
+            del _l1[k]
+        _l1_versions[namespace] = version
+        return None
+    return _l1.get(key)
+
+
+def _l1_put(key: str, value):
+    if len(_l1) >= L1_MAX_ENTRIES:
+        _l1.pop(next(iter(_l1)))  # evict the oldest insert
+    _l1[key] = value
+
+
+async def get_or_compute(namespace: str, version: Optional[str], category: str,
+                         lat: float, lng: float, compute: Callable[[float, float], Awaitable[Any]]):
+    """Async lookup; `compute(center_lat, center_lng)` runs only on a miss."""
+    cell, c_lat, c_lng = cell_for(lat, lng)
+    if not version:
+        return await compute(c_lat, c_lng)
+
+    key = cache_key(namespace, version, category, cell)
+    value = _l1_get(namespace, version, key)
+    if value is not None:
+        stats["l1_hits"] += 1
+        return value
+    try:
+        raw = await _redis.get(key)
+        if raw:
+            value = json.loads(raw)
+            stats["l2_hits"] += 1
+            _l1_put(key, value)
+            return value
+    except RedisError as e:
+        logger.warning(f"⚠️ Redis unavailable for recommendation cache: {e}")
+
+    stats["misses"] += 1
+    value = await compute(c_lat, c_lng)
+    _l1_put(key, value)
+    try:
+        await _redis.set(key, json.dumps(value), ex=REDIS_TTL)
+    except RedisError:
+        pass
+    return value
+
+
+def get_or_compute_sync(namespace: str, version: Optional[str], category: str,
+                        lat: float, lng: float, compute: Callable[[float, float], Any]):
+    """Same as get_or_compute for synchronous callers."""
+    cell, c_lat, c_lng = cell_for(lat, lng)
+    if not version:
+        return compute(c_lat, c_lng)
+
+    key = cache_key(namespace, version, category, cell)
+    value = _l1_get(namespace, version, key)
+    if value is not None:
+        stats["l1_hits"] += 1
+        return value
+    try:
+        raw = _redis_sync.get(key)
+        if raw:
+            value = json.loads(raw)
+            stats["l2_hits"] += 1
+            _l1_put(key, value)
+            return value
+    except RedisError as e:
+        logger.warning(f"⚠️ Redis unavailable for recommendation cache: {e}")
+
+    stats["misses"] += 1
+    value = compute(c_lat, c_lng)
+    _l1_put(key, value)
+    try:
+        _redis_sync.set(key, json.dumps(value), ex=REDIS_TTL)
+    except RedisError:
+        pass
+    return value
+
+
+def clear():
+    _l1.clear()
+    _l1_versions.clear()
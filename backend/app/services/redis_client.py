@@ -1,10 +1,14 @@
 import redis
+import redis.asyncio as aioredis
 import json
 import os
 
-REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_URL = os.getenv("REDIS_URL", f"redis://{os.getenv('REDIS_HOST', 'localhost')}:6379/0")
 r = redis.Redis.from_url(REDIS_URL, decode_responses=True)
 
+# Async, binary-safe client for event-loop code (msgpack snapshots, locks, pub/sub)
+async_r = aioredis.Redis.from_url(REDIS_URL, decode_responses=False)
+
 def set_hospital_data(data: dict, expire_sec: int = 300):
     """Save hospital data with TTL (default 5 minutes)."""
     r.set("hospital_data", json.dumps(data), ex=expire_sec)
@@ -0,0 +1,150 @@
+# app/services/travel_time.py
+"""
+Precomputed drive times from geohash cells to facilities.
+
+The grid is built offline (scripts/build_travel_time_grid.py) from a local OSM
+extract and stored as:
+
+    <dir>/grid.npy     uint16 minutes, shape (cells, facilities); 65535 = unreachable
+    <dir>/index.json   {"precision": 5, "cells": [...geohashes], "facilities": [...facility IDs]}
+
+At startup the matrix is memory-mapped, so ranking costs one geohash encode plus
+one array read per facility. Cells or facilities missing from the grid fall
+back to a straight-line estimate.
+"""
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.geo import geohash_center, geohash_encode, haversine_km
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Config
+# ---------------------------
+GRID_DIR = Path(os.getenv("TRAVEL_TIME_GRID_DIR", Path(__file__).parent.parent / "data" / "travel_time"))
+UNREACHABLE = np.iinfo(np.uint16).max
+FALLBACK_ROAD_SPEED_KMH = 60.0   # used when the grid has no answer
+FALLBACK_DETOUR_FACTOR = 1.3     # road distance / straight-line distance
+ALBERTA_BBOX = (49.0, 60.0, -120.0, -110.0)  # lat_min, lat_max, lng_min, lng_max
+
+
+def facility_key(facility) -> str:
+    """Grid columns are keyed by facility ID (as a string)."""
+    return str(facility).strip()
+
+
+class TravelTimeGrid:
+    def __init__(self, matrix: np.ndarray, cells: List[str], facilities: List[str], precision: int):
+        self.matrix = matrix
+        self.precision = precision
+        self.cells = cells
+        self.facilities = facilities
+        self.cell_index = {c: i for i, c in enumerate(cells)}
+        self.facility_index = {facility_key(f): j for j, f in enumerate(facilities)}
+
+    @classmethod
+    def load(cls, directory: Path) -> "TravelTimeGrid":
+        with open(directory / "index.json", "r", encoding="utf-8") as f:
+            index = json.load(f)
+        matrix = np.load(directory / "grid.npy", mmap_mode="r")
+        return cls(matrix, index["cells"], index["facilities"], index["precision"])
+
+    def save(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "grid.npy", np.asarray(self.matrix, dtype=np.uint16))
+        with open(directory / "index.json", "w", encoding="utf-8") as f:
+            json.dump({"precision": self.precision, "cells": self.cells, "facilities": self.facilities}, f)
+
+    def cell_row(self, lat: float, lng: float) -> Optional[np.ndarray]:
+        i = self.cell_index.get(geohash_encode(lat, lng, self.precision))
+        return None if i is None else self.matrix[i]
+
+    def minutes(self, lat: float, lng: float, facility) -> Optional[float]:
+        j = self.facility_index.get(facility_key(facility))
+        if j is None:
+            return None
+        row = self.cell_row(lat, lng)
+        if row is None or row[j] == UNREACHABLE:
+            return None
+        return float(row[j])
+
+
+# ---------------------------
+# Building (offline / synthetic)
+# ---------------------------
+def enumerate_cells(bbox: Tuple[float, float, float, float], precision: int) -> List[str]:
+    """All geohash cells of `precision` whose centers fall inside bbox."""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = (5 * precision) // 2
+    lat_step, lng_step = 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+    lat_min, lat_max, lng_min, lng_max = bbox
+    cells = []
+    lat = lat_min + lat_step / 2
+    while lat < lat_max:
+        lng = lng_min + lng_step / 2
+        while lng < lng_max:
+            cells.append(geohash_encode(lat, lng, precision))
+            lng += lng_step
+        lat += lat_step
+    return sorted(set(cells))
+
+
+def build_synthetic_grid(facilities: Dict[str, Tuple[float, float]], bbox: Tuple[float, float, float, float],
+                         precision: int = 5, speed_kmh: float = FALLBACK_ROAD_SPEED_KMH,
+                         detour: float = FALLBACK_DETOUR_FACTOR) -> TravelTimeGrid:
+    """Straight-line × detour / speed grid — for tests and for areas without an OSM extract."""
+    cells = enumerate_cells(bbox, precision)
+    names = [facility_key(f) for f in facilities]
+    centers = np.array([geohash_center(c) for c in cells])
+    fac = np.array(list(facilities.values()))
+    lat1, lng1 = np.radians(centers[:, :1]), np.radians(centers[:, 1:])
+    lat2, lng2 = np.radians(fac[:, 0])[None, :], np.radians(fac[:, 1])[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    km = 6371 * 2 * np.arcsin(np.sqrt(a))
+    minutes = np.minimum(np.rint(km * detour / speed_kmh * 60), UNREACHABLE - 1).astype(np.uint16)
+    return TravelTimeGrid(minutes, cells, names, precision)
+
+
+# ---------------------------
+# Runtime access
+# ---------------------------
+_grid: Optional[TravelTimeGrid] = None
+
+
+def load_grid(directory: Path = GRID_DIR) -> Optional[TravelTimeGrid]:
+    """Memory-map the grid at startup (missing grid → straight-line estimates)."""
+    global _grid
+    if not (directory / "grid.npy").exists():
+        logger.warning(f"⚠️ No travel-time grid at {directory}; using straight-line estimates")
+        return None
+    try:
+        _grid = TravelTimeGrid.load(directory)
+        logger.info(f"✅ Travel-time grid loaded: {len(_grid.cells)} cells × {len(_grid.facilities)} facilities")
+    except Exception as e:
+        logger.error(f"❌ Failed to load travel-time grid: {e}")
+        _grid = None
+    return _grid
+
+
+def set_grid(grid: Optional[TravelTimeGrid]):
+    global _grid
+    _grid = grid
+
+
+def drive_minutes(lat: float, lng: float, facility,
+                  facility_lat: Optional[float] = None, facility_lng: Optional[float] = None) -> Optional[float]:
+    """Drive time in minutes: grid lookup first, straight-line estimate otherwise."""
+    if _grid is not None and facility is not None:
+        minutes = _grid.minutes(lat, lng, facility)
+        if minutes is not None:
+            return minutes
+    if facility_lat is None or facility_lng is None:
+        return None
+    km = haversine_km(lat, lng, facility_lat, facility_lng)
+    return round(km * FALLBACK_DETOUR_FACTOR / FALLBACK_ROAD_SPEED_KMH * 60, 1)
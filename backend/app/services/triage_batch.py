@@ -0,0 +1,265 @@
+# app/services/triage_batch.py
+"""
+Bulk triage scoring (re-scoring intake logs, nightly audits).
+
+Same decisions as `process_triage`, restructured for throughput:
+
+* greetings and safety-override keywords are found with one compiled regex
+  per chunk instead of a Python loop per keyword;
+* every row that reaches the NLP model is scored in a single TF-IDF
+  transform + `predict` call; only rows the model can't score go through
+  the per-row rules fallback;
+* hospital lookups (geohash-cached) and persistence are optional, and
+  persistence is one flush/commit per chunk rather than three commits per row.
+
+Persisted rows go through `audit_spool.insert_records` with an idempotency key
+derived from the batch id, the line number and the payload, so a client that
+re-sends a batch after a dropped stream doesn't insert its rows again.
+"""
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.endpoints.triage_logic import _triage_logic_fallback, nlp_model_data, nlp_result, predict_levels
+from app.models.triage_models import TriageReqModel
+from app.services import audit_spool
+from app.services.triage_service import (
+    DANGER_KEYWORDS, _apply_clinical_safety_override, _get_hospital_recommendations, _greetings_variations,
+    handle_greetings, humanize_response,
+)
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Config
+# ---------------------------
+CHUNK_ROWS = int(os.getenv("TRIAGE_BATCH_CHUNK_ROWS", "5000"))
+# How far back a re-sent batch is checked for rows it already wrote
+DEDUPE_WINDOW = timedelta(hours=float(os.getenv("TRIAGE_BATCH_DEDUPE_HOURS", "72")))
+
+_GREETING_RE = re.compile("|".join(rf"\b{re.escape(p)}\b" for p in _greetings_variations))
+_DANGER_RE = re.compile("|".join(re.escape(kw) for kw in DANGER_KEYWORDS))
+
+
+# ---------------------------
+# Input parsing
+# ---------------------------
+def _csv_payload(row: Dict[str, str]) -> dict:
+    payload = {k: v for k, v in row.items() if v not in (None, "")}
+    if "age" in payload:
+        payload["age"] = int(float(payload["age"]))
+    for key in ("lat", "lng"):
+        if key in payload:
+            payload[key] = float(payload[key])
+    if "known_conditions" in payload:
+        payload["known_conditions"] = [c.strip() for c in payload["known_conditions"].split(";") if c.strip()]
+    return payload
+
+
+def iter_payloads(lines: Iterable[str], fmt: str = "ndjson") -> Iterator[dict]:
+    """Payload dicts from NDJSON lines or CSV (header row; known_conditions `;`-separated).
+
+    Unparseable lines yield `{"_error": ...}` so results stay aligned with the input.
+    """
+    if fmt == "csv":
+        for row in csv.DictReader(lines):
+            try:
+                yield _csv_payload(row)
+            except ValueError as e:
+                yield {"_error": f"Invalid CSV row: {e}"}
+        return
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            payload = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {"_error": f"Invalid JSON: {e}"}
+            continue
+        yield payload if isinstance(payload, dict) else {"_error": "Each line must be a JSON object"}
+
+
+def chunked(payloads: Iterable[dict], size: int = CHUNK_ROWS) -> Iterator[List[dict]]:
+    chunk = []
+    for payload in payloads:
+        chunk.append(payload)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ---------------------------
+# Scoring
+# ---------------------------
+def _error_result(message: str, received_at: str, error: str) -> dict:
+    return {
+        "response": message,
+        "recommended_level": "Error",
+        "score": 0,
+        "reasons": ["Invalid input format"],
+        "suggested_action": "Ensure symptoms are text and age is a number.",
+        "hospital_recommendation": None,
+        "received_at": received_at,
+        "meta": {"error": error},
+    }
+
+
+def score_batch(payloads: List[dict], hospitals: bool = False) -> List[dict]:
+    """Triage results for a chunk of payloads, in input order.
+
+    Rows that `process_triage` would audit carry an `_audit` entry, used by
+    `persist_results` and removed by `strip_internal`.
+    """
+    now = datetime.utcnow()
+    received_at = now.isoformat()
+    results: List[Optional[dict]] = [None] * len(payloads)
+    to_model: List[int] = []
+    requests: Dict[int, TriageReqModel] = {}
+
+    for i, payload in enumerate(payloads):
+        if "_error" in payload:
+            results[i] = _error_result("Unable to process symptoms. Please try again.", received_at, payload["_error"])
+            continue
+        symptoms = payload.get("symptoms")
+        symptoms = symptoms.strip() if isinstance(symptoms, str) else ""
+        if not symptoms:
+            results[i] = {"response": "No symptoms provided"}
+            continue
+
+        lowered = symptoms.lower()
+        if _GREETING_RE.search(lowered):
+            results[i] = {
+                "response": handle_greetings(symptoms),
+                "recommended_level": "None",
+                "score": None,
+                "reasons": [],
+                "suggested_action": None,
+                "hospital_recommendation": None,
+                "received_at": received_at,
+                "meta": {"type": "greeting"},
+            }
+            continue
+
+        known_conditions = payload.get("known_conditions") or []
+        if _DANGER_RE.search(lowered):
+            override = _apply_clinical_safety_override(symptoms, payload.get("age"), known_conditions)
+            results[i] = {**override, "_symptoms": symptoms}
+            continue
+
+        try:
+            requests[i] = TriageReqModel(symptoms=symptoms, age=payload.get("age"), known_conditions=known_conditions)
+        except ValidationError as e:
+            results[i] = _error_result("Unable to process symptoms. Please try again.", received_at, str(e))
+            continue
+        to_model.append(i)
+
+    # One matrix through the NLP model; rows it can't score fall back to the rules
+    levels = [None] * len(to_model)
+    if nlp_model_data and to_model:
+        levels = predict_levels([requests[i].symptoms for i in to_model],
+                                [requests[i].age or 45 for i in to_model])
+    for i, level in zip(to_model, levels):
+        req = requests[i]
+        result = nlp_result(req, level) if level else _triage_logic_fallback(req)
+        results[i] = {
+            "recommended_level": result.recommended_level,
+            "score": result.score,
+            "reasons": result.reasons,
+            "suggested_action": result.suggested_action,
+            "meta": result.meta,
+            "_symptoms": req.symptoms,
+        }
+
+    for i, payload in enumerate(payloads):
+        result = results[i]
+        if "_symptoms" not in result:
+            continue
+        level = result["recommended_level"]
+        hospital_reco = _get_hospital_recommendations(level, payload.get("lat"), payload.get("lng")) if hospitals else []
+        results[i] = {
+            "response": humanize_response(result["suggested_action"], level, hospital_reco),
+            "recommended_level": level,
+            "score": result["score"],
+            "reasons": result["reasons"],
+            "suggested_action": result["suggested_action"],
+            "hospital_recommendation": hospital_reco,
+            "received_at": received_at,
+            "meta": {"human_like": True, "batch": True, **result["meta"]},
+            "_audit": {"symptoms": result["_symptoms"], "received_at": now},
+        }
+
+    for payload, result in zip(payloads, results):
+        if "id" in payload:
+            result["id"] = payload["id"]
+    return results
+
+
+def row_key(batch_id: str, line: int, payload: dict) -> str:
+    """Idempotency key for one batch row: the same batch re-sent maps to the same keys."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{batch_id}:{line}:{canonical}".encode("utf-8")).hexdigest()[:32]
+
+
+def persist_results(db: Session, payloads: List[dict], results: List[dict],
+                    batch_id: Optional[str] = None, offset: int = 0) -> int:
+    """Audit rows + user/bot messages for a scored chunk, in one transaction.
+
+    `offset` is the chunk's first line number within the batch. Rows already
+    written under the same `batch_id` are skipped; without one every call
+    inserts. Returns how many rows were inserted.
+    """
+    batch_id = batch_id or uuid.uuid4().hex
+    records = [
+        {
+            "key": row_key(batch_id, offset + i, p),
+            "received_at": r["_audit"]["received_at"].isoformat(),
+            "symptoms": r["_audit"]["symptoms"],
+            "age": p.get("age"),
+            "known_conditions": p.get("known_conditions", []),
+            "recommended_level": r["recommended_level"],
+            "score": r["score"],
+            "reasons": r["reasons"],
+            "suggested_action": r["suggested_action"],
+            "hospital_recommendation": r["hospital_recommendation"],
+            "meta": r["meta"],
+            "response": r["response"],
+        }
+        for i, (p, r) in enumerate(zip(payloads, results)) if "_audit" in r
+    ]
+    return audit_spool.insert_records(db, records, lookback=DEDUPE_WINDOW)
+
+
+def strip_internal(result: dict) -> dict:
+    result.pop("_audit", None)
+    return result
+
+
+def score_stream(payloads: Iterable[dict], hospitals: bool = False, persist: bool = False,
+                 session_factory=None, chunk_rows: int = CHUNK_ROWS,
+                 batch_id: Optional[str] = None) -> Iterator[List[dict]]:
+    """Score `payloads` chunk by chunk; yields each chunk's results (memory stays per-chunk).
+
+    Pass the same `batch_id` when re-sending a batch so persisted rows aren't duplicated.
+    """
+    if persist and session_factory is None:
+        from app.database import SessionLocal as session_factory
+    batch_id = batch_id or uuid.uuid4().hex
+    offset = 0
+    for chunk in chunked(payloads, chunk_rows):
+        results = score_batch(chunk, hospitals=hospitals)
+        if persist:
+            with session_factory() as db:
+                persist_results(db, chunk, results, batch_id=batch_id, offset=offset)
+        offset += len(chunk)
+        yield [strip_internal(r) for r in results]
@@ -4,15 +4,15 @@ import re
 import random
 from datetime import datetime
 from sqlalchemy.orm import Session
-from typing import Optional, List, Dict
+from typing import AsyncIterator, Optional, List, Dict, Tuple
 import redis
-import json
 from geopy.distance import geodesic
 
-from app.services.hospital_service import get_all_hospitals_from_redis
-from app.endpoints.triage_logic import triage_logic
-from app.models.triage import TriageAudit, TriageMessage
-from app.models.triage_models import TriageReqModel
+from app.services.hospital_service import get_all_hospitals_from_redis, get_hospitals_version
+from app.services import audit_spool, degradation, hospital_snapshot, travel_time, reco_cache
+from app.services.wait_forecast import effective_wait_minutes
+from app.endpoints.triage_logic import _triage_logic_fallback, nlp_model_data, nlp_result, predict_levels
+from app.models.triage_models import TriageReqModel, TriageResult
 
 # ------------------------------- Logging -------------------------------
 logging.basicConfig(level=logging.INFO)
@@ -51,16 +51,26 @@ def handle_greetings(user_msg: str) -> Optional[str]:
     return random.choice(responses)
 
 # ------------------------------- Clinical Safety Override -------------------------------
+DANGER_KEYWORDS = [
+    "shortness of breath", "difficulty breathing", "can't breathe", "unable to breathe",
+    "chest pain", "pressure in chest", "unconscious", "fainting", "passed out",
+    "seizure", "stroke", "suicidal", "homicidal", "major trauma", "bleeding uncontrollably",
+    "nose bleed", "heavy bleeding", "bleeding won't stop", "dizzy from bleeding","heart attack",
+      "anaphylaxis", "allergic reaction swelling throat","cardiac arrest", "myocardial infarction"
+]
+
+_DANGER_RE = re.compile("|".join(re.escape(kw) for kw in DANGER_KEYWORDS))
+
+
+def is_critical(payload: dict) -> bool:
+    """Would this payload hit the safety override? (cheap; used to prioritize admission)"""
+    symptoms = payload.get("symptoms")
+    return isinstance(symptoms, str) and bool(_DANGER_RE.search(symptoms.lower()))
+
+
 def _apply_clinical_safety_override(symptoms: str, age: Optional[int], known_conditions: list) -> Optional[dict]:
-    danger_keywords = [
-        "shortness of breath", "difficulty breathing", "can't breathe", "unable to breathe",
-        "chest pain", "pressure in chest", "unconscious", "fainting", "passed out",
-        "seizure", "stroke", "suicidal", "homicidal", "major trauma", "bleeding uncontrollably",
-        "nose bleed", "heavy bleeding", "bleeding won't stop", "dizzy from bleeding","heart attack",
-          "anaphylaxis", "allergic reaction swelling throat","cardiac arrest", "myocardial infarction"
-    ]
     text_lower = symptoms.lower()
-    for kw in danger_keywords:
+    for kw in DANGER_KEYWORDS:
         if kw in text_lower:
             reasons = [f"🚨 SAFETY OVERRIDE: Critical symptom '{kw}' detected"]
             if age and age >= 65:
@@ -104,29 +114,196 @@ def _get_hospital_recommendations(level: str, lat: Optional[float], lng: Optiona
         return []
 
     patient_coords = (lat or DEFAULT_COORDS[0], lng or DEFAULT_COORDS[1])
+    try:
+        version = get_hospitals_version()
+    except redis.RedisError:
+        version = None
+    # Same geohash cell + same hospitals snapshot -> same list
+    return reco_cache.get_or_compute_sync(
+        "triage", version, level, patient_coords[0], patient_coords[1],
+        lambda c_lat, c_lng: _rank_hospitals(level, (c_lat, c_lng)),
+    )
+
+
+def _live_hospitals() -> List[Dict]:
+    """Hospitals from Redis; each new version is also kept as the last-known-good snapshot."""
+    version = get_hospitals_version()
     hospitals = get_all_hospitals_from_redis()
+    hospital_snapshot.save(version, hospitals)
+    return hospitals
+
+
+def _expected_wait(hosp: Dict, stale: bool) -> Optional[int]:
+    """Live wait, or the forecast when live is stale/missing; None when neither is known."""
+    minutes, source = effective_wait_minutes(hosp.get("name"), hosp.get("wait_time"), stale)
+    if minutes is None:
+        return None
+    hosp["wait_minutes"], hosp["wait_source"] = minutes, source
+    return minutes
+
+
+def _rank_hospitals(level: str, patient_coords: tuple, hospitals: Optional[List[Dict]] = None,
+                    stale: bool = False) -> List[Dict]:
+    if hospitals is None:
+        hospitals = _live_hospitals()
 
-    # Compute distances
-    for hosp in hospitals:
+    # Filter by category (Emergency / Urgent / PrimaryCare map 1:1); copies, the list may be shared
+    filtered = [dict(h) for h in hospitals if h.get("category") == level]
+
+    # Drive time from the precomputed grid (straight-line estimate if missing)
+    for hosp in filtered:
         if hosp.get("lat") and hosp.get("lng"):
             hosp["distance_km"] = round(geodesic(patient_coords, (hosp["lat"], hosp["lng"])).km, 1)
+            hosp["drive_minutes"] = travel_time.drive_minutes(
+                patient_coords[0], patient_coords[1], hosp.get("facility_id"), hosp["lat"], hosp["lng"]
+            )
         else:
             hosp["distance_km"] = None
+            hosp["drive_minutes"] = None
 
-    # Filter by category
-    if level == "Emergency":
-        filtered = [h for h in hospitals if h.get("category") == "Emergency"]
-    elif level == "Urgent":
-        filtered = [h for h in hospitals if h.get("category") == "Urgent"]
-    else:  # PrimaryCare
-        filtered = [h for h in hospitals if h.get("category") == "PrimaryCare"]
+    # Rank by drive time + expected wait (unknown waits last), exclude missing coords, return top 3
+    valid = [h for h in filtered if h["drive_minutes"] is not None]
+    waits = {id(h): _expected_wait(h, stale) for h in valid}
+    return sorted(valid, key=lambda x: (waits[id(x)] is None, x["drive_minutes"] + (waits[id(x)] or 0)))[:3]
 
-    # Sort by distance, exclude missing coords, return top 3
-    valid = [h for h in filtered if h["distance_km"] is not None]
-    return sorted(valid, key=lambda x: x["distance_km"])[:3]
+
+async def _hospital_recommendations(level: str, lat: Optional[float], lng: Optional[float]) -> Tuple[List[Dict], str]:
+    """(hospitals, source): live from Redis within its timeout, else from the last-known-good snapshot."""
+    if level not in ["Emergency", "Urgent", "PrimaryCare"]:
+        return [], "live"
+    try:
+        return await degradation.call_in_thread(degradation.redis, _get_hospital_recommendations, level, lat, lng), "live"
+    except degradation.DependencyUnavailable as e:
+        logger.warning(f"⚠️ {e}; ranking hospitals from the last-known-good snapshot")
+        patient_coords = (lat or DEFAULT_COORDS[0], lng or DEFAULT_COORDS[1])
+        # The snapshot may be minutes old: prefer forecasts over its wait strings
+        return _rank_hospitals(level, patient_coords, hospital_snapshot.load(), stale=True), "snapshot"
 
 # ------------------------------- Main Triage Pipeline -------------------------------
-async def process_triage(payload: dict, db: Session):
+async def _model_triage(req: TriageReqModel) -> Tuple[TriageResult, bool]:
+    """(result, degraded): NLP model then rules, like triage_logic, with model health tracked.
+
+    The model runs in a worker thread under its latency budget, so a slow
+    prediction never stalls the event loop. A model that raises or runs over
+    budget is taken out of the path for a while (rules-only) instead of being
+    retried on every request.
+    """
+    if not nlp_model_data:
+        return _triage_logic_fallback(req), False
+    try:
+        levels = await degradation.call_in_thread(
+            degradation.model, lambda: predict_levels([req.symptoms], [req.age or 45], [1], raise_errors=True)
+        )
+    except degradation.DependencyUnavailable as e:
+        logger.error(f"❌ NLP model unavailable, using rules: {e}")
+        return _triage_logic_fallback(req), True
+    level = levels[0]
+    return (nlp_result(req, level) if level else _triage_logic_fallback(req)), False
+
+
+def _triage_request(payload: dict, user_msg_text: str) -> Tuple[Optional[dict], Optional[TriageReqModel]]:
+    """(final result, None) for safety overrides and invalid input, else (None, request)."""
+    # Clinical Safety Override
+    safety_override = _apply_clinical_safety_override(
+        user_msg_text,
+        payload.get("age"),
+        payload.get("known_conditions", []),
+    )
+    if safety_override:
+        return safety_override, None
+
+    # Normal triage logic
+    try:
+        req = TriageReqModel(
+            symptoms=user_msg_text,
+            age=payload.get("age"),
+            known_conditions=payload.get("known_conditions") or []
+        )
+    except Exception as e:
+        logger.error(f"❌ Input validation failed: {e}")
+        return {
+            "response": "Unable to process symptoms. Please try again.",
+            "recommended_level": "Error",
+            "score": 0,
+            "reasons": ["Invalid input format"],
+            "suggested_action": "Ensure symptoms are text and age is a number.",
+            "hospital_recommendation": None,
+            "received_at": datetime.utcnow().isoformat(),
+            "meta": {"error": str(e)}
+        }, None
+    return None, req
+
+
+def _triage_fields(result: TriageResult, degraded: bool) -> dict:
+    return {
+        "recommended_level": result.recommended_level,
+        "score": result.score,
+        "reasons": result.reasons,
+        "suggested_action": result.suggested_action,
+        "meta": {**result.meta, "degraded": "rules_only"} if degraded else result.meta,
+    }
+
+
+async def _classify(payload: dict, user_msg_text: str) -> dict:
+    """Level, score, reasons and action (safety override -> NLP -> rules), or an error result."""
+    final, req = _triage_request(payload, user_msg_text)
+    if final:
+        return final
+    result, degraded = await _model_triage(req)
+    return _triage_fields(result, degraded)
+
+
+def _classify_rules(payload: dict, user_msg_text: str) -> dict:
+    """Like `_classify` without the NLP model (safety override -> rules)."""
+    final, req = _triage_request(payload, user_msg_text)
+    return final or _triage_fields(_triage_logic_fallback(req), False)
+
+
+def _greeting_result(reply: str) -> dict:
+    return {
+        "response": reply,
+        "recommended_level": "None",
+        "score": None,
+        "reasons": [],
+        "suggested_action": None,
+        "hospital_recommendation": None,
+        "received_at": datetime.utcnow().isoformat(),
+        "meta": {"type": "greeting"}
+    }
+
+
+async def _persist_audit(record: dict) -> Optional[str]:
+    """
+    Fsync the audit to the local WAL (drained into Postgres in the background),
+    or, if local disk fails, insert it directly — in a worker thread, bounded
+    by the Postgres timeout and breaker. Returns None once durable, else why not.
+    """
+    try:
+        await audit_spool.write(record)
+        return None
+    except OSError as e:
+        logger.error(f"❌ Audit WAL write failed ({e}); writing to the database directly")
+    try:
+        # Same idempotency key if the WAL copy survives after all
+        await degradation.call_in_thread(degradation.postgres, audit_spool.insert_direct, record)
+        return None
+    except degradation.DependencyUnavailable as e:
+        logger.error(f"❌ Audit {record['key']} not persisted: {e}")
+        return str(e)
+
+
+async def triage_events(payload: dict, db: Session) -> AsyncIterator[dict]:
+    """
+    The triage pipeline as a sequence of frames, each sent as soon as it is ready:
+
+      {"type": "triage", ...}     level / score / reasons / action (milliseconds after receipt)
+      {"type": "hospitals", ...}  ranked hospitals and the full humanized response
+      {"type": "ack", ...}        audit saved (audit_key, its idempotency key); "durable": false
+                                  with "audit_error" if neither the WAL nor Postgres took it
+
+    Greetings, empty input and validation errors produce a single "triage" frame
+    with `"final": true`.
+    """
     logger.info("=== Incoming Triage Payload ===")
     for key, value in payload.items():
         logger.info(f"{key}: {value}")
@@ -134,136 +311,100 @@ async def process_triage(payload: dict, db: Session):
 
     user_msg_text = payload.get("symptoms", "").strip()
     if not user_msg_text:
-        return {"response": "No symptoms provided"}
+        yield {"type": "triage", "final": True, "response": "No symptoms provided"}
+        return
 
     # Greeting
     greeting_reply = handle_greetings(user_msg_text)
     if greeting_reply:
-        return {
-            "response": greeting_reply,
-            "recommended_level": "None",
-            "score": None,
-            "reasons": [],
-            "suggested_action": None,
-            "hospital_recommendation": None,
-            "received_at": datetime.utcnow().isoformat(),
-            "meta": {"type": "greeting"}
-        }
-
-    # Initialize variables
-    recommended_level = None
-    score = 0
-    reasons = []
-    suggested_action = ""
-    meta = {}
-
-    # Clinical Safety Override
-    safety_override = _apply_clinical_safety_override(
-        user_msg_text,
-        payload.get("age"),
-        payload.get("known_conditions", []),
-    )
-    if safety_override:
-        recommended_level = safety_override["recommended_level"]
-        score = safety_override["score"]
-        reasons = safety_override["reasons"]
-        suggested_action = safety_override["suggested_action"]
-        meta = safety_override["meta"]
-    else:
-        # Normal triage logic
-        try:
-            req = TriageReqModel(
-                symptoms=user_msg_text,
-                age=payload.get("age"),
-                known_conditions=payload.get("known_conditions") or []
-            )
-        except Exception as e:
-            logger.error(f"❌ Input validation failed: {e}")
-            return {
-                "response": "Unable to process symptoms. Please try again.",
-                "recommended_level": "Error",
-                "score": 0,
-                "reasons": ["Invalid input format"],
-                "suggested_action": "Ensure symptoms are text and age is a number.",
-                "hospital_recommendation": None,
-                "received_at": datetime.utcnow().isoformat(),
-                "meta": {"error": str(e)}
-            }
-
-        result = triage_logic(req)
-        recommended_level = result.recommended_level
-        score = result.score
-        reasons = result.reasons
-        suggested_action = result.suggested_action
-        meta = result.meta
+        yield {"type": "triage", "final": True, **_greeting_result(greeting_reply)}
+        return
+
+    received_at = datetime.utcnow()
+    triage = await _classify(payload, user_msg_text)
+    if triage["recommended_level"] == "Error":
+        yield {"type": "triage", "final": True, **triage}
+        return
+    recommended_level = triage["recommended_level"]
+    yield {
+        "type": "triage",
+        "final": False,
+        "response": humanize_response(triage["suggested_action"], recommended_level),
+        **triage,
+        "received_at": received_at.isoformat(),
+    }
 
     # ✅ Unified hospital recommendation logic — works for safety override AND normal triage
-        # 🔍 DIAGNOSTIC LOGS — ADD THESE TWO LINES HERE
     logger.info(f"🔍 Getting hospitals for level: {recommended_level}")
     logger.info(f"📍 Patient coords: {payload.get('lat')}, {payload.get('lng')}")
-    hospital_reco = _get_hospital_recommendations(
-        recommended_level,
-        payload.get("lat"),
-        payload.get("lng")
-    )
+    # Bounded by the Redis timeout; the last-known-good snapshot stands in when Redis is down
+    hospital_reco, source = await _hospital_recommendations(recommended_level, payload.get("lat"), payload.get("lng"))
 
     # Humanize response
-    human_response = humanize_response(suggested_action, recommended_level, hospital_reco)
-
-    # Save audit & messages
-    audit = TriageAudit(
-        received_at=datetime.utcnow(),
-        symptoms=user_msg_text,
-        age=payload.get("age"),
-        known_conditions=payload.get("known_conditions", []),
-        recommended_level=recommended_level,
-        score=score,
-        reasons=reasons,
-        suggested_action=suggested_action,
-        hospital_recommendation=json.dumps(hospital_reco),
-        meta={"human_like": True, **meta},
-    )
-    db.add(audit)
-    db.commit()
-    db.refresh(audit)
-
-    db.add(TriageMessage(audit_id=audit.id, direction="user", text=user_msg_text))
-    db.commit()
-    db.add(TriageMessage(audit_id=audit.id, direction="bot", text=json.dumps({
-        "response": human_response,
-        "recommended_level": recommended_level,
-        "score": score,
-        "reasons": reasons,
-        "suggested_action": suggested_action,
-        "hospital_recommendation": hospital_reco,
-        "received_at": audit.received_at.isoformat(),
-        "meta": audit.meta,
-    })))
-    db.commit()
+    human_response = humanize_response(triage["suggested_action"], recommended_level, hospital_reco)
+    hospitals_frame = {"type": "hospitals", "hospital_recommendation": hospital_reco, "response": human_response}
+    if source != "live":
+        hospitals_frame["hospital_source"] = source
+    yield hospitals_frame
+
+    # Save audit & messages: local WAL first, loaded into Postgres by the drainer
+    record = audit_spool.record_for(payload, user_msg_text, received_at, triage, hospital_reco, human_response)
+    audit_error = await _persist_audit(record)
 
     logger.info("=== Triage Bot Response ===")
     logger.info(f"response: {human_response}")
     logger.info(f"recommended_level: {recommended_level}")
-    logger.info(f"score: {score}")
-    logger.info(f"reasons: {reasons}")
-    logger.info(f"suggested_action: {suggested_action}")
+    logger.info(f"score: {triage['score']}")
+    logger.info(f"reasons: {triage['reasons']}")
+    logger.info(f"suggested_action: {triage['suggested_action']}")
     logger.info(f"hospital_recommendation: {hospital_reco}")
     logger.info("===========================")
 
-    return {
-        "response": human_response,
-        "recommended_level": recommended_level,
-        "score": score,
-        "reasons": reasons,
-        "suggested_action": suggested_action,
-        "hospital_recommendation": hospital_reco,
-        "received_at": audit.received_at.isoformat(),
-        "meta": audit.meta,
-    }
-
+    ack = {"type": "ack", "audit_key": record["key"], "durable": audit_error is None,
+           "received_at": record["received_at"], "meta": record["meta"]}
+    if audit_error:
+        ack["audit_error"] = audit_error
+    yield ack
 
 
+async def process_triage(payload: dict, db: Session):
+    """Whole pipeline, one combined result (POST /triage and non-streaming socket clients)."""
+    result = {}
+    async for frame in triage_events(payload, db):
+        frame = dict(frame)
+        frame.pop("type")
+        frame.pop("final", None)
+        frame.pop("audit_key", None)
+        frame.pop("durable", None)
+        frame.pop("audit_error", None)
+        result.update(frame)
+    return result
+
+
+def degraded_triage(payload: dict, reason: str) -> dict:
+    """
+    Rules-only answer: no NLP model, no hospital lookup, no DB write.
+
+    Served when the full pipeline can't take the request (load shedding); the
+    safety override still applies, so critical symptoms get the same advice.
+    """
+    user_msg_text = (payload.get("symptoms") or "").strip()
+    if not user_msg_text:
+        return {"response": "No symptoms provided"}
+    greeting_reply = handle_greetings(user_msg_text)
+    if greeting_reply:
+        return _greeting_result(greeting_reply)
 
+    triage = _classify_rules(payload, user_msg_text)
+    if triage["recommended_level"] == "Error":
+        return triage
+    return {
+        "response": humanize_response(triage["suggested_action"], triage["recommended_level"]),
+        **triage,
+        "hospital_recommendation": [],
+        "received_at": datetime.utcnow().isoformat(),
+        "meta": {**triage["meta"], "degraded": reason},
+    }
 
 
 # import os
@@ -1,73 +1,44 @@
 # app/services/update_hospital_data.py
 import os
 import json
-import time
+import asyncio
+import hashlib
 import logging
-import requests
-import redis
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+import redis.asyncio as aioredis
+
+from app.database import SessionLocal
+from app.services import facility_registry
+from app.services.http_client import get_http_client
+from app.services.wait_history import record_samples
+from app.services.hospital_service import (
+    HOSPITALS_CURRENT_KEY,
+    HOSPITALS_UPDATES_CHANNEL,
+    hospitals_version_key,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
-redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
-
-# Full hospital coordinates (keep your existing 29 entries)
-HOSPITAL_COORDS = {
-    "Alberta Children's Hospital": {"lat": 51.0706, "lng": -114.1593},
-    "Foothills Medical Centre": {"lat": 51.0651, "lng": -114.1302},
-    "Peter Lougheed Centre": {"lat": 51.0736, "lng": -113.9574},
-    "Rockyview General Hospital": {"lat": 50.9839, "lng": -114.0975},
-    "South Health Campus": {"lat": 50.8849, "lng": -113.9581},
-    "Airdrie Community Health Centre": {"lat": 51.2917, "lng": -114.0144},
-    "Cochrane Community Health Centre": {"lat": 51.1894, "lng": -114.4677},
-    "Okotoks Health and Wellness Centre": {"lat": 50.7256, "lng": -113.9749},
-    "Sheldon M. Chumir Centre": {"lat": 51.0425, "lng": -114.0647},
-    "South Calgary Health Centre": {"lat": 50.9306, "lng": -114.0427},
-    "Devon General Hospital": {"lat": 53.3652, "lng": -113.7353},
-    "Fort Sask Community Hospital": {"lat": 53.7180, "lng": -113.2094},
-    "Grey Nuns Community Hospital": {"lat": 53.4840, "lng": -113.4439},
-    "Leduc Community Hospital": {"lat": 53.2590, "lng": -113.5448},
-    "Misericordia Community Hospital": {"lat": 53.5265, "lng": -113.5561},
-    "Northeast Community Health Centre": {"lat": 53.6020, "lng": -113.4411},
-    "Royal Alexandra Hospital": {"lat": 53.5491, "lng": -113.4965},
-    "Stollery Children's Hospital": {"lat": 53.5215, "lng": -113.5266},
-    "Strathcona Community Hospital": {"lat": 53.6071, "lng": -113.3046},
-    "Sturgeon Community Hospital": {"lat": 53.6731, "lng": -113.6229},
-    "University of Alberta Hospital": {"lat": 53.5225, "lng": -113.5301},
-    "WestView Health Centre": {"lat": 53.5283, "lng": -114.0089},
-    "Red Deer Regional Hospital": {"lat": 52.2690, "lng": -113.8112},
-    "Innisfail Health Centre": {"lat": 52.0336, "lng": -113.9589},
-    "Lacombe Hospital and Care Centre": {"lat": 52.4673, "lng": -113.7366},
-    "Chinook Regional Hospital": {"lat": 49.6935, "lng": -112.8418},
-    "Medicine Hat Regional Hospital": {"lat": 50.0290, "lng": -110.7034},
-    "Grande Prairie Regional Hospital": {"lat": 55.1700, "lng": -118.7947},
-    "Northern Lights Regional Health Centre": {"lat": 56.7266, "lng": -111.3810},
-}
-
-def fetch_wait_times():
-    url = "https://www.albertahealthservices.ca/WebApps/WaitTimes/api/WaitTimes"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (HealthFlow AI; +https://github.com/yourname/healthflow)"
-    }
+REDIS_URL = os.getenv("REDIS_URL", f"redis://{os.getenv('REDIS_HOST', 'redis')}:6379/0")
+redis_client = aioredis.Redis.from_url(REDIS_URL, decode_responses=True)
+
+AHS_API_URL = "https://www.albertahealthservices.ca/WebApps/WaitTimes/api/WaitTimes"
+UPDATE_INTERVAL = int(os.getenv("HOSPITAL_UPDATE_INTERVAL", "300"))
+# Old versions stay readable briefly so in-flight readers never hit a missing hash
+OLD_VERSION_TTL = int(os.getenv("HOSPITAL_OLD_VERSION_TTL", "120"))
+
+async def fetch_wait_times() -> Optional[Dict]:
     try:
         logger.info("📡 Fetching AHS wait times...")
-        r = requests.get(url, headers=headers, timeout=10)
-        logger.info(f"✅ HTTP {r.status_code}, Content-Type: {r.headers.get('content-type', 'N/A')}")
-        
-        if r.status_code == 200:
-            # Try to parse JSON
-            data = r.json()
-            logger.info(f"✅ Parsed {sum(len(hospitals) for cats in data.values() for hospitals in cats.values())} hospitals")
-            return data
-        else:
-            logger.error(f"❌ HTTP error: {r.status_code} - {r.text[:200]}")
-            return None
+        data = await get_http_client().get_json(AHS_API_URL, timeout=10)
+        logger.info(f"✅ Parsed {sum(len(hospitals) for cats in data.values() for hospitals in cats.values())} hospitals")
+        return data
     except Exception as e:
         logger.exception(f"❌ Failed to fetch or parse AHS data: {e}")
-        return None 
-      
+        return None
+
 def flatten_hospitals(raw_data: Dict) -> List[Dict]:
     hospitals = []
     for region_name, categories in raw_data.items():
@@ -95,28 +66,94 @@ def flatten_hospitals(raw_data: Dict) -> List[Dict]:
                 })
     return hospitals
 
-def update_redis(hospitals):
-    for idx, hosp in enumerate(hospitals, start=1):
-        coord = HOSPITAL_COORDS.get(hosp["name"], {"lat": None, "lng": None})
-        hosp["lat"] = coord["lat"]
-        hosp["lng"] = coord["lng"]
-        redis_client.set(f"hospital:{idx}", json.dumps(hosp, ensure_ascii=False))
-    redis_client.set("hospital:count", len(hospitals))
-    logger.info(f"✅ Updated {len(hospitals)} hospitals in Redis")
+def attach_coordinates(hospitals: List[Dict]) -> List[Dict]:
+    """Join each row to its registry facility (new names are resolved and persisted once)."""
+    ids = facility_registry.resolve_names(
+        [h["name"] for h in hospitals], regions={h["name"]: h.get("region") for h in hospitals}
+    )
+    for hosp in hospitals:
+        facility = facility_registry.get(ids.get(hosp["name"]))
+        hosp["facility_id"] = facility["id"] if facility else None
+        hosp["lat"] = facility["lat"] if facility else None
+        hosp["lng"] = facility["lng"] if facility else None
+    return hospitals
 
-if __name__ == "__main__":
-    logger.info("🏥 Starting hospital data updater (every 5 minutes)")
+def snapshot_version(encoded: Dict[str, str]) -> str:
+    digest = hashlib.sha1()
+    for field in sorted(encoded):
+        digest.update(field.encode("utf-8"))
+        digest.update(encoded[field].encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+async def update_redis(hospitals: List[Dict], client=None) -> Optional[str]:
+    """
+    Write the whole snapshot as one versioned hash and swap the current pointer,
+    all inside a single MULTI/EXEC. Readers see either the old or the new set,
+    and facilities missing from the new snapshot disappear with the old version.
+    """
+    client = client or redis_client
+    encoded = {
+        f"{idx:04d}": json.dumps(hosp, ensure_ascii=False)
+        for idx, hosp in enumerate(hospitals, start=1)
+    }
+    version = snapshot_version(encoded)
+    previous = await client.get(HOSPITALS_CURRENT_KEY)
+    if previous == version:
+        logger.info(f"📌 Hospital snapshot {version} unchanged — skipping write")
+        return None
+
+    async with client.pipeline(transaction=True) as pipe:
+        pipe.delete(hospitals_version_key(version))
+        if encoded:
+            pipe.hset(hospitals_version_key(version), mapping=encoded)
+        pipe.set(HOSPITALS_CURRENT_KEY, version)
+        if previous:
+            pipe.expire(hospitals_version_key(previous), OLD_VERSION_TTL)
+        pipe.publish(HOSPITALS_UPDATES_CHANNEL, json.dumps({"version": version, "count": len(hospitals)}))
+        await pipe.execute()
+
+    logger.info(f"✅ Published {len(hospitals)} hospitals as snapshot {version}")
+    return version
+
+async def remove_legacy_keys(client=None):
+    """Drop the pre-versioning hospital:{idx} keys left by the old updater."""
+    client = client or redis_client
+    keys = [key async for key in client.scan_iter(match="hospital:*", count=500)]
+    if keys:
+        await client.delete(*keys)
+        logger.info(f"🧹 Removed {len(keys)} legacy hospital:* keys")
+
+def store_history(hospitals: List[Dict]):
+    """Append this cycle to the wait-time time series (runs in a worker thread)."""
+    db = SessionLocal()
+    try:
+        record_samples(db, hospitals)
+    finally:
+        db.close()
+
+async def run_updater():
+    logger.info(f"🏥 Starting hospital data updater (every {UPDATE_INTERVAL // 60} minutes)")
+    await remove_legacy_keys()
     while True:
-        raw = fetch_wait_times()
+        raw = await fetch_wait_times()
         if raw:
             try:
-                flattened = flatten_hospitals(raw)
-                update_redis(flattened)
+                hospitals = await asyncio.to_thread(attach_coordinates, flatten_hospitals(raw))
+                await update_redis(hospitals)
             except Exception as e:
                 logger.exception(f"❌ Error processing data: {e}")
+            else:
+                try:
+                    await asyncio.to_thread(store_history, hospitals)
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not record wait-time history: {e}")
         else:
             logger.warning("⚠️ No data — skipping Redis update")
-        time.sleep(300)
+        await asyncio.sleep(UPDATE_INTERVAL)
+
+if __name__ == "__main__":
+    asyncio.run(run_updater())
+
 
 
 # # app/services/update_hospital_data.py
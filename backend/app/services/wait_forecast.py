@@ -0,0 +1,270 @@
+# app/services/wait_forecast.py
+"""
+Wait-time forecasting from the wait_time_samples history.
+
+Model per hospital:
+  * a seasonal baseline — mean wait for each of the 168 hours of the week
+    (Alberta local time), falling back to the hospital's overall mean;
+  * a global AR(1) term on the de-seasonalised residual, so a hospital that is
+    running hot right now stays hot for the next few hours and then decays
+    back to its baseline.
+
+Forecasts are precomputed on a schedule (one worker at a time, via a Redis
+lease) and cached per hospital, so request paths do an O(1) dict lookup.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from redis.exceptions import RedisError
+from sqlalchemy import select
+
+from app.database import SessionLocal
+from app.models.wait_time import WaitTimeSample
+from app.services.redis_client import async_r
+from app.utils.wait_time import parse_wait_time
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Config
+# ---------------------------
+LOCAL_TZ = ZoneInfo("America/Edmonton")
+TRAINING_WINDOW_DAYS = int(os.getenv("FORECAST_TRAINING_DAYS", "56"))
+REFRESH_INTERVAL = int(os.getenv("FORECAST_REFRESH_INTERVAL", "900"))  # seconds
+FORECAST_HORIZONS_H = (0, 1, 2, 4)  # hours ahead that are precomputed
+FORECAST_KEY = "forecast:waits"
+FORECAST_LOCK_KEY = "forecast:refresh_lock"
+
+Sample = Tuple[str, int, int]  # (hospital, epoch seconds, wait minutes)
+
+
+def hour_of_week(ts: float) -> int:
+    local = datetime.fromtimestamp(ts, tz=LOCAL_TZ)
+    return local.weekday() * 24 + local.hour
+
+
+class WaitForecastModel:
+    """Seasonal (hour-of-week) baseline + AR(1) residual persistence."""
+
+    def __init__(self, baselines: Dict[str, List[Optional[float]]], means: Dict[str, float], phi: float):
+        self.baselines = baselines
+        self.means = means
+        self.phi = phi
+
+    @classmethod
+    def fit(cls, samples: Iterable[Sample]) -> "WaitForecastModel":
+        sums: Dict[str, np.ndarray] = defaultdict(lambda: np.zeros(168))
+        counts: Dict[str, np.ndarray] = defaultdict(lambda: np.zeros(168))
+        series: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for hospital, ts, minutes in samples:
+            how = hour_of_week(ts)
+            sums[hospital][how] += minutes
+            counts[hospital][how] += 1
+            series[hospital].append((ts, minutes))
+
+        baselines, means = {}, {}
+        for hospital in sums:
+            total = counts[hospital].sum()
+            means[hospital] = float(sums[hospital].sum() / total) if total else 0.0
+            with np.errstate(invalid="ignore", divide="ignore"):
+                slots = sums[hospital] / counts[hospital]
+            baselines[hospital] = [None if np.isnan(v) else float(v) for v in slots]
+
+        model = cls(baselines, means, phi=0.0)
+        model.phi = model._fit_phi(series)
+        return model
+
+    def baseline(self, hospital: str, ts: float) -> Optional[float]:
+        slots = self.baselines.get(hospital)
+        if slots is None:
+            return None
+        value = slots[hour_of_week(ts)]
+        return value if value is not None else self.means[hospital]
+
+    def _fit_phi(self, series: Dict[str, List[Tuple[int, int]]]) -> float:
+        """Least-squares lag-1h coefficient of residuals, pooled over hospitals."""
+        num = den = 0.0
+        for hospital, points in series.items():
+            points.sort()
+            by_hour = {}
+            for ts, minutes in points:
+                by_hour[ts // 3600] = minutes - self.baseline(hospital, ts)
+            for hour, resid in by_hour.items():
+                nxt = by_hour.get(hour + 1)
+                if nxt is not None:
+                    num += resid * nxt
+                    den += resid * resid
+        return float(np.clip(num / den, 0.0, 0.99)) if den else 0.0
+
+    def predict(self, hospital: str, target_ts: float,
+                last_minutes: Optional[float] = None, last_ts: Optional[float] = None) -> Optional[float]:
+        base = self.baseline(hospital, target_ts)
+        if base is None:
+            return None
+        if last_minutes is None or last_ts is None:
+            return max(0.0, base)
+        lag_hours = max(0.0, (target_ts - last_ts) / 3600)
+        resid = last_minutes - self.baseline(hospital, last_ts)
+        return max(0.0, base + resid * self.phi ** lag_hours)
+
+
+# ---------------------------
+# Offline backtest
+# ---------------------------
+def backtest(samples: List[Sample], horizon_sec: int = 3600, folds: int = 4, fold_days: int = 7) -> Dict:
+    """
+    Rolling-origin evaluation: for each fold, train on everything before the
+    fold and forecast every sample in it from the observation `horizon_sec`
+    earlier. Reports MAE for the model, a naive last-value forecast and the
+    seasonal baseline alone.
+    """
+    samples = sorted(samples, key=lambda s: s[1])
+    if not samples:
+        return {"folds": []}
+    end = samples[-1][1] + 1
+    lookup = {(h, ts): m for h, ts, m in samples}
+    results = []
+    for k in range(folds, 0, -1):
+        fold_start = end - k * fold_days * 86400
+        fold_end = fold_start + fold_days * 86400
+        train = [s for s in samples if s[1] < fold_start]
+        test = [s for s in samples if fold_start <= s[1] < fold_end]
+        if not train or not test:
+            continue
+        model = WaitForecastModel.fit(train)
+        errors = {"model": [], "naive": [], "seasonal": []}
+        for hospital, ts, actual in test:
+            prev = lookup.get((hospital, ts - horizon_sec))
+            pred = model.predict(hospital, ts, prev, ts - horizon_sec if prev is not None else None)
+            seasonal = model.predict(hospital, ts)
+            if pred is None or prev is None:
+                continue
+            errors["model"].append(abs(pred - actual))
+            errors["naive"].append(abs(prev - actual))
+            errors["seasonal"].append(abs(seasonal - actual))
+        if errors["model"]:
+            results.append({
+                "fold_start": fold_start,
+                "n": len(errors["model"]),
+                **{f"mae_{name}": round(float(np.mean(v)), 2) for name, v in errors.items()},
+            })
+    return {"horizon_sec": horizon_sec, "phi": model.phi if results else None, "folds": results}
+
+
+# ---------------------------
+# Training + precomputed cache
+# ---------------------------
+_forecasts: Dict[str, dict] = {}
+
+
+def load_samples(db, since_ts: int) -> List[Sample]:
+    stmt = select(WaitTimeSample.hospital, WaitTimeSample.observed_ts, WaitTimeSample.wait_minutes).where(
+        WaitTimeSample.observed_ts >= since_ts
+    )
+    return [(h, int(ts), int(m)) for h, ts, m in db.execute(stmt)]
+
+
+def compute_forecasts(samples: List[Sample], now: Optional[float] = None,
+                      hospital_info: Optional[Dict[str, dict]] = None) -> Dict[str, dict]:
+    """Train on `samples` and forecast each hospital from its latest observation."""
+    now = now or time.time()
+    hospital_info = hospital_info or {}
+    model = WaitForecastModel.fit(samples)
+    latest: Dict[str, Tuple[int, int]] = {}
+    for hospital, ts, minutes in samples:
+        if hospital not in latest or ts > latest[hospital][0]:
+            latest[hospital] = (ts, minutes)
+
+    forecasts = {}
+    for hospital, (last_ts, last_minutes) in latest.items():
+        horizons = {
+            f"{h}h": round(model.predict(hospital, now + h * 3600, last_minutes, last_ts))
+            for h in FORECAST_HORIZONS_H
+        }
+        forecasts[hospital] = {
+            "hospital": hospital,
+            "predicted_wait_minutes": horizons["0h"],
+            "horizons": horizons,
+            "last_observed_minutes": last_minutes,
+            "last_observed_ts": last_ts,
+            "generated_at": int(now),
+            **{k: v for k, v in hospital_info.get(hospital, {}).items() if k in ("region", "category", "lat", "lng")},
+        }
+    return forecasts
+
+
+def _train_from_db() -> Dict[str, dict]:
+    from app.services.hospital_service import get_all_hospitals_from_redis
+
+    db = SessionLocal()
+    try:
+        samples = load_samples(db, int(time.time()) - TRAINING_WINDOW_DAYS * 86400)
+    finally:
+        db.close()
+    try:
+        info = {h["name"]: h for h in get_all_hospitals_from_redis()}
+    except Exception:
+        info = {}
+    return compute_forecasts(samples, hospital_info=info)
+
+
+async def refresh_forecasts():
+    """Recompute forecasts if this worker wins the lease, then load the shared copy."""
+    global _forecasts
+    try:
+        if await async_r.set(FORECAST_LOCK_KEY, "1", nx=True, ex=max(60, REFRESH_INTERVAL - 30)):
+            forecasts = await asyncio.to_thread(_train_from_db)
+            if forecasts:
+                await async_r.set(FORECAST_KEY, json.dumps(forecasts))
+                logger.info(f"🔮 Precomputed wait forecasts for {len(forecasts)} hospitals")
+        raw = await async_r.get(FORECAST_KEY)
+        if raw:
+            _forecasts = json.loads(raw)
+    except RedisError as e:
+        logger.warning(f"⚠️ Redis unavailable for forecasts ({e}); training locally")
+        _forecasts = await asyncio.to_thread(_train_from_db) or _forecasts
+
+
+async def run_forecast_scheduler():
+    while True:
+        try:
+            await refresh_forecasts()
+        except Exception as e:
+            logger.warning(f"⚠️ Forecast refresh failed: {e}")
+        await asyncio.sleep(REFRESH_INTERVAL)
+
+
+def get_forecast(hospital: str) -> Optional[dict]:
+    """O(1) lookup of the precomputed forecast for one hospital."""
+    return _forecasts.get(hospital)
+
+
+def all_forecasts() -> List[dict]:
+    return list(_forecasts.values())
+
+
+def has_live_wait(wait_str) -> bool:
+    """Whether an AHS wait string holds a number ("Not available" is not a zero-minute wait)."""
+    return bool(wait_str) and any(ch.isdigit() for ch in str(wait_str))
+
+
+def effective_wait_minutes(hospital_name: str, wait_str, stale: bool) -> Tuple[Optional[int], str]:
+    """
+    (minutes, source): the live wait, or the precomputed forecast when live data
+    is stale or has no number in it; (None, "unknown") when neither is known.
+    """
+    forecast = get_forecast(hospital_name) if hospital_name else None
+    live = has_live_wait(wait_str)
+    if (stale or not live) and forecast:
+        return forecast["predicted_wait_minutes"], "forecast"
+    if not live:
+        return None, "unknown"
+    return parse_wait_time(str(wait_str)), "live"
@@ -0,0 +1,77 @@
+# app/services/wait_history.py
+import logging
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.wait_time import WaitTimeSample
+from app.utils.wait_time import parse_wait_time
+
+logger = logging.getLogger(__name__)
+
+# Allowed downsampling buckets (label -> seconds)
+BUCKETS = {"5m": 300, "15m": 900, "1h": 3600, "6h": 21600, "1d": 86400}
+
+
+def _minutes(wait_str) -> Optional[int]:
+    if not wait_str or not any(ch.isdigit() for ch in str(wait_str)):
+        return None  # "Not available" etc. — don't record a fake zero
+    return parse_wait_time(str(wait_str))
+
+
+def build_samples(hospitals: List[Dict], observed_ts: Optional[int] = None) -> List[Dict]:
+    observed_ts = int(observed_ts or time.time())
+    rows = []
+    for h in hospitals:
+        minutes = _minutes(h.get("wait_time"))
+        if h.get("name") and minutes is not None:
+            rows.append({
+                "hospital": h["name"],
+                "category": h.get("category"),
+                "observed_ts": observed_ts,
+                "wait_minutes": minutes,
+            })
+    return rows
+
+
+def record_samples(db: Session, hospitals: List[Dict], observed_ts: Optional[int] = None) -> int:
+    """Append one snapshot to the time series in a single bulk INSERT."""
+    rows = build_samples(hospitals, observed_ts)
+    if rows:
+        db.execute(insert(WaitTimeSample), rows)
+        db.commit()
+    logger.info(f"🗃️ Recorded {len(rows)} wait-time samples")
+    return len(rows)
+
+
+def get_wait_history(db: Session, hospital: str, start_ts: int, end_ts: int, bucket_seconds: int) -> List[Dict]:
+    """Downsample a hospital's history into fixed buckets, aggregated in the database."""
+    bucket = ((WaitTimeSample.observed_ts // bucket_seconds) * bucket_seconds).label("bucket")
+    stmt = (
+        select(
+            bucket,
+            func.avg(WaitTimeSample.wait_minutes),
+            func.min(WaitTimeSample.wait_minutes),
+            func.max(WaitTimeSample.wait_minutes),
+            func.count(),
+        )
+        .where(
+            WaitTimeSample.hospital == hospital,
+            WaitTimeSample.observed_ts >= start_ts,
+            WaitTimeSample.observed_ts < end_ts,
+        )
+        .group_by(bucket)
+        .order_by(bucket)
+    )
+    return [
+        {
+            "ts": int(ts),
+            "avg_minutes": round(float(avg), 1),
+            "min_minutes": int(lo),
+            "max_minutes": int(hi),
+            "samples": int(n),
+        }
+        for ts, avg, lo, hi, n in db.execute(stmt)
+    ]
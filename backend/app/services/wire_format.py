@@ -0,0 +1,215 @@
+# app/services/wire_format.py
+"""
+Payload encodings for the wait-time and recommendation endpoints.
+
+JSON stays the default, serialized with orjson when it is installed (several
+times faster than `json.dumps` on lists of small dicts) and the stdlib
+otherwise. Clients that can decode MessagePack can ask for it instead:
+
+  * REST: `Accept: application/msgpack` (or `?format=msgpack`);
+  * WebSockets: `?encoding=msgpack` or the `msgpack` subprotocol — snapshots
+    then arrive as binary frames, while control frames (ping/pong,
+    `subscribed`, errors) stay JSON text.
+
+`SnapshotBodies` keeps encoded bodies per snapshot version — and their gzip /
+brotli variants, compressed once at a high level — so every client polling
+the same data gets the same bytes without re-encoding or re-compressing.
+"""
+import gzip
+import json
+import os
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, WebSocket
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the stdlib encoder is the fallback
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # without msgpack every client gets JSON
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip covers every client that compresses
+    brotli = None
+
+# ---------------------------
+# Config
+# ---------------------------
+GZIP_LEVEL = int(os.getenv("SNAPSHOT_GZIP_LEVEL", "9"))          # paid once per snapshot version
+BROTLI_QUALITY = int(os.getenv("SNAPSHOT_BROTLI_QUALITY", "9"))
+COMPRESS_MIN_BYTES = int(os.getenv("SNAPSHOT_COMPRESS_MIN_BYTES", "512"))  # smaller bodies go out as-is
+
+JSON = "json"
+MSGPACK = "msgpack"
+
+IDENTITY = "identity"
+GZIP = "gzip"
+BROTLI = "br"
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_ACCEPT = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY if orjson else 0
+
+
+# ---------------------------
+# Encoders
+# ---------------------------
+def dumps_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_msgpack(content: Any) -> bytes:
+    return msgpack.packb(content, use_bin_type=True)
+
+
+def encode(content: Any, fmt: str = JSON) -> bytes:
+    return dumps_msgpack(content) if fmt == MSGPACK else dumps_json(content)
+
+
+def media_type(fmt: str) -> str:
+    return MSGPACK_MEDIA_TYPE if fmt == MSGPACK else "application/json"
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == GZIP:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)  # mtime=0: same bytes every time
+    if coding == BROTLI:
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return body
+
+
+# ---------------------------
+# Negotiation
+# ---------------------------
+def negotiate(accept: Optional[str], requested: Optional[str] = None) -> str:
+    """MSGPACK if the client asked for it (and we can produce it), else JSON."""
+    if msgpack is None:
+        return JSON
+    if requested:
+        return MSGPACK if requested.lower() == MSGPACK else JSON
+    accept = (accept or "").lower()
+    return MSGPACK if any(media in accept for media in _MSGPACK_ACCEPT) else JSON
+
+
+def request_format(request: Request) -> str:
+    return negotiate(request.headers.get("accept"), request.query_params.get("format"))
+
+
+def negotiate_coding(accept_encoding: Optional[str]) -> str:
+    """Best content coding the client accepts: br, then gzip, then identity."""
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding] = q
+    wildcard = accepted.get("*", 0.0)
+    for coding in ((BROTLI, GZIP) if brotli is not None else (GZIP,)):
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return IDENTITY
+
+
+def websocket_format(websocket: WebSocket) -> Tuple[str, Optional[str]]:
+    """(encoding, subprotocol to accept) for a WebSocket handshake."""
+    if msgpack is None:
+        return JSON, None
+    if MSGPACK in websocket.scope.get("subprotocols", []):
+        return MSGPACK, MSGPACK
+    return negotiate(None, websocket.query_params.get("encoding")), None
+
+
+async def send_body(websocket: WebSocket, body: bytes, fmt: str = JSON):
+    """One already-encoded data frame: binary MessagePack or JSON text."""
+    if fmt == MSGPACK:
+        await websocket.send_bytes(body)
+    else:
+        await websocket.send_text(body.decode("utf-8"))
+
+
+async def send(websocket: WebSocket, content: Any, fmt: str = JSON):
+    await send_body(websocket, encode(content, fmt), fmt)
+
+
+# ---------------------------
+# Responses
+# ---------------------------
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (same output shape, compact separators)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return dumps_msgpack(content)
+
+
+def respond(request: Request, content: Any, status_code: int = 200) -> Response:
+    """`content` in the encoding the client negotiated."""
+    if request_format(request) == MSGPACK:
+        return MsgPackResponse(content, status_code=status_code, headers={"Vary": "Accept"})
+    return FastJSONResponse(content, status_code=status_code, headers={"Vary": "Accept"})
+
+
+def encoded_response(body: bytes, fmt: str, status_code: int = 200) -> Response:
+    """A response around already-encoded bytes (see SnapshotBodies)."""
+    return Response(body, status_code=status_code, media_type=media_type(fmt), headers={"Vary": "Accept"})
+
+
+# ---------------------------
+# Per-version body cache
+# ---------------------------
+class SnapshotBodies:
+    """
+    Encoded response bodies for the current snapshot version.
+
+    Keyed by (variant, format, coding) — e.g. a region filter, json/msgpack
+    and gzip — and dropped wholesale when the version changes, so memory stays
+    bounded to one snapshot's worth of views.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.version: Optional[str] = None
+        self.max_entries = max_entries
+        self._bodies: Dict[Tuple[str, str, str], bytes] = {}
+        self.stats = {"hits": 0, "encoded": 0, "compressed": 0}
+
+    def get(self, version: Optional[str], variant: str, fmt: str, build: Callable[[], Any],
+            coding: str = IDENTITY) -> bytes:
+        if version is None:  # unversioned data (fallbacks) is never cached
+            return compress(encode(build(), fmt), coding)
+        if version != self.version:
+            self.version, self._bodies = version, {}
+        key = (variant, fmt, coding)
+        body = self._bodies.get(key)
+        if body is not None:
+            self.stats["hits"] += 1
+            return body
+        if coding == IDENTITY:
+            body = encode(build(), fmt)
+            self.stats["encoded"] += 1
+        else:
+            body = compress(self.get(version, variant, fmt, build), coding)
+            self.stats["compressed"] += 1
+        if len(self._bodies) >= self.max_entries:
+            self._bodies.pop(next(iter(self._bodies)))
+        self._bodies[key] = body
+        return body
@@ -0,0 +1,296 @@
+# app/services/ws_fanout.py
+"""
+Cross-worker fan-out for the ED wait-time WebSockets.
+
+Before, every worker ran its own fetch-and-broadcast loop over its own client
+set: N workers meant N upstream fetches per interval, and clients on
+different workers could see different data. Now:
+
+* one publisher (whichever worker holds a Redis lease) builds the frame for
+  each new snapshot version — serialized once — stores it as the latest frame
+  and PUBLISHes it;
+* every worker runs a relay subscribed to the channel that forwards the
+  already-encoded frame to its local sockets (no per-worker or per-client
+  re-encoding);
+* new connections get the latest frame from memory or Redis;
+* clients may subscribe to a region / category / area (see ws_filters) and
+  ask for MessagePack (see wire_format); each distinct filter and encoding is
+  encoded once per update and shared by its clients.
+
+If Redis is unreachable each worker falls back to fetching and broadcasting
+locally, like before.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple, Union
+
+from fastapi import WebSocket
+from redis.exceptions import RedisError, WatchError
+
+from app.services import wire_format
+from app.services.redis_client import async_r
+from app.services.ws_filters import SubscriptionFilter, describe, matches, parse_filter
+
+logger = logging.getLogger("ws_fanout")
+
+# ---------------------------
+# Config
+# ---------------------------
+PUBLISH_INTERVAL = float(os.getenv("WS_PUBLISH_INTERVAL", "30"))
+PUBLISHER_LEASE_MS = int(os.getenv("WS_PUBLISHER_LEASE_MS", str(int(PUBLISH_INTERVAL * 3000))))
+SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5"))  # drop clients that can't keep up
+
+CHANNEL = "ws:ed_waits"
+LAST_FRAME_KEY = "ws:ed_waits:last"
+PUBLISHER_KEY = "ws:ed_waits:publisher"
+
+_redis = async_r
+_token = uuid.uuid4().hex  # this worker's publisher identity
+
+# (version, records) — records is the list sent to clients
+SnapshotFetcher = Callable[[], Awaitable[Optional[Tuple[str, list]]]]
+HubKey = Tuple[Optional[SubscriptionFilter], str]  # (filter, encoding)
+Frame = Union[str, bytes]                           # JSON text or MessagePack binary
+
+
+def encode_message(version: str, frame: str) -> bytes:
+    return version.encode("ascii") + b"\n" + frame.encode("utf-8")
+
+
+def decode_message(raw: bytes) -> Tuple[str, str]:
+    version, _, frame = raw.partition(b"\n")
+    return version.decode("ascii"), frame.decode("utf-8")
+
+
+# ---------------------------
+# Local sockets
+# ---------------------------
+class LocalHub:
+    """
+    The sockets connected to this worker, indexed by subscription filter and
+    encoding.
+
+    JSON clients without a filter get the published frame as-is; for every
+    other distinct (filter, encoding) the snapshot is decoded once and the
+    filtered list is encoded once, however many clients share it.
+    """
+
+    def __init__(self):
+        self.clients: Set[WebSocket] = set()
+        self.filters: Dict[WebSocket, HubKey] = {}
+        self.index: Dict[HubKey, Set[WebSocket]] = {}
+        self.version: Optional[str] = None
+        self.frame: Optional[str] = None
+        self._records: Optional[list] = None     # decoded self.frame, on demand
+        self._frames: Dict[HubKey, Frame] = {}   # filtered / re-encoded frames for self.version
+        self.stats = {"frames_encoded": 0, "bytes_sent": 0}
+
+    def add(self, websocket: WebSocket, flt: Optional[SubscriptionFilter] = None, fmt: str = wire_format.JSON):
+        key = (flt, fmt)
+        self.clients.add(websocket)
+        self.filters[websocket] = key
+        self.index.setdefault(key, set()).add(websocket)
+
+    def discard(self, websocket: WebSocket):
+        self.clients.discard(websocket)
+        key = self.filters.pop(websocket, None)
+        members = self.index.get(key)
+        if members is not None:
+            members.discard(websocket)
+            if not members:
+                del self.index[key]
+
+    def encoding_of(self, websocket: WebSocket) -> str:
+        return self.filters.get(websocket, (None, wire_format.JSON))[1]
+
+    def subscribe(self, websocket: WebSocket, flt: Optional[SubscriptionFilter]):
+        fmt = self.encoding_of(websocket)
+        self.discard(websocket)
+        self.add(websocket, flt, fmt)
+
+    def frame_for(self, flt: Optional[SubscriptionFilter], fmt: str = wire_format.JSON) -> Optional[Frame]:
+        """Encoded frame for a filter and encoding at the current version (cached until the next one)."""
+        if self.frame is None or (flt is None and fmt == wire_format.JSON):
+            return self.frame
+        key = (flt, fmt)
+        if key not in self._frames:
+            if self._records is None:
+                self._records = json.loads(self.frame)
+            records = self._records if flt is None else [r for r in self._records if matches(r, flt)]
+            if fmt == wire_format.MSGPACK:
+                self._frames[key] = wire_format.dumps_msgpack(records)
+            else:
+                self._frames[key] = wire_format.dumps_json(records).decode("utf-8")
+            self.stats["frames_encoded"] += 1
+        return self._frames[key]
+
+    async def _send(self, websocket: WebSocket, frame: Frame) -> bool:
+        try:
+            if isinstance(frame, bytes):
+                await asyncio.wait_for(websocket.send_bytes(frame), timeout=SEND_TIMEOUT)
+            else:
+                await asyncio.wait_for(websocket.send_text(frame), timeout=SEND_TIMEOUT)
+            self.stats["bytes_sent"] += len(frame)
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Removed client {id(websocket)} due to error: {e!r}")
+            return False
+
+    def _set_frame(self, version: str, frame: str):
+        self.version, self.frame = version, frame
+        self._records, self._frames = None, {}
+
+    async def broadcast(self, version: str, frame: str) -> int:
+        """Send an already-encoded frame (filtered / re-encoded per subscription) to every local client, once per version."""
+        if version == self.version:
+            return 0
+        self._set_frame(version, frame)
+        targets = [(ws, self.frame_for(*key)) for key, members in list(self.index.items()) for ws in list(members)]
+        sent = await asyncio.gather(*(self._send(ws, f) for ws, f in targets))
+        for (ws, _), ok in zip(targets, sent):
+            if not ok:
+                self.discard(ws)
+        logger.info(f"📡 Snapshot {version} relayed to {sum(sent)} local clients ({len(self.index)} filters)")
+        return sum(sent)
+
+    async def latest_frame(self, flt: Optional[SubscriptionFilter] = None,
+                           fmt: str = wire_format.JSON) -> Optional[Frame]:
+        if self.frame is None:
+            try:
+                raw = await _redis.get(LAST_FRAME_KEY)
+                if raw:
+                    self._set_frame(*decode_message(raw))
+            except RedisError:
+                pass
+        return self.frame_for(flt, fmt)
+
+    async def send_latest(self, websocket: WebSocket):
+        """The current snapshot for a (re)subscribed socket, in its filter and encoding."""
+        frame = await self.latest_frame(*self.filters.get(websocket, (None, wire_format.JSON)))
+        if frame:
+            await self._send(websocket, frame)
+
+
+hub = LocalHub()
+
+
+# ---------------------------
+# Publisher (one worker at a time)
+# ---------------------------
+async def _hold_lease() -> bool:
+    if await _redis.set(PUBLISHER_KEY, _token, nx=True, px=PUBLISHER_LEASE_MS):
+        logger.info("👑 This worker is now the wait-time publisher")
+        return True
+    # Extend the lease only while we still own it (WATCH makes get + pexpire atomic)
+    async with _redis.pipeline(transaction=True) as pipe:
+        try:
+            await pipe.watch(PUBLISHER_KEY)
+            owner = await pipe.get(PUBLISHER_KEY)
+            if owner is None or owner.decode() != _token:
+                return False
+            pipe.multi()
+            pipe.pexpire(PUBLISHER_KEY, PUBLISHER_LEASE_MS)
+            await pipe.execute()
+            return True
+        except WatchError:
+            return False
+
+
+async def publish_once(fetch: SnapshotFetcher, last_version: Optional[str] = None) -> Optional[str]:
+    """Fetch, encode once and publish if the version changed; returns the current version."""
+    snapshot = await fetch()
+    if not snapshot:
+        return last_version
+    version, records = snapshot
+    if version == last_version:
+        return version
+
+    message = encode_message(version, wire_format.dumps_json(records).decode("utf-8"))
+    async with _redis.pipeline(transaction=False) as pipe:
+        pipe.set(LAST_FRAME_KEY, message)
+        pipe.publish(CHANNEL, message)
+        await pipe.execute()
+    logger.info(f"📣 Published wait-time snapshot {version} ({len(records)} records, {len(message)} bytes)")
+    return version
+
+
+async def publisher_loop(fetch: SnapshotFetcher, interval: float = PUBLISH_INTERVAL):
+    last_version = None
+    while True:
+        try:
+            if await _hold_lease():
+                last_version = await publish_once(fetch, last_version)
+            else:
+                last_version = None  # publish immediately if we take over later
+        except RedisError as e:
+            # No Redis: serve this worker's clients directly
+            logger.warning(f"⚠️ Redis unavailable for wait-time fan-out ({e}); broadcasting locally")
+            await _broadcast_locally(fetch)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to publish wait times: {e}")
+        await asyncio.sleep(interval)
+
+
+async def _broadcast_locally(fetch: SnapshotFetcher):
+    try:
+        snapshot = await fetch()
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to fetch wait times: {e}")
+        return
+    if snapshot:
+        version, records = snapshot
+        await hub.broadcast(version, wire_format.dumps_json(records).decode("utf-8"))
+
+
+# ---------------------------
+# Relay (every worker)
+# ---------------------------
+async def relay_loop(retry_delay: float = 2.0):
+    """Forward published frames to local sockets; resubscribes after Redis errors."""
+    while True:
+        pubsub = _redis.pubsub()
+        try:
+            await pubsub.subscribe(CHANNEL)
+            # Catch up on anything published while we weren't subscribed
+            raw = await _redis.get(LAST_FRAME_KEY)
+            if raw:
+                await hub.broadcast(*decode_message(raw))
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    await hub.broadcast(*decode_message(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Wait-time relay lost its subscription ({e}); retrying in {retry_delay}s")
+            await asyncio.sleep(retry_delay)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+
+async def run(fetch: SnapshotFetcher):
+    """Publisher + relay for this worker (runs for the life of the process)."""
+    await asyncio.gather(publisher_loop(fetch), relay_loop())
+
+
+# ---------------------------
+# Client control messages
+# ---------------------------
+async def handle_control(websocket: WebSocket, message: dict):
+    """subscribe / unsubscribe messages from a wait-time socket."""
+    kind = message.get("type")
+    if kind not in ("subscribe", "unsubscribe"):
+        return
+    try:
+        flt = parse_filter(message) if kind == "subscribe" else None
+    except ValueError as e:
+        await websocket.send_text(json.dumps({"type": "error", "error": "invalid_filter", "detail": str(e)}))
+        return
+    hub.subscribe(websocket, flt)
+    await websocket.send_text(json.dumps({"type": "subscribed", "filter": describe(flt)}))
+    await hub.send_latest(websocket)
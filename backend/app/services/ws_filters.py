@@ -0,0 +1,109 @@
+# app/services/ws_filters.py
+"""
+Subscription filters for the wait-time WebSockets.
+
+A client narrows its stream with
+
+    {"type": "subscribe", "region": "Calgary", "category": "Emergency",
+     "bbox": [min_lat, min_lng, max_lat, max_lng]}
+    {"type": "subscribe", "near": {"lat": 51.05, "lng": -114.07, "radius_km": 25}}
+
+(every field optional; `{"type": "unsubscribe"}` goes back to everything).
+Filters are normalized to a hashable key so clients asking for the same view
+share one entry in the hub's index — and one encoded frame per update.
+"""
+import math
+from typing import NamedTuple, Optional, Tuple
+
+from app.utils.geo import haversine_km
+
+MAX_RADIUS_KM = 500.0
+NEAR_PRECISION = 3  # ~100 m: nearby clients with the same radius share a filter
+
+
+class SubscriptionFilter(NamedTuple):
+    region: Optional[str] = None
+    category: Optional[str] = None
+    bbox: Optional[Tuple[float, float, float, float]] = None
+    near: Optional[Tuple[float, float, float]] = None  # lat, lng, radius_km
+
+
+def _text(message: dict, field: str) -> Optional[str]:
+    value = message.get(field)
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    return value.strip() or None
+
+
+def _number(value, error: str) -> float:
+    """float(value), with anything that isn't a finite number reported as ValueError(error)."""
+    if isinstance(value, bool):
+        raise ValueError(error)
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(error)
+    if not math.isfinite(number):
+        raise ValueError(error)
+    return number
+
+
+def parse_filter(message: dict) -> Optional[SubscriptionFilter]:
+    """Normalized filter from a subscribe message (None = everything). Raises ValueError."""
+    region = _text(message, "region")
+    category = _text(message, "category")
+
+    bbox = message.get("bbox")
+    if bbox is not None:
+        error = "bbox must be [min_lat, min_lng, max_lat, max_lng]"
+        if not isinstance(bbox, (list, tuple)) or len(bbox) != 4:
+            raise ValueError(error)
+        min_lat, min_lng, max_lat, max_lng = (round(_number(v, error), 4) for v in bbox)
+        if min_lat > max_lat or min_lng > max_lng:
+            raise ValueError("bbox minimums must not exceed maximums")
+        bbox = (min_lat, min_lng, max_lat, max_lng)
+
+    near = message.get("near")
+    if near is not None:
+        error = "near must be {lat, lng, radius_km}"
+        if not isinstance(near, dict) or "lat" not in near or "lng" not in near:
+            raise ValueError(error)
+        lat = round(_number(near["lat"], error), NEAR_PRECISION)
+        lng = round(_number(near["lng"], error), NEAR_PRECISION)
+        radius = _number(near.get("radius_km", 25), error)
+        if not 0 < radius <= MAX_RADIUS_KM:
+            raise ValueError(f"radius_km must be in (0, {MAX_RADIUS_KM:g}]")
+        near = (lat, lng, radius)
+
+    flt = SubscriptionFilter(region, category, bbox, near)
+    return None if flt == SubscriptionFilter() else flt
+
+
+def matches(record: dict, flt: SubscriptionFilter) -> bool:
+    if flt.region and record.get("region") != flt.region:
+        return False
+    if flt.category and record.get("category") != flt.category:
+        return False
+    if flt.bbox or flt.near:
+        lat, lng = record.get("lat"), record.get("lng")
+        if lat is None or lng is None:
+            return False  # no coordinates: can't be inside a geographic filter
+        if flt.bbox:
+            min_lat, min_lng, max_lat, max_lng = flt.bbox
+            if not (min_lat <= lat <= max_lat and min_lng <= lng <= max_lng):
+                return False
+        if flt.near and haversine_km(flt.near[0], flt.near[1], lat, lng) > flt.near[2]:
+            return False
+    return True
+
+
+def describe(flt: Optional[SubscriptionFilter]) -> dict:
+    """The filter as echoed back to the client in the `subscribed` ack."""
+    if flt is None:
+        return {}
+    out = {k: v for k, v in flt._asdict().items() if v is not None}
+    if flt.near:
+        out["near"] = {"lat": flt.near[0], "lng": flt.near[1], "radius_km": flt.near[2]}
+    return out
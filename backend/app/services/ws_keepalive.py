@@ -0,0 +1,85 @@
+# app/services/ws_keepalive.py
+"""
+Application-level keepalive for WebSocket handlers.
+
+Push-only sockets (wait-time streams) used to sit in `asyncio.sleep(30)`
+loops: they never read, so a disconnect went unnoticed until the next
+broadcast failed. `hold_open` reads instead — answering `{"type": "ping"}`
+with a pong and returning as soon as the client goes away.
+
+Idle connections are kept alive through proxies by protocol-level ping/pong
+frames (uvicorn's --ws-ping-interval / --ws-ping-timeout, set in the
+Dockerfile), which browsers answer without the page seeing them. JSON
+`{"type": "ping"}` text frames would reach the client's onmessage handler, so
+they are only sent to clients that opted in: ones that have sent a ping
+themselves or connected with `?heartbeat=1`.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+from fastapi import WebSocket
+
+# ---------------------------
+# Config
+# ---------------------------
+HEARTBEAT_INTERVAL = float(os.getenv("WS_HEARTBEAT_INTERVAL", "25"))  # under common 30-60s proxy idle timeouts
+
+
+def ping_frame() -> str:
+    return json.dumps({"type": "ping", "ts": int(time.time())})
+
+
+def pong_frame(message: Optional[dict] = None) -> str:
+    frame = {"type": "pong", "ts": int(time.time())}
+    if message and "id" in message:
+        frame["id"] = message["id"]
+    return json.dumps(frame)
+
+
+def parse_control(text: str) -> Optional[dict]:
+    """The decoded message if it is a JSON object, else None."""
+    try:
+        message = json.loads(text)
+    except (TypeError, ValueError):
+        return None
+    return message if isinstance(message, dict) else None
+
+
+def wants_heartbeat(websocket: WebSocket) -> bool:
+    return websocket.query_params.get("heartbeat", "").lower() in ("1", "true", "yes")
+
+
+async def hold_open(websocket: WebSocket, on_message: Optional[Callable[[dict], Awaitable[None]]] = None,
+                    interval: float = HEARTBEAT_INTERVAL, send_lock: Optional[asyncio.Lock] = None,
+                    on_invalid: Optional[Callable[[str], Awaitable[None]]] = None):
+    """Serve keepalives until the client disconnects (raises WebSocketDisconnect).
+
+    Opted-in clients (see module docstring) get a ping frame after `interval`
+    seconds of silence; others never receive unsolicited frames from here.
+    Other JSON objects are passed to `on_message`, anything else to
+    `on_invalid` (ignored by default).
+    """
+    send_lock = send_lock or asyncio.Lock()
+    heartbeat = wants_heartbeat(websocket)
+    while True:
+        try:
+            text = await asyncio.wait_for(websocket.receive_text(), timeout=interval)
+        except asyncio.TimeoutError:
+            if heartbeat:
+                async with send_lock:
+                    await websocket.send_text(ping_frame())
+            continue
+        message = parse_control(text)
+        if message is None:
+            if on_invalid is not None:
+                await on_invalid(text)
+            continue
+        if message.get("type") == "ping":
+            heartbeat = True  # a client that pings understands ping frames
+            async with send_lock:
+                await websocket.send_text(pong_frame(message))
+        elif message.get("type") != "pong" and on_message is not None:
+            await on_message(message)
@@ -1,85 +1,135 @@
 # app/startup_tasks.py
-from geopy.geocoders import Nominatim
 import asyncio
-import json
-import re
-from pathlib import Path
+import logging
+import os
+import uuid
 
-# Path to hospital coordinates JSON
-HOSPITAL_COORDS_FILE = Path("hospital_coordinates.json")
-HOSPITAL_COORDS = {}
+from redis.exceptions import RedisError
 
-# Load existing coordinates
-if HOSPITAL_COORDS_FILE.exists():
-    with open(HOSPITAL_COORDS_FILE, "r") as f:
-        HOSPITAL_COORDS = json.load(f)
+from app.services import audit_retention, facility_registry
+from app.services.geocoding import GeocodeCache, GeocodingPipeline, nominatim_geocoder
+from app.services.redis_client import async_r
 
-async def fetch_ahs_data():
+logger = logging.getLogger(__name__)
+
+# One worker geocodes at a time: each has its own token bucket, so N workers
+# would otherwise send N× the provider's rate limit
+GEOCODE_LOCK_KEY = "geocode:startup_lock"
+GEOCODE_LEASE_SEC = int(os.getenv("GEOCODE_LEASE_SEC", "3600"))
+
+# Audit partitions/retention: every worker checks hourly, the lease lets one run per day
+RETENTION_LOCK_KEY = "audit:retention_lease"
+RETENTION_INTERVAL_SEC = int(os.getenv("AUDIT_RETENTION_INTERVAL_SEC", "86400"))
+RETENTION_CHECK_SEC = int(os.getenv("AUDIT_RETENTION_CHECK_SEC", "3600"))
+
+# Only delete the lock if we still own it (the lease may have expired and been re-taken)
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_redis = async_r
+
+
+async def _take_lease(key: str, token: str, ttl: int) -> bool:
+    """SET NX EX; raises RedisError when Redis is down."""
+    return bool(await _redis.set(key, token, nx=True, ex=ttl))
+
+
+async def _release_lease(key: str, token: str):
+    try:
+        await _redis.eval(_RELEASE_LOCK_SCRIPT, 1, key, token)
+    except RedisError:
+        pass  # lease expires on its own
+
+
+def pending_geocodes(hospitals):
+    """(facility_id, query) for registry facilities that still have no coordinates."""
+    ids = facility_registry.resolve_names(
+        [h.get("name") for h in hospitals], regions={h.get("name"): h.get("region") for h in hospitals}
+    )
+    pending = {}
+    for h in hospitals:
+        facility = facility_registry.get(ids.get(h.get("name")))
+        if facility and facility["lat"] is None and facility["id"] not in pending:
+            pending[facility["id"]] = h.get("address") or f"{facility['name']}, Alberta, Canada"
+    return list(pending.items())
+
+async def geocode_hospitals_on_startup(geocoder=None, cache=None):
     """
-    Placeholder for your async function that fetches hospital data from AHS.
-    Must return a dict of hospitals by region/category.
+    Fill in coordinates for facilities that have none. Runs as a background
+    task in the one worker that wins the Redis lease: lookups are cached on
+    disk, rate-limited, sent through the shared HTTP client, and each result is
+    saved to the registry as soon as it arrives.
     """
-    # TODO: implement real fetching
-    return {}
+    token = uuid.uuid4().hex
+    try:
+        if not await _take_lease(GEOCODE_LOCK_KEY, token, GEOCODE_LEASE_SEC):
+            logger.info("⏳ Another worker is geocoding facilities — skipping")
+            return
+    except RedisError as e:
+        # Without the lease every worker would geocode at the full rate; try again next start
+        logger.warning(f"⚠️ Redis unavailable ({e}); skipping startup geocoding")
+        return
+    try:
+        await _geocode_pending(geocoder, cache)
+    finally:
+        await _release_lease(GEOCODE_LOCK_KEY, token)
+
 
-async def geocode_hospitals_on_startup():
-    """Pre-fetch hospital coordinates and update JSON file."""
-    global HOSPITAL_COORDS
-    ahs_data = await fetch_ahs_data()
+async def _geocode_pending(geocoder=None, cache=None):
+    from app.endpoints.recommend import fetch_live_hospitals
 
-    if not ahs_data or not isinstance(ahs_data, dict):
+    hospitals, _, _ = await fetch_live_hospitals()
+    if not hospitals:
         print("⚠️ No AHS data available on startup.")
         return
 
-    # Flatten AHS data
-    flattened_hospitals = []
-    for region, categories in ahs_data.items():
-        for category, hospitals in categories.items():
-            for hospital in hospitals:
-                flattened_hospitals.append({
-                    "name": hospital.get("Name") or hospital.get("name"),
-                    "address": hospital.get("Address") or "",
-                })
-
-    geolocator = Nominatim(user_agent="healthflow_ai")
-    updated_coords = {}
-
-    for h in flattened_hospitals:
-        name = h["name"]
-        address = h["address"]
-
-        # Skip hospitals that already have coordinates
-        if not name or name in HOSPITAL_COORDS:
-            continue
-
-        # Clean address
-        address = re.sub(r"[^\w\s,.-]", "", address)
-
-        success = False
-        for attempt in range(3):
-            try:
-                loc = geolocator.geocode(address, timeout=10)
-                if loc:
-                    coords = {"lat": loc.latitude, "lng": loc.longitude}
-                    HOSPITAL_COORDS[name] = coords
-                    updated_coords[name] = coords
-                    print(f"✅ {name}: {coords}")
-                    success = True
-                    break
-                else:
-                    print(f"⚠️ Could not geocode {name} on attempt {attempt+1}")
-            except Exception as e:
-                print(f"❌ Error geocoding {name} on attempt {attempt+1}: {e}")
-            await asyncio.sleep(1)  # wait 1s before retry
-
-        if not success:
-            print(f"⚠️ Failed to geocode {name} after 3 attempts")
-
-    # Save updated coordinates to JSON
-    if updated_coords:
-        with open(HOSPITAL_COORDS_FILE, "w") as f:
-            json.dump(HOSPITAL_COORDS, f, indent=2)
-        print(f"✅ Saved {len(updated_coords)} new hospital coordinates to {HOSPITAL_COORDS_FILE}")
+    pending = await asyncio.to_thread(pending_geocodes, hospitals)
+    if not pending:
+        return
+
+    cache = cache or await asyncio.to_thread(GeocodeCache)
+    pipeline = GeocodingPipeline(geocoder or nominatim_geocoder(), cache)
+
+    async def save(facility_id, coords):
+        await asyncio.to_thread(facility_registry.update_coordinates, facility_id, *coords)
+        logger.info(f"✅ Facility #{facility_id}: {coords}")
+
+    results = await pipeline.run(pending, on_result=save)
+    print(f"✅ Geocoded {len(results)}/{len(pending)} facilities ({pipeline.stats})")
+
+
+async def run_audit_retention_once() -> bool:
+    """
+    Create upcoming audit partitions and archive expired ones, if no worker
+    has done so within RETENTION_INTERVAL_SEC. The lease is kept after a
+    successful run (that is what spaces runs a day apart) and released after a
+    failure so the next hourly check retries.
+    """
+    token = uuid.uuid4().hex
+    try:
+        if not await _take_lease(RETENTION_LOCK_KEY, token, RETENTION_INTERVAL_SEC):
+            return False
+    except RedisError as e:
+        logger.warning(f"⚠️ Redis unavailable ({e}); audit retention postponed")
+        return False
+    try:
+        archived = await asyncio.to_thread(audit_retention.run_retention)
+    except Exception as e:
+        logger.error(f"❌ Audit retention failed: {e}")
+        await _release_lease(RETENTION_LOCK_KEY, token)
+        return False
+    logger.info(f"✅ Audit partitions ensured; {len(archived)} partition(s) archived")
+    return True
+
+
+async def run_audit_retention_scheduler():
+    while True:
+        await run_audit_retention_once()
+        await asyncio.sleep(RETENTION_CHECK_SEC)
 
 # Example of usage in main.py:
 # asyncio.run(geocode_hospitals_on_startup())
@@ -3,7 +3,7 @@ import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.database import Base
-from app.models import triage  # import your models to register with Base
+from app.models import triage, wait_time, facility, ingest, appointment  # import your models to register with Base
 
 @pytest.fixture(scope="session")
 def engine():
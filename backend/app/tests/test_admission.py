@@ -0,0 +1,79 @@
+# tests/test_admission.py
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.endpoints import triage as triage_endpoint
+from app.services import admission
+from app.services.admission import PRIORITY_CRITICAL, AdmissionController, Overloaded
+
+
+def test_queue_is_bounded_and_critical_requests_go_first():
+    async def run():
+        ctl = AdmissionController("t", limit=1, queue_size=2, max_wait=5)
+        ctl.service_time = 0.001
+        running = await ctl.acquire()
+        order = []
+
+        async def request(name, priority=admission.PRIORITY_NORMAL):
+            try:
+                async with ctl.slot(priority):
+                    order.append(name)
+            except Overloaded as e:
+                order.append(f"shed:{name}:{e.reason}")
+
+        tasks = [asyncio.create_task(request("a")), asyncio.create_task(request("b"))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request("c")))  # queue full
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request("critical", PRIORITY_CRITICAL)))  # evicts b, jumps ahead of a
+        await asyncio.sleep(0)
+        running.release()
+        await asyncio.gather(*tasks)
+        return order, ctl
+
+    order, ctl = asyncio.run(run())
+    assert order == ["shed:c:full", "shed:b:full", "critical", "a"]
+    assert ctl.stats["evicted"] == 1 and ctl.in_flight == 0 and ctl.queued == 0
+
+
+def test_requests_are_shed_when_their_deadline_cannot_be_met():
+    async def run():
+        ctl = AdmissionController("t", limit=1, queue_size=10, max_wait=0.05)
+        running = await ctl.acquire()
+        ctl.service_time = 0.001
+        with pytest.raises(Overloaded) as timed_out:
+            await ctl.acquire()                       # queued, then times out
+        ctl.service_time = 1.0                        # now each request takes ~1s
+        with pytest.raises(Overloaded) as refused:
+            await ctl.acquire()                       # expected wait > max_wait: refused up front
+        running.release()
+        return timed_out.value, refused.value, ctl
+
+    timed_out, refused, ctl = asyncio.run(run())
+    assert timed_out.reason == refused.reason == "deadline"
+    assert refused.retry_after >= 1 and ctl.in_flight == 0
+
+
+@pytest.fixture
+def saturated(monkeypatch):
+    monkeypatch.setattr(admission, "triage", AdmissionController("triage", limit=0, queue_size=0, max_wait=0))
+    app = FastAPI()
+    app.include_router(triage_endpoint.router)
+    return TestClient(app)
+
+
+def test_overloaded_triage_gets_a_rules_only_answer(saturated):
+    response = saturated.post("/triage", json={"symptoms": "crushing chest pain", "age": 70})
+    assert response.status_code == 200 and "retry-after" in response.headers
+    body = response.json()
+    assert body["recommended_level"] == "Emergency"  # safety override still applies
+    assert body["meta"]["degraded"] == "overload" and body["hospital_recommendation"] == []
+
+
+def test_overloaded_triage_can_reject_instead(saturated, monkeypatch):
+    monkeypatch.setattr(admission, "SHED_MODE", "reject")
+    response = saturated.post("/triage", json={"symptoms": "sore throat"})
+    assert response.status_code == 503 and int(response.headers["retry-after"]) >= 1
@@ -0,0 +1,63 @@
+# tests/test_ahs_cache.py
+import asyncio
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.services import ahs_cache
+
+
+@pytest.fixture
+def shared_redis(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(ahs_cache, "_redis", fakeredis.FakeAsyncRedis(server=server))
+    monkeypatch.setattr(ahs_cache, "_l1", {"snapshot": None, "checked_at": 0.0, "retry_after": 0.0})
+    return server
+
+
+def test_snapshot_roundtrip_encoding():
+    snap = ahs_cache.build_snapshot([{"name": "Foothills", "wait_time": "1 hr 5 min"}])
+    assert ahs_cache.decode_snapshot(ahs_cache.encode_snapshot(snap)) == snap
+
+
+def test_single_refresh_across_workers(shared_redis, monkeypatch):
+    """Concurrent misses from several 'workers' should hit AHS only once."""
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return [{"name": "Foothills", "wait_time": "30 min"}]
+
+    async def worker():
+        # each worker has its own L1 but shares the Redis server
+        ahs_cache._l1 = {"snapshot": None, "checked_at": 0.0, "retry_after": 0.0}
+        return await ahs_cache.get_snapshot(fetch)
+
+    async def run():
+        ahs_cache._refresh_lock = asyncio.Lock()
+        leader = asyncio.create_task(ahs_cache.get_snapshot(fetch))
+        await asyncio.sleep(0.05)
+        # simulate a second process: separate L1 and lock, same Redis
+        monkeypatch.setattr(ahs_cache, "_refresh_lock", asyncio.Lock())
+        follower = await worker()
+        return await leader, follower
+
+    leader, follower = asyncio.run(run())
+    assert len(calls) == 1
+    assert leader["version"] == follower["version"]
+
+
+def test_l1_hit_skips_redis(shared_redis):
+    async def fetch():
+        return [{"name": "A"}]
+
+    async def run():
+        ahs_cache._refresh_lock = asyncio.Lock()
+        first = await ahs_cache.get_snapshot(fetch)
+        await ahs_cache._redis.flushall()
+        second = await ahs_cache.get_snapshot(fetch)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first is second
@@ -0,0 +1,103 @@
+# tests/test_appointments_import.py
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models.appointment import Appointment
+from app.models.facility import Facility, FacilityAlias
+from app.services import facility_registry
+from app.services.csv_ingest import create_job, ingest_file
+from app.utils.pseudonym import patient_pseudonym
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'appointments.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        facility_registry.seed(db)
+    return engine
+
+
+def test_bulk_import_upserts_facilities_and_reports_bad_rows(tmp_path, file_engine):
+    path = tmp_path / "appointments.csv"
+    rows = ["facility_name,patient_id,modality,scheduled_time,status,region,urgency"]
+    for i in range(30):
+        facility = ["Foothills Medical Centre", "Canmore General Hospital", "canmore general hospital "][i % 3]
+        rows.append(f"{facility},p{i},MRI,2024-05-0{1 + i % 9}T09:30:00,scheduled,Calgary Zone,routine")
+    rows.append("Foothills Medical Centre,p99,CT,not-a-date,scheduled,,")
+    rows.append(",p100,CT,2024-05-01T10:00:00,scheduled,,")
+    path.write_text("\n".join(rows) + "\n")
+
+    with Session(file_engine) as db:
+        job_id = create_job(db, "appointments", "appointments.csv", path.stat().st_size).id
+    result = ingest_file(job_id, str(path), "appointments", bind=file_engine, chunk_rows=8)
+
+    assert result["status"] == "done"
+    assert result["rows_loaded"] == 30 and result["rows_rejected"] == 2
+    assert [e["error"] for e in result["errors"]] == ["invalid scheduled_time", "invalid facility_name"]
+    assert result["rows_per_sec"] is not None
+
+    with Session(file_engine) as db:
+        assert db.scalar(select(func.count()).select_from(Appointment)) == 30
+        # Seeded facility reused by ID; the new one created once despite two spellings
+        canmore = db.scalars(select(Facility).where(Facility.name == "Canmore General Hospital")).one()
+        assert canmore.region == "Calgary Zone"
+        assert db.get(FacilityAlias, "canmore general hospital").facility_id == canmore.id
+        per_facility = dict(db.execute(
+            select(Appointment.facility_id, func.count()).group_by(Appointment.facility_id)
+        ).all())
+        assert per_facility == {2: 10, canmore.id: 20}
+
+
+def test_upload_appointments_still_accepts_a_json_appointment(file_engine, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.database import get_db
+    from app.endpoints.upload_appointments import router
+
+    monkeypatch.setattr(facility_registry, "_facilities", {})
+    monkeypatch.setattr(facility_registry, "_aliases", {})
+    with Session(file_engine) as db:
+        facility_registry.load(db)
+
+    def session():
+        with Session(file_engine) as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = session
+    client = TestClient(app)
+
+    response = client.post("/upload-appointments", json={
+        "patient_name": "p1", "hospital": "Foothills Medical Centre", "appointment_time": "2024-05-01T09:30:00"})
+    assert response.status_code == 200
+    assert response.headers["Deprecation"] == "true"
+    body = response.json()["appointment"]
+    assert body["facility_id"] == 2 and body["patient_name"] == "p1"
+    with Session(file_engine) as db:
+        patient_id = db.get(Appointment, body["id"]).patient_id
+    assert patient_id != "p1" and len(patient_id) == 64  # keyed hash, not the name
+    assert patient_id == patient_pseudonym(" P1 ")
+
+    assert client.post("/upload-appointments", files={"file": ("a.txt", b"x")}).status_code == 400
+
+
+def test_bulk_upsert_matches_new_spellings_to_existing_facilities(file_engine):
+    with file_engine.begin() as conn:
+        ids = facility_registry.upsert_names(conn, {
+            "Foothills Medical Center": "Calgary Zone",  # US spelling of a seeded facility
+            "Northwest Community Health Centre": "Edmonton Zone",  # not Northeast CHC
+            "Canmore General Hospital": "Calgary Zone",
+            "Canmore General Hospitl": "Calgary Zone",  # typo of a name new in this batch
+        })
+    assert ids["Foothills Medical Center"] == 2
+    assert ids["Northwest Community Health Centre"] != 16
+    assert ids["Canmore General Hospital"] == ids["Canmore General Hospitl"] != 2
+    with Session(file_engine) as db:
+        assert db.get(FacilityAlias, "foothills medical center").source == facility_registry.PROVISIONAL
+        assert db.get(FacilityAlias, "northwest community health centre").source == "new"
+        assert db.scalar(select(func.count()).select_from(Facility).where(Facility.name.like("Canmore%"))) == 1
@@ -0,0 +1,105 @@
+# tests/test_audit_retention.py
+import asyncio
+from datetime import date
+from unittest import mock
+
+import pytest
+
+from app.services.audit_retention import (add_months, create_month_partition, parse_partition, partition_name,
+                                          partitions_to_archive)
+
+
+def test_month_arithmetic_and_names():
+    assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert add_months(date(2024, 1, 1), -13) == date(2022, 12, 1)
+    assert partition_name("triage_audit", date(2024, 5, 1)) == "triage_audit_p2024_05"
+    assert parse_partition("triage_message_p2023_12") == ("triage_message", date(2023, 12, 1))
+    assert parse_partition("triage_audit_default") is None
+
+
+def test_only_months_past_the_window_are_archived():
+    names = [partition_name("triage_audit", add_months(date(2023, 1, 1), i)) for i in range(24)]
+    names.append("triage_audit_default")
+    # 13 months back from 2024-06-15 -> keep 2023-05 onwards
+    old = partitions_to_archive(reversed(names), date(2024, 6, 15), retention_months=13)
+    assert old == [partition_name("triage_audit", date(2023, m, 1)) for m in range(1, 5)]
+
+
+class RecordingConn:
+    """Just enough of a Connection to record the DDL (no Postgres in the test run)."""
+
+    def __init__(self, exists=False, stranded=False):
+        self.exists, self.stranded = exists, stranded
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        result = mock.Mock(rowcount=2)
+        if "to_regclass" in sql:
+            result.scalar.return_value = "triage_audit_p2024_05" if self.exists else None
+        elif "SELECT EXISTS" in sql:
+            result.scalar.return_value = self.stranded
+        elif "information_schema" in sql:
+            result.__iter__ = lambda self: iter([("id",), ("received_at",)])
+        return result
+
+
+def test_month_partition_is_created_directly_when_default_has_none_of_its_rows():
+    conn = RecordingConn()
+    assert create_month_partition(conn, "triage_audit", date(2024, 5, 1)) == "triage_audit_p2024_05"
+    assert not any("DETACH" in s for s in conn.statements)
+    assert conn.statements[-1].startswith("CREATE TABLE triage_audit_p2024_05 PARTITION OF triage_audit")
+
+
+def test_rows_stranded_in_default_are_moved_into_the_new_month():
+    conn = RecordingConn(stranded=True)
+    create_month_partition(conn, "triage_audit", date(2024, 5, 1))
+    ddl = [s.split()[0] + " " + s.split()[1] for s in conn.statements if not s.startswith(("SELECT", "SET"))]
+    assert ddl == ["ALTER TABLE", "CREATE TABLE", "WITH moved", "ALTER TABLE"]
+    assert "DETACH PARTITION triage_audit_default" in conn.statements[3]
+    assert "received_at >= '2024-05-01' AND received_at < '2024-06-01'" in conn.statements[-2]
+    assert conn.statements[-1].endswith("ATTACH PARTITION triage_audit_default DEFAULT")
+
+
+def test_existing_month_partition_is_left_alone():
+    conn = RecordingConn(exists=True)
+    create_month_partition(conn, "triage_audit", date(2024, 5, 1))
+    assert len(conn.statements) == 1
+
+
+def _leased_retention(monkeypatch, outcomes):
+    fakeredis = pytest.importorskip("fakeredis")
+    from app import startup_tasks
+
+    monkeypatch.setattr(startup_tasks, "_redis", fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer()))
+    runs = []
+
+    def run_retention():
+        runs.append(1)
+        if outcomes.pop(0) == "fail":
+            raise RuntimeError("lock timeout")
+        return []
+
+    monkeypatch.setattr(startup_tasks.audit_retention, "run_retention", run_retention)
+
+    async def checks(rounds):
+        return [await asyncio.gather(*(startup_tasks.run_audit_retention_once() for _ in range(4)))
+                for _ in range(rounds)]
+    return checks, runs
+
+
+def test_retention_runs_in_one_worker_per_interval(monkeypatch):
+    checks, runs = _leased_retention(monkeypatch, ["ok"])
+    first, second = asyncio.run(checks(2))
+    assert first.count(True) == 1
+    assert second == [False] * 4  # lease held until the next interval
+    assert runs == [1]
+
+
+def test_failed_retention_releases_the_lease(monkeypatch):
+    pytest.importorskip("lupa")  # fakeredis needs it for EVAL
+    checks, runs = _leased_retention(monkeypatch, ["fail", "ok"])
+    failed, succeeded = asyncio.run(checks(2))
+    assert failed == [False] * 4 and succeeded.count(True) == 1
+    assert len(runs) == 2
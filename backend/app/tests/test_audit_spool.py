@@ -0,0 +1,168 @@
+# tests/test_audit_spool.py
+import asyncio
+import contextlib
+import json
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models.triage import TriageAudit, TriageMessage
+from app.services import audit_spool
+
+TRIAGE = {"recommended_level": "PrimaryCare", "score": 2, "reasons": ["mild symptoms"],
+          "suggested_action": "See your family doctor", "meta": {"source": "rules"}}
+
+
+@pytest.fixture
+def wal(tmp_path, monkeypatch):
+    monkeypatch.setattr(audit_spool, "LEGACY_SPOOL_PATH", str(tmp_path / "audit_spool.jsonl"))
+    log = audit_spool.SegmentLog(str(tmp_path / "audit_wal"), group_commit=0.005)
+    yield log
+    log.close()
+
+
+def _record(symptoms="sore throat"):
+    return audit_spool.record_for({"age": 30}, symptoms, datetime.utcnow(), TRIAGE, [], "See your family doctor.")
+
+
+def _session(db):
+    return lambda: contextlib.nullcontext(db)
+
+
+def test_concurrent_writes_share_fsyncs(wal):
+    async def run():
+        await asyncio.gather(*(asyncio.wrap_future(wal.submit(_record(f"case {i}"))) for i in range(50)))
+    asyncio.run(run())
+    assert wal.stats["appended"] == 50
+    assert wal.stats["fsyncs"] < 50  # group commit
+    assert wal.pending() == 50
+
+
+def test_drain_loads_segments_once(wal, db_session):
+    records = [_record(f"case {i}") for i in range(3)]
+    for rec in records:
+        wal.submit(rec).result()
+    assert wal.drain(session_factory=_session(db_session)) == 3
+    assert wal.segments() == []
+
+    # A segment loaded again (crash between commit and delete) adds nothing
+    for rec in records:
+        wal.submit(rec).result()
+    assert wal.drain(session_factory=_session(db_session)) == 0
+    assert wal.stats["duplicates"] == 3
+
+    keys = [rec["key"] for rec in records]
+    audits = db_session.query(TriageAudit).filter(TriageAudit.idempotency_key.in_(keys)).all()
+    assert len(audits) == 3
+    ids = [a.id for a in audits]
+    assert db_session.query(TriageMessage).filter(TriageMessage.audit_id.in_(ids)).count() == 6
+
+
+def test_active_segment_of_another_writer_is_skipped(wal, db_session, tmp_path):
+    other = audit_spool.SegmentLog(wal.directory)
+    other.submit(_record()).result()  # open and flock'ed by "another worker"
+    try:
+        assert wal.drain(session_factory=_session(db_session)) == 0
+        assert wal.pending() == 1
+    finally:
+        other.close()  # the worker exits; its segment is now drainable
+    assert wal.drain(session_factory=_session(db_session)) == 1
+
+
+def test_torn_tail_and_legacy_spool_are_handled(wal, db_session):
+    wal.submit(_record("complete")).result()
+    wal.seal()
+    with open(wal.segments()[-1], "ab") as f:
+        f.write(b'{"key": "cut-off", "rece')
+    legacy = _record("from the old spool")
+    legacy.pop("key")
+    with open(audit_spool.LEGACY_SPOOL_PATH, "w") as f:
+        f.write(json.dumps(legacy) + "\n")
+
+    assert wal.drain(session_factory=_session(db_session)) == 2
+    assert wal.stats["torn"] == 1
+    assert not os.path.exists(audit_spool.LEGACY_SPOOL_PATH)
+
+
+def test_active_segment_is_not_visible_to_drainers(wal):
+    wal.submit(_record()).result()
+    assert wal.segments() == []  # still .wal.open: a drainer can't lock and remove it before the writer does
+    assert wal.pending() == 1
+    wal.seal()
+    assert [os.path.basename(p).endswith(".wal") for p in wal.segments()] == [True]
+
+
+def test_segment_left_open_by_a_crashed_worker_is_recovered(wal, db_session):
+    os.makedirs(wal.directory, exist_ok=True)
+    stale = os.path.join(wal.directory, f"00000000000000000001-999999.wal{audit_spool.OPEN_SUFFIX}")
+    with open(stale, "wb") as f:
+        f.write((json.dumps(_record("before the crash")) + "\n").encode())
+    empty = os.path.join(wal.directory, f"00000000000000000002-999999.wal{audit_spool.OPEN_SUFFIX}")
+    open(empty, "wb").close()
+
+    assert wal.drain(session_factory=_session(db_session)) == 1
+    assert wal.stats["recovered"] == 1
+    assert wal.open_segments() == [] and wal.segments() == []
+
+
+def test_writer_reopens_when_recovery_takes_its_empty_segment(wal, monkeypatch):
+    real_flock = audit_spool.fcntl.flock
+    raced = []
+
+    def flock(f, op):
+        if not raced and f.name.endswith(audit_spool.OPEN_SUFFIX):
+            raced.append(f.name)
+            os.remove(f.name)  # recovery removed it between open() and flock()
+        return real_flock(f, op)
+
+    monkeypatch.setattr(audit_spool.fcntl, "flock", flock)
+    wal.submit(_record()).result()
+    wal.seal()
+    assert raced and not os.path.exists(raced[0])
+    assert wal.pending() == 1
+
+
+def test_records_the_database_rejects_are_quarantined(wal):
+    # Own engine: a rejected batch is rolled back, which would end db_session's outer transaction
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    good = [_record(f"case {i}") for i in range(3)]
+    bad = _record()
+    bad["symptoms"] = None  # NOT NULL: Postgres would refuse this on every attempt
+    for rec in good[:1] + [bad] + good[1:]:
+        wal.submit(rec).result()
+
+    assert wal.drain(session_factory=session_factory) == 3
+    assert wal.segments() == [] and wal.stats["quarantined"] == 1
+    with session_factory() as db:
+        assert db.query(TriageAudit).count() == 3
+    with open(os.path.join(wal.directory, audit_spool.QUARANTINE_FILE)) as f:
+        [entry] = [json.loads(line) for line in f]
+    assert entry["record"]["key"] == bad["key"] and entry["error"]
+
+
+def test_local_disk_errors_do_not_trip_the_postgres_breaker(wal, monkeypatch):
+    from app.services import degradation
+
+    monkeypatch.setattr(degradation, "postgres", degradation.Dependency("postgres", 0.5))
+    monkeypatch.setattr(audit_spool, "wal", wal)
+    wal.submit(_record()).result()
+
+    def disk_full():
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(wal, "seal", disk_full)
+    with pytest.raises(audit_spool.WalIOError):
+        wal.drain(session_factory=lambda: pytest.fail("database reached"))
+
+    async def run():
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(audit_spool.drain_loop(interval=0.01), timeout=0.1)
+    asyncio.run(run())
+    assert degradation.postgres.stats["failed"] == 0
+    assert degradation.postgres.available()
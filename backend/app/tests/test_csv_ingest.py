@@ -0,0 +1,50 @@
+# tests/test_csv_ingest.py
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models.ingest import IngestJob, StagingEdWait
+from app.services.csv_ingest import create_job, ingest_file
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ingest.db'}")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def test_streams_chunks_and_rejects_bad_rows(tmp_path, file_engine):
+    path = tmp_path / "waits.csv"
+    lines = ["hospital_name,wait_time_minutes"]
+    for i in range(25):
+        lines.append(f"Hospital {i},{i * 5}")
+    lines += ["Bad Row,abc", ",30", "Fractional,2.5"]
+    path.write_text("\n".join(lines) + "\n")
+
+    with Session(file_engine) as db:
+        job_id = create_job(db, "ed_waits", "waits.csv", path.stat().st_size).id
+
+    result = ingest_file(job_id, str(path), "ed_waits", bind=file_engine, chunk_rows=10)
+    assert result["status"] == "done"
+    assert result["rows_loaded"] == 25 and result["rows_rejected"] == 3
+    assert [e["row"] for e in result["errors"]] == [27, 28, 29]
+    assert result["progress"] == 1.0
+
+    with Session(file_engine) as db:
+        count = db.scalar(select(func.count()).select_from(StagingEdWait).where(StagingEdWait.job_id == job_id))
+        assert count == 25
+
+
+def test_missing_columns_fail_the_job(tmp_path, file_engine):
+    path = tmp_path / "bad.csv"
+    path.write_text("name,minutes\nA,5\n")
+    with Session(file_engine) as db:
+        job_id = create_job(db, "ed_waits", "bad.csv", path.stat().st_size).id
+
+    result = ingest_file(job_id, str(path), "ed_waits", bind=file_engine)
+    assert result["status"] == "failed"
+    assert "missing" in result["errors"][-1]["error"]
+    with Session(file_engine) as db:
+        assert db.get(IngestJob, job_id).status == "failed"
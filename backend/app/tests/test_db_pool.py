@@ -0,0 +1,26 @@
+# tests/test_db_pool.py
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+from app.database import TimedQueuePool, pool_stats
+
+
+def test_pool_stats_track_saturation_and_timeouts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool,
+                           pool_size=1, max_overflow=1, pool_timeout=0.05, pool_pre_ping=True)
+    first, second = engine.connect(), engine.connect()
+    first.execute(text("SELECT 1"))
+
+    stats = pool_stats(engine)
+    assert stats["checked_out"] == 2 and stats["saturation"] == 1.0
+
+    with pytest.raises(PoolTimeout):
+        engine.connect()
+    first.close()
+    second.close()
+
+    stats = pool_stats(engine)
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 2 and stats["checkout_timeouts"] == 1
+    assert stats["wait_max_ms"] >= 0
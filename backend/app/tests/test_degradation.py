@@ -0,0 +1,161 @@
+# tests/test_degradation.py
+import asyncio
+import contextlib
+import time
+
+import pytest
+import redis
+
+from app.models.triage import TriageAudit, TriageMessage
+from app.services import audit_spool, degradation, hospital_snapshot, triage_service
+
+SNAPSHOT = [
+    {"name": "Foothills Medical Centre", "category": "Emergency", "wait_time": "2 hr", "note": None,
+     "lat": 51.065, "lng": -114.133},
+    {"name": "Peter Lougheed Centre", "category": "Emergency", "wait_time": "1 hr", "note": None,
+     "lat": 51.079, "lng": -113.985},
+]
+
+
+@pytest.fixture(autouse=True)
+def local_state(tmp_path, monkeypatch):
+    for name in ("model", "redis", "postgres"):
+        monkeypatch.setattr(degradation, name, degradation.Dependency(name, 0.5))
+    monkeypatch.setattr(hospital_snapshot, "SNAPSHOT_PATH", str(tmp_path / "hospitals_lkg.json"))
+    monkeypatch.setattr(hospital_snapshot, "_state", {"version": None, "hospitals": None, "saved_at": None})
+    monkeypatch.setattr(audit_spool, "LEGACY_SPOOL_PATH", str(tmp_path / "audit_spool.jsonl"))
+    wal = audit_spool.SegmentLog(str(tmp_path / "audit_wal"))
+    monkeypatch.setattr(audit_spool, "wal", wal)
+    yield tmp_path
+    wal.close()
+
+
+def _collect(payload, db):
+    async def run():
+        return [frame async for frame in triage_service.triage_events(payload, db)]
+    return asyncio.run(run())
+
+
+def _redis_down(*args):
+    raise redis.ConnectionError("Connection refused")
+
+
+def test_redis_outage_uses_the_last_known_good_snapshot(db_session, monkeypatch):
+    hospital_snapshot.save("v1", SNAPSHOT)
+    monkeypatch.setattr(hospital_snapshot, "_state", {"version": None, "hospitals": None, "saved_at": None})  # restart
+    monkeypatch.setattr(triage_service, "_get_hospital_recommendations", _redis_down)
+
+    frames = _collect({"symptoms": "crushing chest pain", "lat": 51.05, "lng": -114.07}, db_session)
+    hospitals = frames[1]
+    assert hospitals["hospital_source"] == "snapshot"
+    assert {h["name"] for h in hospitals["hospital_recommendation"]} == {h["name"] for h in SNAPSHOT}
+    assert frames[2]["audit_key"] is not None
+
+
+def test_breaker_skips_a_failing_dependency(db_session, monkeypatch):
+    calls = []
+
+    def failing(*args):
+        calls.append(1)
+        _redis_down()
+
+    monkeypatch.setattr(triage_service, "_get_hospital_recommendations", failing)
+    for _ in range(degradation.FAILURE_THRESHOLD + 2):
+        _collect({"symptoms": "crushing chest pain"}, db_session)
+    assert len(calls) == degradation.FAILURE_THRESHOLD  # then the open breaker short-circuits
+    assert degradation.redis.snapshot()["state"] == "open"
+
+
+def test_model_failure_falls_back_to_rules(db_session, monkeypatch):
+    if not triage_service.nlp_model_data:
+        pytest.skip("NLP model not available")
+
+    def broken(*args, **kwargs):
+        raise ValueError("corrupt model")
+
+    monkeypatch.setattr(triage_service, "predict_levels", broken)
+    monkeypatch.setattr(triage_service, "_get_hospital_recommendations", lambda level, lat, lng: [])
+    frames = _collect({"symptoms": "sore throat and a mild cough", "age": 30}, db_session)
+    assert frames[0]["meta"]["degraded"] == "rules_only"
+    assert degradation.model.stats["failed"] == 1
+
+
+
+def test_slow_model_runs_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(degradation, "model", degradation.Dependency("model", 0.1))
+    monkeypatch.setattr(triage_service, "nlp_model_data", {"model": object()})
+
+    def slow(*args, **kwargs):
+        time.sleep(0.3)
+        return ["Emergency"]
+
+    monkeypatch.setattr(triage_service, "predict_levels", slow)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        triage = await triage_service._classify({"symptoms": "sore throat and a mild cough", "age": 30},
+                                                "sore throat and a mild cough")
+        task.cancel()
+        return triage, ticks
+
+    triage, ticks = asyncio.run(run())
+    assert triage["meta"]["degraded"] == "rules_only"  # over budget: rules answer without waiting
+    assert ticks >= 5
+    assert degradation.model.stats["failed"] == 1
+
+
+def test_postgres_outage_keeps_audits_in_the_wal_until_it_recovers(db_session, monkeypatch):
+    @contextlib.contextmanager
+    def db_down():
+        raise OSError("could not connect to server")
+        yield
+
+    monkeypatch.setattr(triage_service, "_get_hospital_recommendations", lambda level, lat, lng: [])
+    frames = _collect({"symptoms": "crushing chest pain", "age": 70}, db_session)
+    assert frames[-1]["type"] == "ack" and frames[-1]["audit_key"]
+
+    with pytest.raises(OSError):
+        audit_spool.wal.drain(session_factory=db_down)
+    assert audit_spool.pending() == 1  # the segment stays for the next attempt
+
+    written = audit_spool.wal.drain(session_factory=lambda: contextlib.nullcontext(db_session))
+    assert written == 1 and audit_spool.pending() == 0
+    audit = db_session.query(TriageAudit).filter(TriageAudit.idempotency_key == frames[-1]["audit_key"]).one()
+    assert audit.recommended_level == "Emergency"
+    assert db_session.query(TriageMessage).filter(TriageMessage.audit_id == audit.id).count() == 2
+
+
+def test_wal_failure_falls_back_to_a_bounded_database_write(db_session, monkeypatch):
+    async def disk_full(record):
+        raise OSError(28, "No space left on device")
+
+    written = []
+    monkeypatch.setattr(audit_spool, "write", disk_full)
+    monkeypatch.setattr(audit_spool, "insert_direct", lambda record: written.append(record["key"]) or 1)
+    monkeypatch.setattr(triage_service, "_get_hospital_recommendations", lambda level, lat, lng: [])
+    ack = _collect({"symptoms": "crushing chest pain", "age": 70}, db_session)[-1]
+    assert ack["durable"] is True and written == [ack["audit_key"]]
+
+    def hung(record):
+        time.sleep(2)
+
+    monkeypatch.setattr(audit_spool, "insert_direct", hung)
+
+    async def timed():
+        start = time.monotonic()
+        frames = [f async for f in triage_service.triage_events({"symptoms": "crushing chest pain", "age": 70},
+                                                               db_session)]
+        return frames[-1], time.monotonic() - start
+
+    ack, elapsed = asyncio.run(timed())
+    assert ack["durable"] is False and "timed out" in ack["audit_error"]
+    assert elapsed < 1.5  # the Postgres timeout (0.5 s here) bounds the wait, not the hung insert
+    assert degradation.postgres.stats["failed"] == 1
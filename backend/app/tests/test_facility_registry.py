@@ -0,0 +1,116 @@
+# tests/test_facility_registry.py
+import pytest
+
+from app.models.facility import FacilityAlias
+from app.services import facility_registry
+
+
+@pytest.fixture
+def registry(db_session, monkeypatch):
+    monkeypatch.setattr(facility_registry, "_facilities", {})
+    monkeypatch.setattr(facility_registry, "_aliases", {})
+    facility_registry.load(db_session)
+    return db_session
+
+
+def test_seed_gives_stable_ids_and_aliases(registry):
+    assert facility_registry.lookup("Foothills Medical Centre") == 2
+    assert facility_registry.lookup("  FOOTHILLS medical centre ") == 2
+    assert facility_registry.lookup("Fort Saskatchewan Community Hospital") == 12
+    assert facility_registry.get(2)["lat"] == pytest.approx(51.0651)
+
+
+def test_new_spelling_resolved_once_and_persisted(registry):
+    fid = facility_registry.resolve(registry, "Foothills Medical Center", region="Calgary Zone")
+    assert fid == 2
+    row = registry.get(FacilityAlias, facility_registry.normalize_name("Foothills Medical Center"))
+    assert row.facility_id == 2 and row.source == facility_registry.PROVISIONAL
+    # From now on it is a plain dict lookup
+    assert facility_registry.lookup("Foothills Medical Center") == 2
+
+
+
+@pytest.mark.parametrize("name, region, lookalike", [
+    ("Northwest Community Health Centre", "Edmonton", 16),  # vs Northeast ...: scores 97
+    ("North Calgary Health Centre", "Calgary", 10),          # vs South Calgary ...: scores 92.6
+    ("Foothills Medical Center", "Edmonton", 2),             # right name, wrong zone
+    ("Foothills Medical Center", None, 2),                   # no region: nothing to check against
+])
+def test_lookalike_names_are_not_matched_across_sites(registry, name, region, lookalike):
+    fid = facility_registry.resolve(registry, name, region=region)
+    assert fid != lookalike
+    assert registry.get(FacilityAlias, facility_registry.normalize_name(name)).source == "new"
+
+
+def test_provisional_aliases_are_not_match_targets(registry):
+    facility_registry.resolve(registry, "Foothills Medical Center", region="Calgary")  # provisional
+    candidates = facility_registry._match_candidates(registry)
+    assert "foothills medical center" not in candidates
+    assert candidates["foothills medical centre"] == (2, "Calgary")
+
+def test_unknown_facility_gets_new_id(registry):
+    fid = facility_registry.resolve(registry, "Canmore General Hospital", region="Calgary Zone")
+    assert fid not in (None, 2) and fid > 30
+    facility = facility_registry.get(fid)
+    assert facility["name"] == "Canmore General Hospital" and facility["lat"] is None
+    assert facility_registry.resolve(registry, "Canmore General Hospital") == fid
+
+
+def test_concurrent_insert_of_the_same_name_is_not_an_error(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+    from app.models.facility import Facility
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'registry.db'}")
+    Base.metadata.create_all(engine, tables=[Facility.__table__, FacilityAlias.__table__])
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(facility_registry, "_facilities", {})
+    monkeypatch.setattr(facility_registry, "_aliases", {})
+    db = Session()
+    facility_registry.load(db)
+
+    real_match = facility_registry.process.extractOne
+
+    def other_worker_wins(*args, **kwargs):
+        # Between our alias read and our insert, another worker resolves the same name
+        with Session() as other:
+            facility = Facility(name="Canmore General Hospital")
+            other.add(facility)
+            other.flush()
+            other.add(FacilityAlias(alias="canmore general hospital", facility_id=facility.id, source="new"))
+            other.commit()
+        return real_match(*args, **kwargs)
+
+    monkeypatch.setattr(facility_registry.process, "extractOne", other_worker_wins)
+    fid = facility_registry.resolve(db, "Canmore General Hospital")
+    assert fid == db.get(FacilityAlias, "canmore general hospital").facility_id
+    assert db.query(Facility).filter(Facility.name == "Canmore General Hospital").count() == 1
+    db.close()
+
+
+def test_snapshot_names_are_resolved_once_per_version(monkeypatch):
+    import asyncio
+
+    from app.endpoints import recommend
+    from app.services import ahs_cache
+
+    snapshot = {"version": "v1", "fetched_at": 0, "data": [{"name": "Foothills Medical Centre", "region": "Calgary"}]}
+
+    async def get_snapshot(fetch):
+        return snapshot
+
+    calls = []
+    monkeypatch.setattr(ahs_cache, "get_snapshot", get_snapshot)
+    monkeypatch.setattr(recommend, "_resolved", {"version": None})
+    monkeypatch.setattr(facility_registry, "resolve_names", lambda names, regions=None: calls.append(names))
+
+    async def requests():
+        for _ in range(3):
+            await recommend.fetch_live_hospitals()
+        snapshot["version"] = "v2"
+        await recommend.fetch_live_hospitals()
+
+    asyncio.run(requests())
+    assert calls == [["Foothills Medical Centre"], ["Foothills Medical Centre"]]
@@ -0,0 +1,94 @@
+# tests/test_geocoding.py
+import asyncio
+import time
+
+from app.services.geocoding import GeocodeCache, GeocodingPipeline, TokenBucket, normalize_address
+
+
+class FakeGeocoder:
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+
+    def __call__(self, query):
+        self.calls.append(query)
+        time.sleep(0.01)  # blocking, like the real geocoder
+        return self.answers.get(query)
+
+
+def test_results_cached_on_disk_and_reused(tmp_path):
+    geocoder = FakeGeocoder({"1403 29 St NW, Calgary": (51.065, -114.13)})
+    items = [(2, "1403 29 St NW, Calgary"), (99, "Nowhere Rd")]
+    saved = []
+
+    async def save(item_id, coords):
+        saved.append(item_id)
+
+    cache = GeocodeCache(tmp_path / "geo.sqlite3")
+    pipeline = GeocodingPipeline(geocoder, cache, TokenBucket(rate=1000, capacity=10))
+    results = asyncio.run(pipeline.run(items, on_result=save))
+    assert results == {2: (51.065, -114.13)}
+    assert saved == [2]
+    cache.close()
+
+    # A new process: both the hit and the miss come from the on-disk cache
+    again = GeocodingPipeline(geocoder, GeocodeCache(tmp_path / "geo.sqlite3"), TokenBucket(rate=1000, capacity=10))
+    asyncio.run(again.run([(2, "1403  29 st nw , calgary"), (99, "Nowhere Rd")]))
+    assert len(geocoder.calls) == 2
+    assert again.stats["cache_hits"] == 2
+
+
+def test_token_bucket_limits_rate(tmp_path):
+    geocoder = FakeGeocoder({})
+    pipeline = GeocodingPipeline(geocoder, GeocodeCache(":memory:"), TokenBucket(rate=20, capacity=1), concurrency=4)
+    started = time.monotonic()
+    asyncio.run(pipeline.run([(i, f"address {i}") for i in range(6)]))
+    # 1 banked token + 5 refills at 20/s
+    assert time.monotonic() - started >= 5 / 20 * 0.9
+    assert len(geocoder.calls) == 6
+
+
+def test_normalize_address():
+    assert normalize_address(" 1403 29 St. NW ,Calgary ") == "1403 29 st. nw, calgary"
+
+
+def test_nominatim_goes_through_the_shared_client(monkeypatch):
+    import httpx
+
+    from app.services import geocoding, http_client
+
+    requested = []
+
+    class FakeSharedClient:
+        async def get(self, url, **kwargs):
+            requested.append(url)
+            return httpx.Response(200, json=[{"lat": "51.065", "lon": "-114.13", "display_name": "Foothills"}])
+
+    monkeypatch.setattr(http_client, "get_http_client", lambda: FakeSharedClient())
+    pipeline = GeocodingPipeline(geocoding.nominatim_geocoder(), GeocodeCache(":memory:"),
+                                 TokenBucket(rate=1000, capacity=10))
+    results = asyncio.run(pipeline.run([(2, "1403 29 St NW, Calgary")]))
+    assert results == {2: (51.065, -114.13)}
+    assert len(requested) == 1 and "nominatim" in requested[0]
+
+
+def test_startup_geocode_runs_in_one_worker(monkeypatch):
+    import pytest
+    fakeredis = pytest.importorskip("fakeredis")
+
+    from app import startup_tasks
+
+    monkeypatch.setattr(startup_tasks, "_redis", fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer()))
+    runs = []
+
+    async def geocode_pending(geocoder=None, cache=None):
+        runs.append(1)
+        await asyncio.sleep(0.05)
+
+    monkeypatch.setattr(startup_tasks, "_geocode_pending", geocode_pending)
+
+    async def four_workers():
+        await asyncio.gather(*(startup_tasks.geocode_hospitals_on_startup() for _ in range(4)))
+
+    asyncio.run(four_workers())
+    assert runs == [1]
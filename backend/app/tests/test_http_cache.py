@@ -0,0 +1,104 @@
+# tests/test_http_cache.py
+import json
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.services import http_cache, wire_format
+
+RECORDS = [{"region": "Calgary", "name": f"Facility {i}", "wait_time": "1 hr 5 min"} for i in range(50)]
+
+
+def make_client(state):
+    app = FastAPI()
+    bodies = wire_format.SnapshotBodies()
+
+    @app.get("/waits")
+    async def waits(request: Request):
+        def build():
+            state["builds"] += 1
+            return RECORDS
+        return http_cache.snapshot_response(request, bodies, state["version"], "all", build)
+
+    return TestClient(app), bodies
+
+
+def test_etag_and_not_modified():
+    state = {"version": "v1", "builds": 0}
+    client, _ = make_client(state)
+
+    first = client.get("/waits")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and json.loads(first.content) == RECORDS
+    assert first.headers["cache-control"].startswith("public, max-age=")
+    assert first.headers["vary"] == "Accept, Accept-Encoding"
+
+    again = client.get("/waits", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == etag
+
+    # New snapshot: the old tag no longer matches
+    state["version"] = "v2"
+    changed = client.get("/waits", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert state["builds"] == 2  # once per version; the 304 built nothing
+
+
+def test_bodies_are_compressed_once_per_version():
+    state = {"version": "v1", "builds": 0}
+    client, bodies = make_client(state)
+
+    for _ in range(3):
+        response = client.get("/waits", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert json.loads(response.content) == RECORDS  # decompressed by the client
+    plain = client.get("/waits", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["etag"] != response.headers["etag"]  # one tag per coding
+    assert bodies.stats["compressed"] == 1 and state["builds"] == 1
+
+
+def test_unversioned_data_is_not_cacheable():
+    state = {"version": None, "builds": 0}
+    client, _ = make_client(state)
+    response = client.get("/waits")
+    assert response.headers["cache-control"] == "no-cache" and "etag" not in response.headers
+
+
+def test_coding_negotiation():
+    assert wire_format.negotiate_coding(None) == wire_format.IDENTITY
+    assert wire_format.negotiate_coding("gzip, deflate") == wire_format.GZIP
+    assert wire_format.negotiate_coding("gzip;q=0, deflate") == wire_format.IDENTITY
+    assert wire_format.negotiate_coding("*") in (wire_format.GZIP, wire_format.BROTLI)
+    assert http_cache.matching_tag('W/"abc-gzip", "zzz"', '"abc"') == 'W/"abc-gzip"'
+
+
+def test_recommend_tags_the_snapshot_it_served(monkeypatch):
+    import time
+
+    from app.endpoints import recommend
+    from app.services import ahs_cache
+
+    served = {"version": "A", "fetched_at": time.time(), "data": RECORDS}
+
+    async def get_snapshot(fetch):
+        snapshot = dict(served)
+        served.update(version="B")  # a refresh lands right after this request read its snapshot
+        return snapshot
+
+    async def resolved(version, hospitals):
+        pass
+
+    monkeypatch.setattr(ahs_cache, "get_snapshot", get_snapshot)
+    monkeypatch.setattr(recommend, "_resolve_facility_names", resolved)
+    app = FastAPI()
+    app.include_router(recommend.router)
+    client = TestClient(app)
+
+    fmt = wire_format.request_format(Request({"type": "http", "headers": [], "query_string": b""}))
+    response = client.get("/recommend?location=Calgary")
+    assert response.headers["etag"] == http_cache.etag_for("A", "calgary", fmt)
+
+    # Stale data with no version is served, but never cached under a made-up "None-stale" key
+    served.update(version=None, fetched_at=time.time() - recommend.STALE_AFTER - 1)
+    response = client.get("/recommend?location=Calgary")
+    assert response.headers["cache-control"] == "no-cache" and "etag" not in response.headers
@@ -0,0 +1,59 @@
+# tests/test_http_client.py
+import asyncio
+import httpx
+import pytest
+
+from app.services import http_client
+from app.services.http_client import CircuitOpenError, SharedHTTPClient
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    async def instant(_):
+        return None
+    monkeypatch.setattr(http_client.asyncio, "sleep", instant)
+
+
+def _client(handler):
+    return SharedHTTPClient(transport=httpx.MockTransport(handler))
+
+
+def test_retries_transient_errors_then_succeeds():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503 if len(calls) == 1 else 200, json={"ok": True})
+
+    client = _client(handler)
+    assert asyncio.run(client.get_json("https://ahs.example/api")) == {"ok": True}
+    assert len(calls) == 2
+    assert client.stats()["retries"] == 1
+
+
+def test_breaker_opens_after_repeated_failures():
+    def handler(request):
+        raise httpx.ConnectError("boom", request=request)
+
+    client = _client(handler)
+
+    async def run():
+        for _ in range(http_client.BREAKER_FAILURE_THRESHOLD):
+            try:
+                await client.get("https://ahs.example/api")
+            except httpx.HTTPError:
+                pass
+        with pytest.raises(CircuitOpenError):
+            await client.get("https://ahs.example/api")
+
+    asyncio.run(run())
+    assert client.stats()["breakers"]["ahs.example"] == "open"
+
+
+def test_retry_budget_limits_retries():
+    budget = http_client.RetryBudget(ratio=0.5, min_tokens=1)
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
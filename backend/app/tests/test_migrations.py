@@ -0,0 +1,21 @@
+# tests/test_migrations.py
+from sqlalchemy import create_engine, inspect, text
+
+from app import migrate
+
+
+def test_upgrade_applies_once_and_records_versions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mig.db'}")
+    applied = migrate.upgrade(engine)
+    assert applied == [version for version, _ in migrate.discover()]
+    assert applied[0] == "m0001_baseline"
+
+    tables = set(inspect(engine).get_table_names())
+    assert {"triage_audit", "triage_message", "appointments", "facilities", "schema_migrations"} <= tables
+    indexes = {ix["name"] for ix in inspect(engine).get_indexes("triage_audit")}
+    assert "ix_triage_audit_received" in indexes
+    assert "ux_triage_audit_idempotency" in indexes
+
+    assert migrate.upgrade(engine) == []
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM schema_migrations")).scalar() == len(applied)
@@ -0,0 +1,49 @@
+# tests/test_pagination.py
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.endpoints.triage_audit import list_audits
+from app.models.triage import TriageAudit
+from app.services.pagination import decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def audits(db_session):
+    base = datetime(2024, 5, 1, 12, 0, 0)
+    rows = []
+    for i in range(23):
+        # pairs of rows share a timestamp, so the id tiebreak matters
+        rows.append(TriageAudit(received_at=base + timedelta(minutes=i // 2), symptoms=f"case {i}",
+                                recommended_level=["Emergency", "Urgent", "PrimaryCare"][i % 3]))
+    db_session.add_all(rows)
+    db_session.commit()
+    return rows
+
+
+def test_keyset_pages_cover_everything_once(db_session, audits):
+    seen, cursor = [], None
+    while True:
+        page = list_audits(recommended_level=None, cursor=cursor, limit=5, db=db_session)
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    expected = [a.id for a in sorted(audits, key=lambda a: (a.received_at, a.id), reverse=True)]
+    assert seen == expected
+
+
+def test_filter_and_bad_cursor(db_session, audits):
+    page = list_audits(recommended_level="Urgent", cursor=None, limit=50, db=db_session)
+    assert {item["recommended_level"] for item in page["items"]} == {"Urgent"}
+    assert len(page["items"]) == 8 and page["next_cursor"] is None
+
+    with pytest.raises(HTTPException) as exc:
+        list_audits(recommended_level=None, cursor="not-a-cursor", limit=5, db=db_session)
+    assert exc.value.status_code == 400
+
+
+def test_cursor_roundtrip():
+    ts = datetime(2024, 5, 1, 12, 0, 0, 123456)
+    assert decode_cursor(encode_cursor(ts, 42)) == (ts, 42)
@@ -0,0 +1,58 @@
+# tests/test_read_routing.py
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import database
+from app.database import Base, ReadSessionLocal
+from app.models.triage import TriageAudit
+
+
+@pytest.fixture
+def primary_and_replica(tmp_path, monkeypatch):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for e in (primary, replica):
+        Base.metadata.create_all(e)
+    with replica.begin() as conn:
+        conn.execute(text("INSERT INTO triage_audit (received_at, symptoms) VALUES ('2024-05-01', 'from replica')"))
+
+    monkeypatch.setattr(database, "engine", primary)
+    monkeypatch.setattr(database, "replica_engine", replica)
+    monkeypatch.setattr(database, "replica_state", {"healthy": True, "lag_s": None, "checked_at": -1e9,
+                                                    "error": None, "replica_reads": 0, "primary_fallbacks": 0})
+    return primary, replica
+
+
+def _symptoms(db):
+    return [a.symptoms for a in db.query(TriageAudit).all()]
+
+
+def test_reads_go_to_replica_and_writes_to_primary(primary_and_replica, monkeypatch):
+    primary, _ = primary_and_replica
+    monkeypatch.setattr(database, "replica_lag_seconds", lambda conn: 1.0)
+    with ReadSessionLocal() as db:
+        assert _symptoms(db) == ["from replica"]
+        db.add(TriageAudit(received_at=datetime(2024, 5, 2), symptoms="written"))
+        db.commit()
+    with primary.connect() as conn:
+        assert conn.execute(text("SELECT symptoms FROM triage_audit")).scalars().all() == ["written"]
+    assert database.replica_state["replica_reads"] >= 1
+
+
+def test_lagging_or_broken_replica_falls_back_to_primary(primary_and_replica, monkeypatch):
+    monkeypatch.setattr(database, "replica_lag_seconds", lambda conn: database.REPLICA_MAX_LAG_S + 5)
+    with ReadSessionLocal() as db:
+        assert _symptoms(db) == []
+    assert database.replica_state["healthy"] is False
+    assert database.replica_state["primary_fallbacks"] == 1
+
+    def broken(conn):
+        raise RuntimeError("connection refused")
+
+    monkeypatch.setattr(database, "replica_lag_seconds", broken)
+    database.replica_state["checked_at"] = -1e9
+    with ReadSessionLocal() as db:
+        assert _symptoms(db) == []
+    assert "connection refused" in database.replica_state["error"]
@@ -0,0 +1,58 @@
+# tests/test_reco_cache.py
+import asyncio
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.services import reco_cache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(reco_cache, "_redis", fakeredis.FakeAsyncRedis(server=server))
+    monkeypatch.setattr(reco_cache, "_redis_sync", fakeredis.FakeRedis(server=server))
+    reco_cache.clear()
+    yield server
+    reco_cache.clear()
+
+
+def test_same_cell_same_version_computes_once(cache):
+    calls = []
+
+    async def compute(lat, lng):
+        calls.append((lat, lng))
+        return [{"hospital": "Foothills", "score": 42}]
+
+    async def run():
+        a = await reco_cache.get_or_compute("gps", "v1", "all", 51.0447, -114.0719, compute)
+        b = await reco_cache.get_or_compute("gps", "v1", "all", 51.0448, -114.0720, compute)  # same cell
+        return a, b
+
+    a, b = asyncio.run(run())
+    assert a == b and len(calls) == 1
+    # computed at the cell centre, not at the first caller's exact point
+    assert calls[0] != (51.0447, -114.0719)
+
+
+def test_new_version_invalidates(cache):
+    calls = []
+
+    def compute(lat, lng):
+        calls.append(1)
+        return [len(calls)]
+
+    assert reco_cache.get_or_compute_sync("triage", "v1", "Urgent", 51.04, -114.07, compute) == [1]
+    assert reco_cache.get_or_compute_sync("triage", "v1", "Urgent", 51.04, -114.07, compute) == [1]
+    assert reco_cache.get_or_compute_sync("triage", "v2", "Urgent", 51.04, -114.07, compute) == [2]
+    # A different category is its own entry
+    assert reco_cache.get_or_compute_sync("triage", "v2", "Emergency", 51.04, -114.07, compute) == [3]
+
+
+def test_shared_across_workers_via_redis(cache):
+    reco_cache.get_or_compute_sync("triage", "v1", "Urgent", 51.04, -114.07, lambda lat, lng: ["from worker 1"])
+    reco_cache._l1.clear()  # a second worker with an empty L1
+    value = reco_cache.get_or_compute_sync("triage", "v1", "Urgent", 51.04, -114.07,
+                                           lambda lat, lng: ["recomputed"])
+    assert value == ["from worker 1"]
+    assert reco_cache.stats["l2_hits"] >= 1
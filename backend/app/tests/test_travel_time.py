@@ -0,0 +1,36 @@
+# tests/test_travel_time.py
+from app.services import travel_time
+from app.services.travel_time import TravelTimeGrid, build_synthetic_grid
+from app.utils.geo import geohash_encode
+
+FACILITIES = {
+    2: (51.0650, -114.1340),  # Foothills Medical Centre
+    3: (51.0790, -113.9840),  # Peter Lougheed Centre
+}
+CALGARY_BBOX = (50.9, 51.2, -114.3, -113.8)
+
+
+def test_grid_roundtrip_is_memory_mapped(tmp_path):
+    grid = build_synthetic_grid(FACILITIES, CALGARY_BBOX, precision=5)
+    grid.save(tmp_path)
+    loaded = TravelTimeGrid.load(tmp_path)
+    assert loaded.matrix.shape == (len(grid.cells), 2)
+    assert hasattr(loaded.matrix, "filename")  # np.memmap
+    lat, lng = 51.07, -114.13
+    assert loaded.minutes(lat, lng, "2") == grid.minutes(lat, lng, 2)
+    assert geohash_encode(lat, lng, 5) in loaded.cell_index
+
+
+def test_drive_minutes_uses_grid_then_falls_back():
+    travel_time.set_grid(build_synthetic_grid(FACILITIES, CALGARY_BBOX, precision=5))
+    try:
+        # Patient near Foothills: Foothills is the shorter drive
+        near = travel_time.drive_minutes(51.066, -114.13, 2)
+        far = travel_time.drive_minutes(51.066, -114.13, 3)
+        assert near < far
+        # Unknown facility: straight-line estimate from its coordinates
+        est = travel_time.drive_minutes(51.066, -114.13, 99, 51.0, -114.0)
+        assert est is not None and est > 0
+        assert travel_time.drive_minutes(51.066, -114.13, 99) is None
+    finally:
+        travel_time.set_grid(None)
@@ -0,0 +1,75 @@
+# tests/test_triage_batch.py
+from datetime import timedelta
+
+from app.endpoints.triage_logic import triage_logic
+from app.models.triage import TriageAudit, TriageMessage
+from app.models.triage_models import TriageReqModel
+from app.services.triage_batch import iter_payloads, persist_results, score_batch
+
+
+def test_batch_matches_single_path_and_keeps_order():
+    payloads = [
+        {"id": "a", "symptoms": "sore throat and mild fever", "age": 30},
+        {"id": "b", "symptoms": "crushing chest pain", "age": 70, "known_conditions": ["diabetes"]},
+        {"id": "c", "symptoms": "hello"},
+        {"id": "d", "symptoms": "   "},
+        {"id": "e", "symptoms": "rash on arms", "age": "not a number"},
+        {"_error": "Invalid JSON: boom"},
+    ]
+    results = score_batch(payloads)
+    assert [r.get("id") for r in results] == ["a", "b", "c", "d", "e", None]
+
+    single = triage_logic(TriageReqModel(symptoms="sore throat and mild fever", age=30))
+    assert results[0]["recommended_level"] == single.recommended_level
+    assert results[0]["score"] == single.score
+    assert results[1]["recommended_level"] == "Emergency" and results[1]["score"] == 100
+    assert results[1]["meta"]["model_used"] == "Clinical Safety Override"
+    assert results[2]["meta"] == {"type": "greeting"}
+    assert results[3] == {"response": "No symptoms provided", "id": "d"}
+    assert results[4]["recommended_level"] == "Error"
+    assert results[5]["recommended_level"] == "Error"
+    assert "_audit" in results[0] and "_audit" not in results[2]
+
+
+def test_csv_parsing_and_persistence(db_session):
+    lines = ["symptoms,age,known_conditions\n", "back pain after lifting,52,asthma; copd\n", "ear ache,,\n"]
+    payloads = list(iter_payloads(lines, "csv"))
+    assert payloads[0] == {"symptoms": "back pain after lifting", "age": 52, "known_conditions": ["asthma", "copd"]}
+    assert payloads[1] == {"symptoms": "ear ache"}
+
+    results = score_batch(payloads)
+    assert persist_results(db_session, payloads, results) == 2
+    audits = db_session.query(TriageAudit).order_by(TriageAudit.id).all()
+    assert [a.symptoms for a in audits] == ["back pain after lifting", "ear ache"]
+    assert db_session.query(TriageMessage).filter(TriageMessage.audit_id == audits[0].id).count() == 2
+
+
+
+def test_resent_batch_is_not_persisted_twice(db_session):
+    payloads = [{"symptoms": "ear ache"}, {"symptoms": "ear ache"}, {"symptoms": "hello"}, {"symptoms": "back pain"}]
+    assert persist_results(db_session, payloads[:2], score_batch(payloads[:2]), batch_id="b1") == 2
+    # The retry is scored again (new received_at) and chunked differently
+    retry = score_batch(payloads)
+    retry[0]["_audit"]["received_at"] += timedelta(minutes=5)
+    assert persist_results(db_session, payloads, retry, batch_id="b1") == 1
+    assert persist_results(db_session, payloads[3:], score_batch(payloads[3:]), batch_id="b1", offset=3) == 0
+    assert db_session.query(TriageAudit).count() == 3
+    assert db_session.query(TriageMessage).count() == 6
+
+def test_batch_cleanup_runs_even_if_the_body_never_started(tmp_path):
+    import asyncio
+
+    from app.endpoints import triage as triage_endpoint
+    from app.services.admission import AdmissionController
+
+    async def run():
+        controller = AdmissionController("batch", limit=1, queue_size=0, max_wait=0)
+        ticket = await controller.acquire()
+        path = tmp_path / "triage_batch_spool"
+        path.write_text('{"symptoms": "cough"}\n')
+        await triage_endpoint._finish_batch(ticket, str(path))  # client disconnected before streaming
+        await triage_endpoint._finish_batch(ticket, str(path))  # idempotent
+        return path.exists(), controller.snapshot()["in_flight"]
+
+    exists, in_flight = asyncio.run(run())
+    assert not exists and in_flight == 0
@@ -0,0 +1,69 @@
+# tests/test_triage_stream.py
+import asyncio
+import contextlib
+
+import pytest
+
+from app.models.triage import TriageAudit, TriageMessage
+from app.services import audit_spool, triage_service
+
+HOSPITALS = [{"name": "Foothills Medical Centre", "category": "Emergency", "wait_time": "2 hr 10 min",
+              "distance_km": 3.2, "note": None}]
+
+
+@pytest.fixture(autouse=True)
+def wal(tmp_path, monkeypatch):
+    log = audit_spool.SegmentLog(str(tmp_path / "audit_wal"))
+    monkeypatch.setattr(audit_spool, "wal", log)
+    yield log
+    log.close()
+
+
+def _collect(payload, db):
+    async def run():
+        return [frame async for frame in triage_service.triage_events(payload, db)]
+    return asyncio.run(run())
+
+
+def test_frames_arrive_in_stages(db_session, monkeypatch, wal):
+    monkeypatch.setattr(triage_service, "_get_hospital_recommendations", lambda level, lat, lng: HOSPITALS)
+    frames = _collect({"symptoms": "crushing chest pain", "age": 70}, db_session)
+
+    assert [f["type"] for f in frames] == ["triage", "hospitals", "ack"]
+    first = frames[0]
+    assert first["recommended_level"] == "Emergency" and first["final"] is False
+    assert "Foothills" not in first["response"]
+    assert "Foothills" in frames[1]["response"]
+
+    assert wal.drain(session_factory=lambda: contextlib.nullcontext(db_session)) == 1
+    audit = db_session.query(TriageAudit).filter(TriageAudit.idempotency_key == frames[2]["audit_key"]).one()
+    assert audit.recommended_level == "Emergency"
+    assert db_session.query(TriageMessage).filter(TriageMessage.audit_id == audit.id).count() == 2
+
+
+def test_greeting_is_a_single_final_frame(db_session):
+    frames = _collect({"symptoms": "hello"}, db_session)
+    assert len(frames) == 1 and frames[0]["final"] is True
+
+
+def test_process_triage_still_returns_one_combined_result(db_session, monkeypatch):
+    monkeypatch.setattr(triage_service, "_get_hospital_recommendations", lambda level, lat, lng: HOSPITALS)
+    result = asyncio.run(triage_service.process_triage({"symptoms": "crushing chest pain"}, db_session))
+    assert set(result) == {"response", "recommended_level", "score", "reasons", "suggested_action",
+                           "hospital_recommendation", "received_at", "meta"}
+    assert result["hospital_recommendation"] == HOSPITALS
+    assert result["meta"]["human_like"] is True
+
+
+def test_ranking_uses_forecasts_and_puts_unknown_waits_last(monkeypatch):
+    from app.services import wait_forecast
+    near = {"lat": 51.05, "lng": -114.07}
+    hospitals = [
+        {"name": "Unknown Wait", "category": "Emergency", "wait_time": "Not available", **near},
+        {"name": "Forecast Only", "category": "Emergency", "wait_time": None, **near},
+        {"name": "Long Live Wait", "category": "Emergency", "wait_time": "5 hr", **near},
+    ]
+    monkeypatch.setattr(wait_forecast, "_forecasts", {"Forecast Only": {"predicted_wait_minutes": 45}})
+    ranked = triage_service._rank_hospitals("Emergency", (51.05, -114.07), hospitals)
+    assert [h["name"] for h in ranked] == ["Forecast Only", "Long Live Wait", "Unknown Wait"]
+    assert ranked[0]["wait_source"] == "forecast" and ranked[0]["wait_minutes"] == 45
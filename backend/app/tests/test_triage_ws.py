@@ -0,0 +1,51 @@
+# tests/test_triage_ws.py
+import asyncio
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.endpoints import triage_ws
+
+
+async def fake_triage(payload, db):
+    await asyncio.sleep(payload.get("delay", 0))
+    return {"response": f"done {payload['symptoms']}"}
+
+
+def _client(monkeypatch):
+    monkeypatch.setattr(triage_ws, "process_triage", fake_triage)
+    app = FastAPI()
+    app.add_api_websocket_route("/ws/triage", triage_ws.ws_triage)
+    return TestClient(app)
+
+
+def test_unordered_delivery_returns_fast_requests_first(monkeypatch):
+    with _client(monkeypatch).websocket_connect("/ws/triage?delivery=unordered") as ws:
+        ws.send_text(json.dumps({"id": "slow", "symptoms": "a", "delay": 0.3}))
+        ws.send_text(json.dumps({"id": "fast", "symptoms": "b"}))
+        ws.send_text(json.dumps({"type": "ping", "id": "hb"}))
+        replies = [json.loads(ws.receive_text()) for _ in range(3)]
+    assert [r["id"] for r in replies] == ["fast", "hb", "slow"]
+    assert replies[1]["type"] == "pong"
+
+
+def test_ordered_delivery_keeps_request_order(monkeypatch):
+    with _client(monkeypatch).websocket_connect("/ws/triage") as ws:
+        ws.send_text(json.dumps({"id": 1, "symptoms": "a", "delay": 0.2}))
+        ws.send_text(json.dumps({"id": 2, "symptoms": "b"}))
+        ws.send_text("not json")
+        replies = [json.loads(ws.receive_text()) for _ in range(3)]
+    assert [r.get("id") for r in replies] == [1, 2, None]
+    assert replies[0]["response"] == "done a"
+    assert replies[2] == {"response": "Invalid request format"}
+
+
+def test_requests_over_the_limit_are_rejected(monkeypatch):
+    monkeypatch.setattr(triage_ws, "MAX_IN_FLIGHT", 1)
+    with _client(monkeypatch).websocket_connect("/ws/triage?delivery=unordered") as ws:
+        ws.send_text(json.dumps({"id": 1, "symptoms": "a", "delay": 0.2}))
+        ws.send_text(json.dumps({"id": 2, "symptoms": "b"}))
+        replies = [json.loads(ws.receive_text()) for _ in range(2)]
+    assert replies[0] == {"type": "error", "error": "busy", "detail": "Too many requests in flight (limit 1)", "id": 2}
+    assert replies[1]["id"] == 1
@@ -0,0 +1,47 @@
+# tests/test_update_hospital_data.py
+import asyncio
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.services import hospital_service
+from app.services import update_hospital_data as updater
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(hospital_service, "redis_client", fakeredis.FakeRedis(server=server, decode_responses=True))
+    return server
+
+
+def _hospitals(*names):
+    return [{"name": n, "category": "Emergency", "wait_time": "1 hr", "lat": None, "lng": None} for n in names]
+
+
+def test_snapshot_swap_drops_removed_hospitals(server):
+    client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+
+    async def run():
+        v1 = await updater.update_redis(_hospitals("A", "B", "C"), client=client)
+        v2 = await updater.update_redis(_hospitals("A", "C"), client=client)
+        ttl_old = await client.ttl(hospital_service.hospitals_version_key(v1))
+        return v1, v2, ttl_old
+
+    v1, v2, ttl_old = asyncio.run(run())
+    assert v1 != v2
+    assert 0 < ttl_old <= updater.OLD_VERSION_TTL
+    assert hospital_service.get_hospitals_version() == v2
+    assert [h["name"] for h in hospital_service.get_all_hospitals_from_redis()] == ["A", "C"]
+
+
+def test_unchanged_snapshot_is_not_rewritten(server):
+    client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+
+    async def run():
+        first = await updater.update_redis(_hospitals("A"), client=client)
+        second = await updater.update_redis(_hospitals("A"), client=client)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first is not None and second is None
@@ -0,0 +1,63 @@
+# tests/test_wait_forecast.py
+import math
+import random
+
+from app.endpoints import recommend
+from app.services import wait_forecast
+from app.services.wait_forecast import WaitForecastModel, backtest, compute_forecasts
+
+START_TS = 1_699_833_600  # Monday 00:00 UTC
+
+
+def _synthetic_series(weeks=5, step=900, seed=7):
+    """Daily seasonal pattern + slowly decaying shocks, for two hospitals."""
+    rng = random.Random(seed)
+    samples, shock = [], {"A": 0.0, "B": 0.0}
+    for ts in range(START_TS, START_TS + weeks * 7 * 86400, step):
+        hour = (ts // 3600) % 24
+        for hospital, level in (("A", 90), ("B", 40)):
+            shock[hospital] = 0.97 * shock[hospital] + rng.gauss(0, 6)
+            minutes = level + 30 * math.sin(hour / 24 * 2 * math.pi) + shock[hospital]
+            samples.append((hospital, ts, max(0, int(minutes))))
+    return samples
+
+
+def test_model_learns_seasonality_and_persistence():
+    samples = _synthetic_series()
+    model = WaitForecastModel.fit(samples)
+    assert 0.5 < model.phi < 1.0
+    # With no recent observation, the forecast is the seasonal baseline
+    assert abs(model.predict("A", START_TS + 6 * 3600) - model.baseline("A", START_TS + 6 * 3600)) < 1e-9
+    assert model.predict("unknown", START_TS) is None
+
+
+def test_backtest_beats_seasonal_baseline():
+    report = backtest(_synthetic_series(), horizon_sec=3600, folds=2)
+    assert len(report["folds"]) == 2
+    for fold in report["folds"]:
+        assert fold["mae_model"] < fold["mae_seasonal"]
+
+
+def test_fallback_uses_lowest_forecast_in_region(monkeypatch):
+    samples = _synthetic_series(weeks=2)
+    info = {"A": {"region": "Calgary"}, "B": {"region": "Edmonton"}}
+    monkeypatch.setattr(wait_forecast, "_forecasts", compute_forecasts(samples, now=samples[-1][1], hospital_info=info))
+
+    result = recommend.ai_predict_fallback("calgary")
+    assert result["hospital"] == "A"
+    assert result["predicted_wait_time"] == wait_forecast.get_forecast("A")["predicted_wait_minutes"]
+
+
+def test_wait_without_a_number_uses_the_forecast_or_is_unknown(monkeypatch):
+    monkeypatch.setattr(wait_forecast, "_forecasts", {"A": {"hospital": "A", "predicted_wait_minutes": 95}})
+    assert wait_forecast.effective_wait_minutes("A", "Not available", stale=False) == (95, "forecast")
+    assert wait_forecast.effective_wait_minutes("B", "Not available", stale=False) == (None, "unknown")
+    assert wait_forecast.effective_wait_minutes("B", "1 hr 5 min", stale=False) == (65, "live")
+
+    # An unknown wait is never the best option (it used to parse as 0 minutes)
+    hospitals = [{"name": "B", "region": "Calgary", "wait_time": "Not available"},
+                 {"name": "C", "region": "Calgary", "wait_time": "2 hr"}]
+    result = recommend.recommend_in_region(hospitals, stale=False, location="Calgary")
+    assert result["hospital"] == "C" and result["status"] == "✅ Recommended"
+    only_unknown = recommend.recommend_in_region(hospitals[:1], stale=False, location="Calgary")
+    assert only_unknown["status"] == "❔ Wait time unavailable"
@@ -0,0 +1,25 @@
+# tests/test_wait_history.py
+from app.services.wait_history import get_wait_history, record_samples
+
+BASE_TS = 1_700_000_400  # aligned to an hour boundary + 400s
+
+
+def test_history_is_downsampled_per_bucket(db_session):
+    hourly_start = BASE_TS - BASE_TS % 3600
+    for i in range(24):  # two hours of 5-minute samples
+        record_samples(
+            db_session,
+            [
+                {"name": "Foothills Medical Centre", "category": "Emergency", "wait_time": f"{i} min"},
+                {"name": "Other", "category": "Emergency", "wait_time": "Not available"},
+            ],
+            observed_ts=hourly_start + i * 300,
+        )
+
+    points = get_wait_history(db_session, "Foothills Medical Centre", hourly_start, hourly_start + 7200, 3600)
+
+    assert [p["ts"] for p in points] == [hourly_start, hourly_start + 3600]
+    assert points[0]["samples"] == 12
+    assert points[0]["min_minutes"] == 0 and points[0]["max_minutes"] == 11
+    assert points[1]["avg_minutes"] == 17.5
+    assert get_wait_history(db_session, "Other", hourly_start, hourly_start + 7200, 3600) == []
@@ -0,0 +1,92 @@
+# tests/test_wire_format.py
+import asyncio
+import json
+
+import pytest
+
+msgpack = pytest.importorskip("msgpack")
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.services import wire_format, ws_fanout
+
+RECORDS = [
+    {"region": "Calgary", "category": "Emergency", "name": "Foothills", "wait_time": "1 hr 5 min",
+     "lat": 51.065, "lng": -114.133},
+    {"region": "Edmonton", "category": "Emergency", "name": "Royal Alexandra", "wait_time": "3 hr",
+     "lat": 53.557, "lng": -113.497},
+]
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+
+def test_negotiation():
+    assert wire_format.negotiate(None) == wire_format.JSON
+    assert wire_format.negotiate("application/json, */*") == wire_format.JSON
+    assert wire_format.negotiate("application/x-msgpack;q=0.9, application/json;q=0.5") == wire_format.MSGPACK
+    assert wire_format.negotiate("application/json", requested="msgpack") == wire_format.MSGPACK
+
+
+def test_responses_follow_the_accept_header():
+    app = FastAPI()
+
+    @app.get("/data")
+    async def data(request: Request):
+        return wire_format.respond(request, RECORDS)
+
+    client = TestClient(app)
+    as_json = client.get("/data")
+    as_msgpack = client.get("/data", headers={"Accept": "application/msgpack"})
+
+    assert as_json.headers["content-type"] == "application/json"
+    assert json.loads(as_json.content) == RECORDS
+    assert as_msgpack.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(as_msgpack.content) == RECORDS
+    assert len(as_msgpack.content) < len(as_json.content)
+    assert as_json.headers["vary"] == "Accept"
+
+
+def test_snapshot_bodies_are_encoded_once_per_version():
+    bodies = wire_format.SnapshotBodies()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return RECORDS
+
+    first = bodies.get("v1", "all", wire_format.JSON, build)
+    assert bodies.get("v1", "all", wire_format.JSON, build) is first
+    bodies.get("v1", "all", wire_format.MSGPACK, build)
+    bodies.get("v2", "all", wire_format.JSON, build)  # new snapshot: re-encoded
+    bodies.get(None, "all", wire_format.JSON, build)  # unversioned: never cached
+    bodies.get(None, "all", wire_format.JSON, build)
+    assert len(builds) == 5 and bodies.stats == {"hits": 1, "encoded": 3, "compressed": 0}
+
+
+def test_hub_sends_msgpack_clients_binary_frames():
+    hub = ws_fanout.LocalHub()
+    text_a, text_b, binary_a, binary_b = FakeSocket(), FakeSocket(), FakeSocket(), FakeSocket()
+    hub.add(text_a)
+    hub.add(text_b)
+    hub.add(binary_a, fmt=wire_format.MSGPACK)
+    hub.add(binary_b, fmt=wire_format.MSGPACK)
+
+    asyncio.run(hub.broadcast("v1", json.dumps(RECORDS)))
+    assert json.loads(text_a.sent[0]) == RECORDS
+    assert isinstance(binary_a.sent[0], bytes) and msgpack.unpackb(binary_a.sent[0]) == RECORDS
+    assert binary_a.sent[0] is binary_b.sent[0]
+    assert hub.stats["frames_encoded"] == 1  # the JSON frame is relayed as published
+
+    # A subscription keeps the socket's encoding
+    hub.subscribe(binary_a, None)
+    assert hub.encoding_of(binary_a) == wire_format.MSGPACK
@@ -0,0 +1,128 @@
+# tests/test_ws_fanout.py
+import asyncio
+import json
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.services import ws_fanout
+from app.services.ws_filters import parse_filter
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+
+@pytest.fixture
+def shared_redis(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(ws_fanout, "_redis", fakeredis.FakeAsyncRedis(server=server))
+    monkeypatch.setattr(ws_fanout, "hub", ws_fanout.LocalHub())
+    return server
+
+
+def test_only_one_worker_holds_the_publisher_lease(shared_redis, monkeypatch):
+    async def run():
+        first = await ws_fanout._hold_lease()
+        renewed = await ws_fanout._hold_lease()
+        monkeypatch.setattr(ws_fanout, "_token", "other-worker")
+        other = await ws_fanout._hold_lease()
+        return first, renewed, other
+
+    assert asyncio.run(run()) == (True, True, False)
+
+
+def test_published_frame_is_relayed_once_per_version(shared_redis):
+    records = [{"region": "Calgary", "category": "Emergency", "name": "Foothills", "wait_time": "1 hr", "note": None}]
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        return "v1", records
+
+    async def run():
+        sockets = [FakeSocket() for _ in range(3)]
+        for ws in sockets:
+            ws_fanout.hub.add(ws)
+        relay = asyncio.create_task(ws_fanout.relay_loop())
+        await asyncio.sleep(0.05)  # subscribed
+        version = await ws_fanout.publish_once(fetch)
+        again = await ws_fanout.publish_once(fetch, version)  # unchanged snapshot: nothing published
+        await asyncio.sleep(0.1)
+        relay.cancel()
+        return sockets, version, again
+
+    sockets, version, again = asyncio.run(run())
+    assert version == again == "v1" and len(fetches) == 2
+    assert all(len(ws.sent) == 1 for ws in sockets)
+    assert json.loads(sockets[0].sent[0]) == records
+    # encoded once, the same string object goes to every socket
+    assert sockets[0].sent[0] is sockets[1].sent[0] is sockets[2].sent[0]
+
+
+def test_late_joiners_get_the_last_frame_from_redis(shared_redis):
+    async def fetch():
+        return "v7", [{"name": "Rockyview"}]
+
+    async def run():
+        await ws_fanout.publish_once(fetch)
+        ws_fanout.hub = ws_fanout.LocalHub()  # a different worker, nothing in memory yet
+        return await ws_fanout.hub.latest_frame()
+
+    assert json.loads(asyncio.run(run())) == [{"name": "Rockyview"}]
+
+
+def test_each_distinct_filter_is_encoded_once(shared_redis):
+    records = [
+        {"region": "Calgary", "category": "Emergency", "name": "Foothills", "lat": 51.065, "lng": -114.133},
+        {"region": "Calgary", "category": "Urgent", "name": "Sheldon Chumir", "lat": 51.043, "lng": -114.080},
+        {"region": "Edmonton", "category": "Emergency", "name": "Royal Alexandra", "lat": 53.557, "lng": -113.497},
+    ]
+    hub = ws_fanout.hub
+    everything, calgary_a, calgary_b, near = FakeSocket(), FakeSocket(), FakeSocket(), FakeSocket()
+    hub.add(everything)
+    for ws in (calgary_a, calgary_b):
+        hub.add(ws, parse_filter({"region": "Calgary", "category": "Emergency"}))
+    hub.add(near, parse_filter({"near": {"lat": 51.045, "lng": -114.06, "radius_km": 5}}))
+
+    asyncio.run(hub.broadcast("v1", json.dumps(records)))
+    assert len(json.loads(everything.sent[0])) == 3
+    assert [r["name"] for r in json.loads(calgary_a.sent[0])] == ["Foothills"]
+    assert calgary_a.sent[0] is calgary_b.sent[0]
+    assert [r["name"] for r in json.loads(near.sent[0])] == ["Sheldon Chumir"]
+    assert hub.stats["frames_encoded"] == 2  # two distinct filters, four clients
+
+
+def test_filter_parsing():
+    assert parse_filter({"type": "subscribe"}) is None
+    assert parse_filter({"region": " Calgary "}) == parse_filter({"region": "Calgary", "bbox": None})
+    with pytest.raises(ValueError):
+        parse_filter({"bbox": [52, -113, 51, -114]})
+    with pytest.raises(ValueError):
+        parse_filter({"near": {"lat": 51, "lng": -114, "radius_km": 5000}})
+
+
+@pytest.mark.parametrize("message", [
+    {"bbox": [None, 1, 2, 3]},
+    {"bbox": ["a", 1, 2, 3]},
+    {"bbox": [float("nan"), 1, 2, 3]},
+    {"region": 5},
+    {"category": ["Emergency"]},
+    {"near": [51, -114]},
+    {"near": {"lat": None, "lng": -114}},
+    {"near": {"lat": True, "lng": -114}},
+])
+def test_malformed_filters_are_value_errors(message):
+    with pytest.raises(ValueError):
+        parse_filter(message)
+
+
+def test_malformed_filter_gets_an_error_frame_not_a_dead_socket():
+    ws = FakeSocket()
+    asyncio.run(ws_fanout.handle_control(ws, {"type": "subscribe", "region": 5}))
+    assert [json.loads(f)["error"] for f in ws.sent] == ["invalid_filter"]
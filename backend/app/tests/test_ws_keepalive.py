@@ -0,0 +1,49 @@
+# tests/test_ws_keepalive.py
+import asyncio
+import json
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from app.services import ws_keepalive
+
+
+class FakeSocket:
+    """Sends `incoming`, then stays silent until `idle` seconds have passed and disconnects."""
+
+    def __init__(self, query="", idle=0.2, incoming=()):
+        self.query_params = dict(p.split("=", 1) for p in query.split("&") if p)
+        self.idle = idle
+        self.incoming = list(incoming)
+        self.sent = []
+        self.deadline = None
+
+    async def receive_text(self):
+        if self.incoming:
+            return self.incoming.pop(0)
+        loop = asyncio.get_running_loop()
+        self.deadline = self.deadline or loop.time() + self.idle
+        await asyncio.sleep(max(0.0, self.deadline - loop.time()))
+        raise WebSocketDisconnect()
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+
+def _hold(ws):
+    with pytest.raises(WebSocketDisconnect):
+        asyncio.run(ws_keepalive.hold_open(ws, interval=0.05))
+    return [m["type"] for m in ws.sent]
+
+
+def test_plain_client_gets_no_unsolicited_frames():
+    assert _hold(FakeSocket()) == []
+
+
+def test_heartbeat_query_opts_in_to_pings():
+    assert "ping" in _hold(FakeSocket(query="heartbeat=1"))
+
+
+def test_client_ping_opts_in_to_pings():
+    sent = _hold(FakeSocket(incoming=[json.dumps({"type": "ping", "id": 1})]))
+    assert sent[0] == "pong" and "ping" in sent[1:]
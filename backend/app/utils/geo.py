@@ -0,0 +1,63 @@
+# app/utils/geo.py
+"""Small geo helpers shared by ranking, caching and subscriptions (no extra deps)."""
+from math import radians, cos, sin, asin, sqrt
+from typing import Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32_INDEX = {c: i for i, c in enumerate(_BASE32)}
+
+
+def geohash_encode(lat: float, lng: float, precision: int = 6) -> str:
+    """Standard geohash (precision 5 ≈ 4.9 km cells, 6 ≈ 1.2 × 0.6 km)."""
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    chars, bits, ch, even = [], 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch, lng_lo = (ch << 1) | 1, mid
+            else:
+                ch, lng_hi = ch << 1, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch, lat_lo = (ch << 1) | 1, mid
+            else:
+                ch, lat_hi = ch << 1, mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(chars)
+
+
+def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """Return (lat_min, lat_max, lng_min, lng_max) of a geohash cell."""
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    even = True
+    for c in geohash:
+        value = _BASE32_INDEX[c]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                lng_lo, lng_hi = (mid, lng_hi) if bit else (lng_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return lat_lo, lat_hi, lng_lo, lng_hi
+
+
+def geohash_center(geohash: str) -> Tuple[float, float]:
+    lat_lo, lat_hi, lng_lo, lng_hi = geohash_bounds(geohash)
+    return (lat_lo + lat_hi) / 2, (lng_lo + lng_hi) / 2
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> float:
+    """Great-circle distance (km) between two lat/lng points."""
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
+    return 6371 * 2 * asin(sqrt(a))
@@ -0,0 +1,26 @@
+# app/utils/pseudonym.py
+"""Keyed pseudonyms for patient identifiers (appointments.patient_id never holds a raw name)."""
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Config
+# ---------------------------
+# Without the key a pseudonym can't be tied back to a name by hashing guesses.
+# If it is unset, a random per-process key keeps names unrecoverable, but the
+# same patient then gets a different ID after each restart.
+_KEY = os.getenv("PATIENT_ID_KEY", "").encode("utf-8")
+if not _KEY:
+    logger.warning("⚠️ PATIENT_ID_KEY is not set; patient pseudonyms will not be stable across restarts")
+    _KEY = secrets.token_bytes(32)
+
+
+def patient_pseudonym(name: str) -> str:
+    """HMAC-SHA256 of the normalized name: 64 hex chars, same name -> same ID."""
+    normalized = " ".join((name or "").lower().split())
+    return hmac.new(_KEY, normalized.encode("utf-8"), hashlib.sha256).hexdigest()
@@ -0,0 +1,27 @@
+# app/utils/wait_time.py
+"""Parsing of AHS wait-time strings (shared by ranking, history and forecasts)."""
+
+
+def parse_wait_time(wait_str: str) -> int:
+    """Convert wait time string like '2 hr 30 min' to total minutes."""
+    if not wait_str:
+        return 0
+    wait_str = wait_str.lower()
+    hours, minutes = 0, 0
+    if "hr" in wait_str:
+        parts = wait_str.split("hr")
+        try:
+            hours = int(parts[0].strip())
+        except ValueError:
+            hours = 0
+        if "min" in parts[1]:
+            try:
+                minutes = int(parts[1].replace("min", "").strip())
+            except ValueError:
+                minutes = 0
+    elif "min" in wait_str:
+        try:
+            minutes = int(wait_str.replace("min", "").strip())
+        except ValueError:
+            minutes = 0
+    return hours * 60 + minutes
@@ -0,0 +1,45 @@
+# scripts/backtest_wait_forecast.py
+"""
+Offline backtest of the wait-time forecaster against recorded history.
+
+    python -m scripts.backtest_wait_forecast --days 56 --horizon 60 --folds 4
+    python -m scripts.backtest_wait_forecast --csv samples.csv   # hospital,observed_ts,wait_minutes
+"""
+import argparse
+import csv
+import json
+import time
+
+from app.services.wait_forecast import backtest, load_samples
+
+
+def load_csv(path):
+    with open(path, newline="") as f:
+        return [(r["hospital"], int(r["observed_ts"]), int(r["wait_minutes"])) for r in csv.DictReader(f)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of wait-time forecasts")
+    parser.add_argument("--csv", help="Read samples from a CSV export instead of the database")
+    parser.add_argument("--days", type=int, default=56, help="History window to load from the database")
+    parser.add_argument("--horizon", type=int, default=60, help="Forecast horizon in minutes")
+    parser.add_argument("--folds", type=int, default=4, help="Number of weekly test folds")
+    args = parser.parse_args()
+
+    if args.csv:
+        samples = load_csv(args.csv)
+    else:
+        from app.database import SessionLocal
+        db = SessionLocal()
+        try:
+            samples = load_samples(db, int(time.time()) - args.days * 86400)
+        finally:
+            db.close()
+
+    print(f"📊 Backtesting on {len(samples)} samples")
+    report = backtest(samples, horizon_sec=args.horizon * 60, folds=args.folds)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# scripts/bench_audit_wal.py
+"""
+Latency of a durable triage audit write through the local WAL.
+
+    python -m scripts.bench_audit_wal                         # 2,000 writes, 64 concurrent
+    python -m scripts.bench_audit_wal --writes 5000 --concurrency 256 --dir /mnt/ssd/wal
+
+Runs the same workload with group commit (AUDIT_WAL_GROUP_COMMIT_MS) and with
+one fsync per record (max batch 1), reporting per-write latency and fsyncs.
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from app.services import audit_spool
+
+TRIAGE = {"recommended_level": "UrgentCare", "score": 4, "reasons": ["fever", "persistent cough"],
+          "suggested_action": "Visit an urgent care centre today", "meta": {"source": "nlp"}}
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def run(log: audit_spool.SegmentLog, writes: int, concurrency: int) -> list:
+    latencies = []
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        record = audit_spool.record_for({"age": 40}, f"fever and cough {i}", datetime.utcnow(), TRIAGE, [],
+                                        "Please visit an urgent care centre today.")
+        async with gate:
+            start = time.perf_counter()
+            await asyncio.wrap_future(log.submit(record))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one(i) for i in range(writes)))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark audit WAL writes")
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--dir", help="Directory for the segments (default: a temp dir)")
+    args = parser.parse_args()
+
+    print(f"{'mode':<16}{'p50 ms':>10}{'p99 ms':>10}{'writes/s':>10}{'fsyncs':>8}")
+    for label, max_batch in (("group commit", audit_spool.MAX_BATCH), ("fsync per write", 1)):
+        with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+            log = audit_spool.SegmentLog(directory, max_batch=max_batch)
+            start = time.perf_counter()
+            latencies = asyncio.run(run(log, args.writes, args.concurrency))
+            elapsed = time.perf_counter() - start
+            log.close()
+        print(f"{label:<16}{statistics.median(latencies):>10.2f}{percentile(latencies, 99):>10.2f}"
+              f"{args.writes / elapsed:>10.0f}{log.stats['fsyncs']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# scripts/bench_csv_ingest.py
+"""
+Benchmark /upload-csv ingestion: rows/sec and peak RSS.
+
+    # Streaming COPY path against Postgres (the target: 5M rows)
+    DATABASE_URL=postgresql+psycopg2://... python -m scripts.bench_csv_ingest --rows 5000000
+
+    # The old read-everything path, for comparison (run separately: peak RSS is per process)
+    python -m scripts.bench_csv_ingest --rows 5000000 --mode legacy
+"""
+import argparse
+import os
+import random
+import resource
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux reports KiB
+
+
+def generate_csv(path: str, rows: int):
+    rng = random.Random(42)
+    names = [f"Hospital {i}" for i in range(300)]
+    with open(path, "w") as f:
+        f.write("hospital_name,wait_time_minutes\n")
+        for _ in range(rows):
+            f.write(f"{rng.choice(names)},{rng.randint(0, 900)}\n")
+
+
+def run_stream(path: str, database_url: str, chunk_rows: int):
+    from app.database import Base
+    from app.models import ingest  # noqa: F401  (registers the tables)
+    from app.services.csv_ingest import create_job, ingest_file
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        job_id = create_job(db, "ed_waits", os.path.basename(path), os.path.getsize(path)).id
+    return ingest_file(job_id, path, "ed_waits", bind=engine, chunk_rows=chunk_rows)
+
+
+def run_legacy(path: str):
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    data = df.to_dict(orient="records")  # what the old endpoint echoed back
+    return {"rows_loaded": len(data)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CSV ingestion")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--mode", choices=["stream", "legacy"], default="stream")
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///bench_ingest.db"))
+    parser.add_argument("--csv", help="Use an existing CSV instead of generating one")
+    args = parser.parse_args()
+
+    path = args.csv
+    if not path:
+        path = os.path.join(tempfile.gettempdir(), f"bench_{args.rows}.csv")
+        if not os.path.exists(path):
+            print(f"📝 Generating {args.rows:,} rows at {path} ...")
+            generate_csv(path, args.rows)
+    baseline_rss = peak_rss_mb()
+
+    started = time.perf_counter()
+    if args.mode == "stream":
+        result = run_stream(path, args.database_url, args.chunk_rows)
+    else:
+        result = run_legacy(path)
+    elapsed = time.perf_counter() - started
+
+    rows = result["rows_loaded"]
+    print(f"✅ {args.mode}: {rows:,} rows in {elapsed:.1f}s = {rows / elapsed:,.0f} rows/s")
+    print(f"📈 Peak RSS: {peak_rss_mb():.0f} MB (before ingest: {baseline_rss:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# scripts/bench_encoding.py
+"""
+Benchmark payload encodings for the wait-time snapshot and /recommend/gps.
+
+    python -m scripts.bench_encoding                     # 30 and 5,000 facilities
+    python -m scripts.bench_encoding --facilities 30 250 5000 --repeat 200
+
+For each size: encode time (median of --repeat runs) and bytes on the wire for
+stdlib json (what the endpoints used before), orjson and MessagePack, plus the
+gzip size of each body for reference.
+"""
+import argparse
+import gzip
+import json
+import random
+import statistics
+import time
+
+import msgpack
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+REGIONS = ["Calgary", "Edmonton", "Central", "North", "South"]
+CATEGORIES = ["Emergency", "Urgent Care"]
+
+
+def wait_time_records(n: int, rng: random.Random) -> list:
+    """Shaped like ws_wait_times.flatten_wait_times output."""
+    return [
+        {
+            "region": rng.choice(REGIONS),
+            "category": rng.choice(CATEGORIES),
+            "name": f"Facility {i} Health Centre",
+            "wait_time": f"{rng.randint(0, 9)} hr {rng.randint(0, 59)} min",
+            "note": rng.choice(["", "Wait times are estimates", None]),
+            "facility_id": i,
+            "lat": round(rng.uniform(49.0, 60.0), 6),
+            "lng": round(rng.uniform(-120.0, -110.0), 6),
+        }
+        for i in range(n)
+    ]
+
+
+def recommendations(n: int, rng: random.Random) -> dict:
+    """A /recommend/gps body ranking `n` facilities (the endpoint keeps the top 3)."""
+    rows = [
+        {
+            "hospital": f"Facility {i} Health Centre", "facility_id": i, "wait_time": "2 hr 10 min",
+            "wait_minutes": rng.randint(0, 600), "wait_source": "live", "note": "", "category": "Emergency",
+            "region": rng.choice(REGIONS), "distance_km": round(rng.uniform(0, 400), 1),
+            "drive_minutes": round(rng.uniform(0, 300), 1), "score": round(rng.uniform(0, 900), 1),
+            "status": "✅ Recommended", "recommendation": "Alternative option",
+        }
+        for i in range(n)
+    ]
+    return {"patient_location": {"lat": 51.05, "lng": -114.07}, "top_recommendations": rows}
+
+
+def encoders() -> dict:
+    out = {
+        "json (stdlib)": lambda obj: json.dumps(obj).encode("utf-8"),
+        "msgpack": lambda obj: msgpack.packb(obj, use_bin_type=True),
+    }
+    if orjson is not None:
+        out["orjson"] = orjson.dumps
+    return out
+
+
+def time_encode(encode, payload, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encode(payload)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6  # µs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark wait-time / recommendation encodings")
+    parser.add_argument("--facilities", type=int, nargs="+", default=[30, 5000])
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'payload':<22}{'facilities':>10}  {'encoder':<14}{'encode µs':>11}{'bytes':>11}{'gzip bytes':>12}")
+    for n in args.facilities:
+        for label, payload in (("wait-time snapshot", wait_time_records(n, rng)),
+                               ("recommend/gps", recommendations(n, rng))):
+            for name, encode in encoders().items():
+                body = encode(payload)
+                micros = time_encode(encode, payload, args.repeat)
+                print(f"{label:<22}{n:>10}  {name:<14}{micros:>11.1f}{len(body):>11,}{len(gzip.compress(body)):>12,}")
+
+
+if __name__ == "__main__":
+    main()
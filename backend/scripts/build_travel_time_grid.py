@@ -0,0 +1,94 @@
+# scripts/build_travel_time_grid.py
+"""
+Build the geohash-cell × facility drive-time grid used for ranking.
+
+    # From a local OSM extract (needs osmnx + networkx, offline only):
+    python -m scripts.build_travel_time_grid --osm alberta-latest.osm --precision 5
+
+    # Synthetic straight-line grid (no routing data needed):
+    python -m scripts.build_travel_time_grid --synthetic
+
+Facilities and coordinates come from the facility registry seed
+(app/data/facilities.json); grid columns are keyed by facility ID.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.services.travel_time import (
+    ALBERTA_BBOX,
+    GRID_DIR,
+    UNREACHABLE,
+    TravelTimeGrid,
+    build_synthetic_grid,
+    enumerate_cells,
+)
+from app.utils.geo import geohash_center
+
+FACILITIES_FILE = Path(__file__).resolve().parent.parent / "app" / "data" / "facilities.json"
+
+
+def load_facilities(path: Path):
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    return {str(e["id"]): (e["lat"], e["lng"]) for e in entries if e.get("lat") is not None}
+
+
+def build_from_osm(osm_path: str, facilities, bbox, precision: int) -> TravelTimeGrid:
+    """Multi-source Dijkstra from every facility over the OSM drive network."""
+    import networkx as nx
+    import osmnx as ox
+
+    print(f"🗺️ Loading road network from {osm_path} ...")
+    if osm_path.endswith(".graphml"):
+        graph = ox.load_graphml(osm_path)
+    else:
+        graph = ox.graph_from_xml(osm_path, simplify=True)
+    graph = ox.add_edge_travel_times(ox.add_edge_speeds(graph))
+    reverse = graph.reverse(copy=False)  # distances *to* the facility
+
+    cells = enumerate_cells(bbox, precision)
+    centers = np.array([geohash_center(c) for c in cells])
+    cell_nodes = ox.distance.nearest_nodes(graph, X=centers[:, 1], Y=centers[:, 0])
+
+    names = list(facilities)
+    matrix = np.full((len(cells), len(names)), UNREACHABLE, dtype=np.uint16)
+    for j, name in enumerate(names):
+        lat, lng = facilities[name]
+        source = ox.distance.nearest_nodes(graph, X=lng, Y=lat)
+        seconds = nx.single_source_dijkstra_path_length(reverse, source, weight="travel_time")
+        column = np.array([seconds.get(n, np.inf) for n in cell_nodes]) / 60
+        matrix[:, j] = np.where(np.isfinite(column), np.minimum(np.rint(column), UNREACHABLE - 1), UNREACHABLE)
+        print(f"✅ Facility #{name}: {np.isfinite(column).sum()} reachable cells")
+    return TravelTimeGrid(matrix, cells, names, precision)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the travel-time grid")
+    parser.add_argument("--osm", help="Path to a local .osm XML extract or .graphml road network")
+    parser.add_argument("--synthetic", action="store_true", help="Build a straight-line estimate grid instead")
+    parser.add_argument("--precision", type=int, default=5, help="Geohash precision of grid cells")
+    parser.add_argument("--facilities", default=str(FACILITIES_FILE), help="Facility registry JSON")
+    parser.add_argument("--out", default=str(GRID_DIR), help="Output directory")
+    args = parser.parse_args()
+
+    if not args.osm and not args.synthetic:
+        parser.error("pass --osm <extract> or --synthetic")
+
+    facilities = load_facilities(Path(args.facilities))
+    started = time.time()
+    if args.synthetic:
+        grid = build_synthetic_grid(facilities, ALBERTA_BBOX, args.precision)
+    else:
+        grid = build_from_osm(args.osm, facilities, ALBERTA_BBOX, args.precision)
+    grid.save(Path(args.out))
+    size_mb = grid.matrix.nbytes / 1e6
+    print(f"✅ Saved {len(grid.cells)} cells × {len(grid.facilities)} facilities ({size_mb:.1f} MB) "
+          f"to {args.out} in {time.time() - started:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
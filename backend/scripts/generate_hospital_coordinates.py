@@ -1,17 +1,15 @@
 # scripts/generate_hospital_coordinates.py
 
-import os
-import json
+import asyncio
 import requests
-import time
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut
+
+from app.services import facility_registry
+from app.services.geocoding import GeocodeCache, GeocodingPipeline, nominatim_geocoder
 
 # ---------------------------
 # Config
 # ---------------------------
 AHS_ENDPOINT = "http://backend:8000/ed-waits"  # change if running differently
-COORDS_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "hospital_coordinates.json")
 
 FALLBACK_HOSPITALS = [
     "Foothills Medical Centre",
@@ -61,43 +59,34 @@ def fetch_hospital_names():
         print("⚠️ Using fallback hospital list.")
         return FALLBACK_HOSPITALS
 
-def geocode_hospitals(hospitals):
-    """Geocode hospital names into coordinates."""
-    geolocator = Nominatim(user_agent="ahs_hospital_locator")
-    coords = {}
-
+async def geocode_hospitals(hospitals):
+    """Geocode registry facilities without coordinates; each result is saved as it lands."""
+    ids = facility_registry.resolve_names(hospitals)
+    pending = []
     for name in hospitals:
-        try:
-            print(f"🌍 Geocoding: {name} ...")
-            location = geolocator.geocode(f"{name}, Alberta, Canada")
-            if location:
-                coords[name] = {"lat": location.latitude, "lng": location.longitude}
-                print(f"✅ Found: {coords[name]}")
-            else:
-                print(f"⚠️ No result for {name}")
-        except GeocoderTimedOut:
-            print(f"⏳ Timeout, retrying for {name}...")
-            time.sleep(2)
-            continue
-        except Exception as e:
-            print(f"❌ Error geocoding {name}: {e}")
-        time.sleep(1)  # respect Nominatim rate limit
+        facility = facility_registry.get(ids.get(name))
+        if facility and facility["lat"] is None:
+            pending.append((facility["id"], f"{facility['name']}, Alberta, Canada"))
+
+    pipeline = GeocodingPipeline(nominatim_geocoder(), GeocodeCache())
 
-    return coords
+    async def save(facility_id, coords):
+        await asyncio.to_thread(facility_registry.update_coordinates, facility_id, *coords)
+        print(f"✅ Facility #{facility_id}: {coords}")
+
+    print(f"🌍 Geocoding {len(pending)} facilities without coordinates ...")
+    results = await pipeline.run(pending, on_result=save)
+    print(f"✅ Geocoded {len(results)}/{len(pending)} facilities ({pipeline.stats})")
+    return results
 
 def main():
-    """Generate hospital_coordinates.json"""
+    """Fill in missing facility coordinates in the registry."""
     hospitals = fetch_hospital_names()
     if not hospitals:
         print("❌ No hospitals available. Exiting.")
         return
 
-    coords = geocode_hospitals(hospitals)
-
-    with open(COORDS_FILE, "w") as f:
-        json.dump(coords, f, indent=2)
-
-    print(f"✅ Saved {len(coords)} hospital coordinates to {COORDS_FILE}")
+    asyncio.run(geocode_hospitals(hospitals))
 
 if __name__ == "__main__":
     main()
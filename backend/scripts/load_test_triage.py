@@ -0,0 +1,148 @@
+# scripts/load_test_triage.py
+"""
+Open-loop load test for POST /triage: tail latency under overload.
+
+    # Against a running server (Poisson arrivals, fixed rate regardless of response times)
+    python -m scripts.load_test_triage --url http://localhost:8000 --rps 400 --duration 30
+
+    # In-process: the real /triage endpoint and admission controller in front of a
+    # simulated backend (DB pool of --pool connections, --service-ms per request),
+    # run once without admission control and once with it
+    python -m scripts.load_test_triage --simulate --rps 500 --duration 10
+
+Responses are bucketed as ok (full pipeline), degraded (rules-only answer from
+load shedding), rejected (503) and failed (errors / client timeouts).
+"""
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+from collections import defaultdict
+
+import httpx
+
+SYMPTOMS = [
+    "sore throat and mild fever", "headache for two days", "twisted ankle playing soccer",
+    "rash on my arm", "stomach pain after eating", "crushing chest pain", "shortness of breath",
+    "persistent cough", "back pain lifting boxes", "ear ache",
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def run_load(client: httpx.AsyncClient, rps: float, duration: float, timeout: float) -> dict:
+    rng = random.Random(7)
+    results = defaultdict(list)
+
+    async def one():
+        payload = {"symptoms": rng.choice(SYMPTOMS), "age": rng.randint(1, 95)}
+        start = time.perf_counter()
+        try:
+            response = await client.post("/triage", json=payload, timeout=timeout)
+            elapsed = time.perf_counter() - start
+            if response.status_code == 503:
+                kind = "rejected"
+            elif response.status_code != 200:
+                kind = "failed"
+            elif (response.json().get("meta") or {}).get("degraded"):
+                kind = "degraded"
+            else:
+                kind = "ok"
+        except (httpx.HTTPError, asyncio.TimeoutError):
+            elapsed, kind = time.perf_counter() - start, "failed"
+        results[kind].append(elapsed * 1000)
+
+    tasks = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        tasks.append(asyncio.create_task(one()))
+        await asyncio.sleep(rng.expovariate(rps))
+    await asyncio.gather(*tasks)
+    return results
+
+
+def report(label: str, results: dict):
+    total = sum(len(v) for v in results.values())
+    print(f"\n{label}: {total} requests")
+    print(f"  {'outcome':<10}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for kind in ("ok", "degraded", "rejected", "failed"):
+        values = results.get(kind, [])
+        if values:
+            print(f"  {kind:<10}{len(values):>8}{percentile(values, 50):>10.1f}{percentile(values, 95):>10.1f}"
+                  f"{percentile(values, 99):>10.1f}{max(values):>10.1f}")
+    every = [v for values in results.values() for v in values]
+    print(f"  {'all':<10}{len(every):>8}{statistics.median(every):>10.1f}{percentile(every, 95):>10.1f}"
+          f"{percentile(every, 99):>10.1f}{max(every):>10.1f}")
+
+
+async def simulate(args):
+    from fastapi import FastAPI
+
+    from app.database import get_db
+    from app.endpoints import triage as triage_endpoint
+    from app.services import admission
+
+    pool = asyncio.Semaphore(args.pool)
+    rng = random.Random(11)
+
+    async def backend(payload, db):
+        # What a saturated deployment looks like: every request needs a pooled connection
+        async with pool:
+            await asyncio.sleep(rng.lognormvariate(0, 0.4) * args.service_ms / 1000)
+        return {"response": "ok", "recommended_level": "PrimaryCare", "meta": {}}
+
+    triage_endpoint.process_triage = backend
+    app = FastAPI()
+    app.include_router(triage_endpoint.router)
+    app.dependency_overrides[get_db] = lambda: None
+    capacity = args.pool / (args.service_ms / 1000)
+    print(f"Simulated capacity ≈ {capacity:.0f} req/s; offered load {args.rps:.0f} req/s for {args.duration:.0f}s")
+
+    scenarios = [
+        ("without admission control", admission.AdmissionController("triage", 10 ** 6, 10 ** 6, 3600)),
+        ("with admission control", admission.AdmissionController(
+            "triage", args.pool, args.queue, args.max_wait_ms / 1000)),
+    ]
+    for label, controller in scenarios:
+        admission.triage = controller
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            results = await run_load(client, args.rps, args.duration, args.timeout)
+        report(label, results)
+
+
+async def against_server(args):
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits) as client:
+        results = await run_load(client, args.rps, args.duration, args.timeout)
+    report(args.url, results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test POST /triage")
+    parser.add_argument("--url", help="Base URL of a running server")
+    parser.add_argument("--simulate", action="store_true", help="In-process run against a simulated backend")
+    parser.add_argument("--rps", type=float, default=500)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--timeout", type=float, default=10, help="Client timeout (s)")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--pool", type=int, default=10, help="Simulated DB pool size")
+    parser.add_argument("--service-ms", type=float, default=40, help="Simulated time holding a connection")
+    parser.add_argument("--queue", type=int, default=20, help="Admission queue size (simulation)")
+    parser.add_argument("--max-wait-ms", type=float, default=250, help="Admission max queue wait (simulation)")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # one INFO line per request otherwise
+    if not args.url and not args.simulate:
+        parser.error("pass --url or --simulate")
+    asyncio.run(simulate(args) if args.simulate else against_server(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# scripts/triage_batch.py
+"""
+Bulk triage scoring from the command line (same engine as POST /triage/batch).
+
+    python -m scripts.triage_batch intake.ndjson --out scored.ndjson
+    python -m scripts.triage_batch intake.csv --format csv --persist
+    python -m scripts.triage_batch --generate 200000 --out /dev/null   # throughput check
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+
+def generate_payloads(n: int):
+    rng = random.Random(7)
+    phrases = ["sore throat and mild fever", "chest pain radiating to left arm", "twisted ankle, some swelling",
+               "headache for two days", "rash on arms after new soap", "vomiting and abdominal pain",
+               "cough with green phlegm", "hi there", "back pain after lifting boxes", "ear ache and dizziness"]
+    for i in range(n):
+        yield {"id": i, "symptoms": rng.choice(phrases), "age": rng.randint(1, 95),
+               "known_conditions": rng.choice([[], [], ["asthma"], ["diabetes", "hypertension"]])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score triage payloads in bulk")
+    parser.add_argument("input", nargs="?", help="NDJSON or CSV file (default: stdin)")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="Input format (default: from extension)")
+    parser.add_argument("--out", help="Output NDJSON file (default: stdout)")
+    parser.add_argument("--persist", action="store_true", help="Write audit rows and messages")
+    parser.add_argument("--hospitals", action="store_true", help="Include hospital recommendations")
+    parser.add_argument("--generate", type=int, help="Score N synthetic payloads instead of reading input")
+    args = parser.parse_args()
+
+    from app.services.triage_batch import iter_payloads, score_stream
+
+    fmt = args.format or ("csv" if (args.input or "").endswith(".csv") else "ndjson")
+    src = open(args.input, newline="", encoding="utf-8") if args.input else sys.stdin
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    payloads = generate_payloads(args.generate) if args.generate else iter_payloads(src, fmt)
+
+    start = time.perf_counter()
+    rows = 0
+    for results in score_stream(payloads, hospitals=args.hospitals, persist=args.persist):
+        out.write("".join(json.dumps(r, default=str) + "\n" for r in results))
+        rows += len(results)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Scored {rows} payloads in {elapsed:.1f}s ({rows / elapsed * 60:,.0f}/min)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()